@@ -1,93 +1,45 @@
-class ActionFactory():
-    def create(self, action, actor):
-        action_map = {
-            'SALARY': self.salary,
-            'DONATIONS': self.donations,
-            'TITHE': self.tithe,
-            'DEPOSE': self.depose,
-            'MUG': self.mug,
-            'MURDER': self.murder,
-            'DIPLOMACY': self.diplomacy,
-            'COUNTER DONATIONS': self.counter_donations,
-            'COUNTER MUG': self.counter_mug,
-            'COUNTER MURDER': self.counter_murder
-        }
-
-        return action_map[action.upper()](actor)
-
-    def salary(self, actor):
-        return Salary(actor=actor)
-
-    def donations(self, actor):
-        d = Donations(actor=actor)
-        return CounterableAction(d)
-
-    def tithe(self, actor):
-        t = Tithe(actor=actor)
-        return ChallengableAction(t)
-
-    def depose(self, actor):
-        d = Depose(actor=actor)
-        return TargetedAction(d)
-
-    def mug(self, actor):
-        m = Mug(actor=actor)
-        m = CounterableAction(m)
-        m = ChallengableAction(m)
-        return TargetedAction(m)
-
-    def murder(self, actor):
-        m = Murder(actor=actor)
-        m = CounterableAction(m)
-        m = ChallengableAction(m)
-        return TargetedAction(m)
-
-    def diplomacy(self, actor):
-        dip = Diplomacy(actor=actor)
-        return ChallengableAction(dip)
-
-    def counter_donations(self, actor):
-        cd = CounterDonations(actor=actor)
-        return ChallengableAction(cd)
-
-    def counter_mug(self, actor):
-        cm = CounterMug(actor=actor)
-        return ChallengableAction(cm)
-
-    def counter_murder(self, actor):
-        cm = CounterMurder(actor=actor)
-        return ChallengableAction(cm)
+from depose import metrics, trace
+from depose.events import Channel
+from depose.model import Card
 
 
 class Action():
     """ Base class for Actions """
     name = "Base Action"
     description = ""
+    justified_by = frozenset() # Cards which can truthfully perform this action
+    counter = None # Name of the counter-action which blocks this one
 
     def __init__(self, actor):
         self.actor = actor
-        self.obs = []
-        self.dec_obs = []
+        self.obs = Channel("action_success", "action_failed")
+        # The Game, which runs the challenge / counter queries for decorators
+        self.dec_obs = Channel("resolve_challenge")
+
+    def reset(self, actor):
+        """ Clear per-turn state so a pooled Action can be reused by actor """
+        self.actor = actor
+        self.target = None
+        self.obs.clear()
+        self.dec_obs.clear()
 
     def add_observer(self, obs):
-        print("{}: {} is now listening".format(self.name, getattr(obs, "name", "Game")))
-        self.obs.append(obs)
+        if trace.enabled:
+            trace.emit("add_observer", self.name, self.actor, "observe", obs)
+        self.obs.add(obs)
 
     def add_decorator_observer(self, obs):
-        print("{}: {} is now listening (decorator_obs)".format(self.name, getattr(obs, "name", "Game")))
-        self.dec_obs.append(obs)
+        if trace.enabled:
+            trace.emit("add_observer", self.name, self.actor, "decorate", obs)
+        self.dec_obs.add(obs)
 
     def remove_observer(self, obs):
-        obs_list = self.get_observers()
-        if obs in obs_list:
-            print("{}: {} stopped listening".format(self.name, getattr(obs, "name", "Game")))
-            obs_list.remove(obs)
+        if self.get_observers().remove(obs) and trace.enabled:
+            trace.emit("remove_observer", self.name, self.actor, "observe", obs)
 
     def remove_decorator_observer(self, obs):
-        obs_list = self.get_decorator_observers()
-        if obs in obs_list:
-            print("{}: {} stopped listening (decorator_obs)".format(self.name, getattr(obs, "name", "Game")))
-            obs_list.remove(obs)
+        if self.get_decorator_observers().remove(obs) and trace.enabled:
+            trace.emit("remove_observer", self.name, self.actor, "decorate", obs)
 
     def get_observers(self):
         return self.obs
@@ -96,16 +48,20 @@ class Action():
         return self.dec_obs
 
     def perform(self, target=None):
-        print("{}: {}".format(self.name, self.description))
+        if trace.enabled:
+            trace.emit(
+                "perform", self.name, self.actor, "perform",
+                description=self.description.format(
+                    actor=trace.name_of(self.actor), target=trace.name_of(target)
+                )
+            )
         self.notify_success()
 
     def notify_success(self):
-        for o in self.get_observers():
-            o.action_success(self)
+        self.get_observers().notify("action_success", self)
         
     def notify_failure(self):
-        for o in self.get_observers():
-            o.action_failed(self)
+        self.get_observers().notify("action_failed", self)
 
 
 class Salary(Action):
@@ -123,6 +79,7 @@ class Salary(Action):
 class Donations(Action):
     name = "Donations"
     description = "{actor} received a donation of 2 coins"
+    counter = "Counter Donations"
 
     def perform(self, target=None):
         if target is not None:
@@ -135,6 +92,7 @@ class Donations(Action):
 class Tithe(Action):
     name = "Tithe"
     description = "{actor} took a tithe of 3 coins"
+    justified_by = frozenset([Card.LORD])
 
     def perform(self, target=None):
         if target is not None:
@@ -153,13 +111,21 @@ class Depose(Action):
             raise ValueError("Depose must be targeted")
 
         self.actor.coins -= 7
+        self.target = target
+        target.add_state_observer(self)
         target.lose_life()
-        super().perform(target)
+
+    def notify_lose_life(self, source):
+        """ Only report success once the target has revealed a card """
+        source.remove_state_observer(self)
+        super().perform(self.target)
 
 
 class Mug(Action):
     name = "Mug"
     description = "{actor} mugged {target}"
+    justified_by = frozenset([Card.BANDIT])
+    counter = "Counter Mug"
 
     def perform(self, target=None):
         if target is None:
@@ -176,24 +142,37 @@ class Mug(Action):
 class Murder(Action):
     name = "Murder"
     description = "{actor} murdered {target}"
+    justified_by = frozenset([Card.MERCENARY])
+    counter = "Counter Murder"
 
     def perform(self, target=None):
         if target is None:
             raise ValueError("Murder must be targeted")
 
         self.actor.coins -= 3
+        self.target = target
+        target.add_state_observer(self)
         target.lose_life()
-        super().perform(target)
+
+    def notify_lose_life(self, source):
+        """ Only report success once the target has revealed a card """
+        source.remove_state_observer(self)
+        super().perform(self.target)
 
 
 class Diplomacy(Action):
     name = "Diplomacy"
     description = "{actor} performed diplomacy"
+    justified_by = frozenset([Card.DIPLOMAT])
 
     def __init__(self, actor):
         super().__init__(actor)
         self.returned_count = 0
 
+    def reset(self, actor):
+        super().reset(actor)
+        self.returned_count = 0
+
     def perform(self, target=None):
         self.target = target
         if target is not None:
@@ -208,7 +187,8 @@ class Diplomacy(Action):
             raise ValueError("Unexpected actor:", actor)
 
         self.returned_count += 1
-        print("{}: {} returned {}".format(self.name, self.actor.name, card.name))
+        if trace.enabled:
+            trace.emit("return_card", self.name, self.actor, "perform", card=card.name)
         if self.returned_count < 2:
             self.actor.return_card()
         else:
@@ -219,22 +199,56 @@ class Diplomacy(Action):
 class CounterDonations(Action):
     name = "Counter Donations"
     description = "{actor} sabotaged the donation"
+    justified_by = frozenset([Card.LORD])
 
 class CounterMug(Action):
     name = "Counter Mug"
     description = "{actor} stopped the mugging"
+    justified_by = frozenset([Card.BANDIT, Card.DIPLOMAT])
 
 class CounterMurder(Action):
     name = "Counter Murder"
     description = "{actor} prevented the murder"
+    justified_by = frozenset([Card.MEDIC])
+
+
+ACTION_TYPES = [ # Every undecorated Action, counter-actions included
+    Salary, Donations, Tithe, Depose, Mug, Murder, Diplomacy,
+    CounterDonations, CounterMug, CounterMurder,
+]
+
+# Capability index, built once from the justified_by declarations above
+JUSTIFIED_BY = {a.name: a.justified_by for a in ACTION_TYPES} # action name -> Cards
+CAPABILITIES = {
+    card: frozenset(a.name for a in ACTION_TYPES if card in a.justified_by)
+    for card in Card
+} # Card -> action names
+CLAIM_MASKS = {
+    name: sum(1 << card.value for card in cards) for name, cards in JUSTIFIED_BY.items()
+} # action name -> bitmask of Card values
+COUNTERS = {a.name: a.counter for a in ACTION_TYPES if a.counter} # action name -> counter name
+
+def can_perform(card, name):
+    """ Test if card justifies the named action """
+    return card in JUSTIFIED_BY.get(name, ())
+
+def needs_claim(name):
+    """ Test if the named action can only be performed with a particular card """
+    return bool(JUSTIFIED_BY.get(name))
 
 
 class ActionDecorator(Action):
     """ Decorate Actions to allow targetting, countering and challenging """
     def __init__(self, base_action):
-        super().__init__(base_action.actor)
+        # Observers live on the base_action, so decorators don't need lists of their own
+        self.actor = base_action.actor
         self.base_action = base_action
 
+    def reset(self, actor):
+        self.actor = actor
+        self.target = None
+        self.base_action.reset(actor)
+
     @property
     def name(self):
         return self.base_action.name    
@@ -254,7 +268,8 @@ class ActionDecorator(Action):
     def stop_listening(self):
         """ Stop listening for future counter / challenge responses """
         for o in self.get_decorator_observers():
-            print("{}: Stopped listening to {}".format(self.name, getattr(o, "name", "Game")))
+            if trace.enabled:
+                trace.emit("stop_listening", self.name, self.actor, observer=o)
             o.remove_observer(self)
 
 
@@ -262,13 +277,18 @@ class TargetedAction(ActionDecorator):
     """ Ensures base_action has a target before it's performed """
     def perform(self, target=None):
         if target is None:
+            if metrics.enabled:
+                metrics.start("targeting", self)
             self.actor.add_target_observer(self)
             self.actor.choose_target()
         else:
             self.receive_target(target)
 
     def receive_target(self, target):
-        print("{}: Targeting".format(self.name), target)
+        if trace.enabled:
+            trace.emit("target", self.name, self.actor, "target", target=trace.name_of(target))
+        if metrics.enabled:
+            metrics.stop("targeting", self)
         self.actor.remove_target_observer(self)
         self.base_action.perform(target)
 
@@ -278,15 +298,16 @@ class ChallengableAction(ActionDecorator):
     def perform(self, target=None):
         self.target = target
         for o in self.get_decorator_observers():
-            print("{}: Listening to {}".format(self.name, getattr(o, "name", "Game")))
+            if trace.enabled:
+                trace.emit("listen", self.name, self.actor, "challenge", o)
             o.add_observer(self) # Listen for the result of the following query
             o.ask_for_challenges(self)
 
     def notify_accept(self, challenger):
         """ Challenger accepts """
-        print("{}: Attempted challenge by {}".format(self.name, challenger.name))
-        for o in self.get_decorator_observers():
-            o.resolve_challenge(self, challenger)
+        if trace.enabled:
+            trace.emit("accept", self.name, self.actor, "challenge", challenger=challenger.name)
+        self.get_decorator_observers().notify("resolve_challenge", self, challenger)
         
     def notify_decline(self):
         """ No challenge found, we perform the action """
@@ -294,44 +315,54 @@ class ChallengableAction(ActionDecorator):
 
     def challenge_success(self):
         """ Challenge succeeded (we revealed the wrong card) """
-        print("{}: Challenged successfully, cannot perform".format(self.name))
+        if trace.enabled:
+            trace.emit("failure", self.name, self.actor, "challenge")
         self.stop_listening()
         self.notify_failure()
 
     def challenge_failed(self):
         """ Challenge failed, we can perform the action """
-        print("{}: Was not challenged / challenge failed".format(self.name))
+        if trace.enabled:
+            trace.emit("success", self.name, self.actor, "challenge")
         self.stop_listening()
         self.base_action.perform(target=self.target)
 
 
 class CounterableAction(ActionDecorator):
     """ Allows other players to counter an action before it's performed """
+    counter_action = None # The counter-action chain while one is being performed
+
+    def reset(self, actor):
+        super().reset(actor)
+        self.counter_action = None
+
     def perform(self, target=None):
         self.target = target
         for o in self.get_decorator_observers():
-            print("{}: Listening to {}".format(self.name, getattr(o, "name", "Game")))
+            if trace.enabled:
+                trace.emit("listen", self.name, self.actor, "counter", o)
             o.add_observer(self) # Listen to the result of the following query
             o.ask_for_counters(self)
 
     def get_counter_action(self, actor):
-        """ Return matching counter-action """
-        af = ActionFactory()
-        if self.name == "Donations":
-            counter = af.counter_donations(actor)
-        elif self.name == "Mug":
-            counter = af.counter_mug(actor)
-        elif self.name == "Murder":
-            counter = af.counter_murder(actor)
-        else:
+        """ Return matching counter-action, from actor's pool if there's one """
+        if self.name not in COUNTERS:
             raise ValueError("Action has no counter")
 
-        return counter
+        return actor.action_factory.create(COUNTERS[self.name], actor)
+
+    def release_counter_action(self):
+        """ The counter-action has finished, so hand it back to the pool """
+        counter = self.counter_action
+        if counter is not None:
+            self.counter_action = None
+            counter.actor.action_factory.release(counter)
 
     def notify_accept(self, opponent):
         """ Counter accepted. Create, perform and listen to the counter-action """
-        print("{}: Attempted counter by {}".format(self.name, opponent.name))
-        counter = self.get_counter_action(actor=opponent)
+        if trace.enabled:
+            trace.emit("accept", self.name, self.actor, "counter", opponent=opponent.name)
+        counter = self.counter_action = self.get_counter_action(actor=opponent)
         counter.add_observer(self)
         # The counter-action needs to ask for challenges
         for o in self.get_decorator_observers():
@@ -345,12 +376,100 @@ class CounterableAction(ActionDecorator):
 
     def action_success(self, action):
         """ Counter succeeded (which stops this action) """
-        print("{}: Was countered".format(self.name))
+        if trace.enabled:
+            trace.emit("failure", self.name, self.actor, "counter")
         self.stop_listening()
+        self.release_counter_action()
         self.notify_failure()
 
     def action_failed(self, action):
         """ Counter failed, we can perform this action """
-        print("{}: Was not countered".format(self.name))
+        if trace.enabled:
+            trace.emit("success", self.name, self.actor, "counter")
         self.stop_listening()
+        self.release_counter_action()
         self.base_action.perform(target=self.target)
+
+
+class ActionFactory():
+    """ Builds decorated Actions from their names
+
+        CHAINS is the static rule table: the base Action for each name and
+        the decorators wrapped around it, innermost first. Chains handed
+        back through release() once they've finished are pooled and reset
+        for reuse, rather than allocating a new chain every turn """
+    CHAINS = {
+        'SALARY': (Salary, ()),
+        'DONATIONS': (Donations, (CounterableAction,)),
+        'TITHE': (Tithe, (ChallengableAction,)),
+        'DEPOSE': (Depose, (TargetedAction,)),
+        'MUG': (Mug, (CounterableAction, ChallengableAction, TargetedAction)),
+        'MURDER': (Murder, (CounterableAction, ChallengableAction, TargetedAction)),
+        'DIPLOMACY': (Diplomacy, (ChallengableAction,)),
+        'COUNTER DONATIONS': (CounterDonations, (ChallengableAction,)),
+        'COUNTER MUG': (CounterMug, (ChallengableAction,)),
+        'COUNTER MURDER': (CounterMurder, (ChallengableAction,)),
+    }
+    MAX_POOLED = 4 # Finished chains kept per action
+
+    def __init__(self):
+        self.pool = {key: [] for key in self.CHAINS}
+
+    def create(self, action, actor):
+        key = action.upper()
+        pooled = self.pool.get(key)
+        if pooled:
+            chain = pooled.pop()
+            chain.reset(actor)
+            return chain
+
+        return self.build(key, actor)
+
+    def release(self, action):
+        """ Return a finished action so its chain can be reused by create() """
+        pooled = self.pool[action.name.upper()]
+        if len(pooled) < self.MAX_POOLED and action not in pooled:
+            pooled.append(action)
+
+    @classmethod
+    def build(cls, action, actor):
+        """ Allocate a new chain for the named action """
+        try:
+            base, decorators = cls.CHAINS[action.upper()]
+        except KeyError:
+            raise ValueError("Unknown action: {}".format(action))
+
+        chain = base(actor=actor)
+        for decorator in decorators:
+            chain = decorator(chain)
+        return chain
+
+    def salary(self, actor):
+        return self.build('SALARY', actor)
+
+    def donations(self, actor):
+        return self.build('DONATIONS', actor)
+
+    def tithe(self, actor):
+        return self.build('TITHE', actor)
+
+    def depose(self, actor):
+        return self.build('DEPOSE', actor)
+
+    def mug(self, actor):
+        return self.build('MUG', actor)
+
+    def murder(self, actor):
+        return self.build('MURDER', actor)
+
+    def diplomacy(self, actor):
+        return self.build('DIPLOMACY', actor)
+
+    def counter_donations(self, actor):
+        return self.build('COUNTER DONATIONS', actor)
+
+    def counter_mug(self, actor):
+        return self.build('COUNTER MUG', actor)
+
+    def counter_murder(self, actor):
+        return self.build('COUNTER MURDER', actor)
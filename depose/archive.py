@@ -0,0 +1,449 @@
+""" Compact binary game records and an indexed archive of them
+
+    A record holds the same things as a depose.replay log, bit-packed: the
+    deal (turn order, coins, hands and what's left in the deck) and then
+    every event, each a 3 bit tag and as few bits as it needs
+
+        decision -- tag = Decision value, seat (3 bits), move (ACTION 4
+            bits, CHALLENGE / COUNTER 1, cards 3). TARGET and RETURN are
+            always answered by the player whose turn it is, so they store
+            no seat
+        draw -- tag 0, 0, number of cards - 1 (2 bits), cards (3 bits each)
+        end -- tag 0, 1, has a winner (1 bit), winner's seat (3 bits)
+
+    which comes to about a byte per event. Player names and the seed aren't
+    kept, and the deck is stored as counts, since a replay only needs to
+    know which cards were drawn. decode() turns a record back into a log
+    which depose.replay.Replayer can play.
+
+    An archive is a header, the records back to back, then an index of
+    (count + 1) little-endian 64 bit offsets, one per record and the end
+    of the last. Archive.load() memory-maps the file, so looking a game up
+    is an index read and a memoryview slice, and scanning the archive
+    decodes one event at a time straight out of the mapping:
+
+        archive = Archive.load("games.dpa")
+        actions = Counter(record[3] for game, record in archive.events()
+                          if record[0] == "d" and record[2] == Decision.ACTION.value)
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import weakref
+from array import array
+
+from depose.model import Card, Decision
+from depose.replay import VERSION as LOG_VERSION, Replayer
+
+VERSION = 1
+HEADER = struct.Struct("<4sB3xQQ") # magic, version, number of records, index offset
+MAGIC = b"DPGA"
+
+NUM_CARDS = len(Card) + 1 # Indexed by Card value
+SEAT_BITS = 3
+CARD_BITS = 3
+COUNT_BITS = 6 # Of each card left in the deck
+COIN_BITS = 8
+TAG_BITS = 3
+MOVE_BITS = {
+    Decision.ACTION.value: 4,
+    Decision.TARGET.value: SEAT_BITS,
+    Decision.CHALLENGE.value: 1,
+    Decision.COUNTER.value: 1,
+    Decision.REVEAL.value: CARD_BITS,
+    Decision.LOSE_LIFE.value: CARD_BITS,
+    Decision.RETURN.value: CARD_BITS,
+}
+ACTOR_DECISIONS = (Decision.TARGET.value, Decision.RETURN.value) # Seat left out
+ESCAPE, DRAW, END = 0, 0, 1
+
+
+class BitWriter():
+    """ Packs fields into bytes, least significant bit first """
+    def __init__(self):
+        self.data = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value, width):
+        if not 0 <= value < 1 << width:
+            raise ValueError("{} doesn't fit in {} bits".format(value, width))
+        self._acc |= value << self._bits
+        self._bits += width
+        while self._bits >= 8:
+            self.data.append(self._acc & 0xFF)
+            self._acc >>= 8
+            self._bits -= 8
+
+    def getvalue(self):
+        """ Everything written, padded out to a whole byte """
+        if self._bits:
+            return bytes(self.data) + bytes([self._acc])
+        return bytes(self.data)
+
+
+class BitReader():
+    """ Reads fields written by BitWriter out of any buffer, a byte at a time """
+    def __init__(self, data):
+        self.data = data
+        self._pos = 0
+        self._acc = 0
+        self._bits = 0
+
+    def read(self, width):
+        while self._bits < width:
+            if self._pos >= len(self.data):
+                raise ValueError("Game record is truncated")
+            self._acc |= self.data[self._pos] << self._bits
+            self._pos += 1
+            self._bits += 8
+        value = self._acc & ((1 << width) - 1)
+        self._acc >>= width
+        self._bits -= width
+        return value
+
+
+""" Records """
+def encode(records):
+    """ Pack a replay log (header, then event records) into bytes """
+    records = iter(records)
+    header = next(records)
+    out = BitWriter()
+
+    players = len(header["players"])
+    out.write(players, SEAT_BITS)
+    out.write(len(header["order"]), SEAT_BITS)
+    for seat in header["order"]:
+        out.write(seat, SEAT_BITS)
+    for coins, hand in zip(header["coins"], header["hands"]):
+        out.write(coins, COIN_BITS)
+        out.write(len(hand), CARD_BITS)
+        for card in hand:
+            out.write(card, CARD_BITS)
+    deck = [0] * NUM_CARDS
+    for card in header["deck"]:
+        deck[card] += 1
+    for card in range(1, NUM_CARDS):
+        out.write(deck[card], COUNT_BITS)
+
+    winner = None
+    for record in records:
+        kind = record[0]
+        if kind == "d":
+            _, seat, decision, move = record
+            if decision not in MOVE_BITS:
+                raise ValueError("Unknown decision: {}".format(decision))
+            out.write(decision, TAG_BITS)
+            if decision not in ACTOR_DECISIONS:
+                out.write(seat, SEAT_BITS)
+            out.write(move, MOVE_BITS[decision])
+        elif kind == "c":
+            cards = record[1:]
+            out.write(ESCAPE, TAG_BITS)
+            out.write(DRAW, 1)
+            out.write(len(cards) - 1, 2)
+            for card in cards:
+                out.write(card, CARD_BITS)
+        elif kind == "w":
+            winner = record[1]
+        else:
+            raise ValueError("Unknown log record: {}".format(record))
+
+    out.write(ESCAPE, TAG_BITS)
+    out.write(END, 1)
+    out.write(winner is not None, 1)
+    out.write(winner or 0, SEAT_BITS)
+    return out.getvalue()
+
+def iter_records(data):
+    """ Unpack a record into a replay log, one record at a time: the header
+        dict, then ["d", seat, decision, move], ["c", cards...] and ["w", seat] """
+    bits = BitReader(data)
+    read = bits.read
+
+    players = read(SEAT_BITS)
+    order = [read(SEAT_BITS) for _ in range(read(SEAT_BITS))]
+    coins, hands = [], []
+    for _ in range(players):
+        coins.append(read(COIN_BITS))
+        hands.append([read(CARD_BITS) for _ in range(read(CARD_BITS))])
+    deck = [card for card in range(1, NUM_CARDS) for _ in range(read(COUNT_BITS))]
+    yield {
+        "version": LOG_VERSION,
+        "seed": None,
+        "players": ["Player {}".format(i + 1) for i in range(players)],
+        "hands": hands,
+        "coins": coins,
+        "deck": deck,
+        "order": order,
+    }
+
+    actor = None
+    while True:
+        tag = read(TAG_BITS)
+        if tag == ESCAPE:
+            if read(1) == DRAW:
+                yield ["c"] + [read(CARD_BITS) for _ in range(read(2) + 1)]
+                continue
+            has_winner, winner = read(1), read(SEAT_BITS)
+            if has_winner:
+                yield ["w", winner]
+            return
+
+        seat = actor if tag in ACTOR_DECISIONS else read(SEAT_BITS)
+        if tag == Decision.ACTION.value:
+            actor = seat
+        yield ["d", seat, tag, read(MOVE_BITS[tag])]
+
+def decode(data):
+    """ The whole replay log held in a record """
+    return list(iter_records(data))
+
+
+""" Archives """
+class ArchiveWriter():
+    """ Appends records to an archive file
+
+        New records are written after the archive's index, which is left
+        where it is until close() moves them down over it and writes the new
+        index, so until then the file still reads as it did. Used as a
+        context manager, the new records are kept if the block finishes and
+        dropped (see abort()) if it raises
+
+        append -- add to the archive at path rather than replacing it """
+    CHUNK = 1 << 20 # Bytes moved at a time by close()
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.offsets = array("Q")
+        if append and os.path.exists(path):
+            self.file = open(path, "r+b")
+            try:
+                count, index = _read_header(self.file.read(HEADER.size), path)
+                self.file.seek(index)
+                self.offsets.frombytes(self.file.read(8 * (count + 1)))
+                if sys.byteorder != "little":
+                    self.offsets.byteswap()
+                if len(self.offsets) != count + 1:
+                    raise ValueError("{} is truncated".format(path))
+            except ValueError:
+                self.file.close()
+                raise
+        else:
+            # Start from a valid empty archive, so one which never gets
+            # closed can still be read (and appended to)
+            self.file = open(path, "w+b")
+            self.offsets.append(HEADER.size)
+            self.file.write(HEADER.pack(MAGIC, VERSION, 0, HEADER.size))
+            self.file.write(_index_bytes(self.offsets))
+
+        self._index = self.offsets[-1] # Where the new records go once they're closed
+        self._spill = self._index + 8 * len(self.offsets) # Where they're written until then
+        self.file.seek(self._spill)
+        self.file.truncate() # Records from a writer which wasn't closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def write(self, records):
+        """ Add a game, given its replay log (e.g. Recorder.records) """
+        self.add(encode(records))
+
+    def add(self, record):
+        """ Add an already encoded game """
+        self.file.write(record)
+        self.offsets.append(self.offsets[-1] + len(record))
+
+    def close(self):
+        """ Move the new records into place and write the index """
+        if self.file is None:
+            return
+        f = self.file
+        src, dst, end = self._spill, self._index, self._spill + self.offsets[-1] - self._index
+        while src < end:
+            f.seek(src)
+            chunk = f.read(min(self.CHUNK, end - src))
+            if not chunk:
+                raise ValueError("{} was truncated while it was being written".format(self.path))
+            f.seek(dst)
+            f.write(chunk)
+            src += len(chunk)
+            dst += len(chunk)
+
+        f.write(_index_bytes(self.offsets))
+        f.truncate()
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(self), self.offsets[-1]))
+        f.close()
+        self.file = None
+
+    def abort(self):
+        """ Drop the records added since the writer was opened, leaving the
+            archive as it was """
+        if self.file is None:
+            return
+        self.file.seek(self._spill)
+        self.file.truncate()
+        self.file.close()
+        self.file = None
+
+
+def _index_bytes(offsets):
+    offsets = array("Q", offsets)
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    return offsets.tobytes()
+
+def _read_header(data, path):
+    if len(data) < HEADER.size:
+        raise ValueError("{} is not a game archive".format(path))
+    magic, version, count, index = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("{} is not a version {} game archive".format(path, VERSION))
+    if index < HEADER.size:
+        raise ValueError("{} has no index, its writer wasn't closed".format(path))
+    return count, index
+
+
+class Archive():
+    """ Read access to an archive
+
+        Records from archive[i] are memoryviews into the file's mapping, and
+        the mapping can't be closed while any of them are still referenced,
+        so drop (or release()) them before close(). Views from iterating the
+        archive are released as the iteration moves on, and close() ends any
+        iterations still under way """
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+        self._scans = weakref.WeakSet() # Unfinished iterators over the mapping
+        self._file = None
+
+    @classmethod
+    def load(cls, path):
+        """ Memory-map an archive written by ArchiveWriter """
+        f = open(path, "rb")
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            f.close()
+            raise ValueError("{} is not a game archive".format(path))
+        try:
+            count, index = _read_header(data, path)
+            if len(data) < index + 8 * (count + 1):
+                raise ValueError("{} is truncated".format(path))
+        except ValueError:
+            data.close()
+            f.close()
+            raise
+
+        view = memoryview(data)
+        if sys.byteorder == "little":
+            offsets = view[index:index + 8 * (count + 1)].cast("Q")
+        else:
+            offsets = array("Q", view[index:index + 8 * (count + 1)])
+            offsets.byteswap()
+        archive = cls(view, offsets)
+        archive._file = (f, data)
+        return archive
+
+    def close(self):
+        for scan in list(self._scans):
+            scan.close()
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        self.data.release()
+        if self._file is None:
+            return
+
+        f, data = self._file
+        f.close() # The mapping holds its own handle
+        try:
+            data.close()
+        except BufferError:
+            raise ValueError("Records from the archive are still referenced, drop them before closing it")
+        self._file = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """ Encoded record of game i """
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("Game {} is not in the archive".format(i))
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        """ Every encoded record, each valid until the next is reached """
+        return self._scan(self._iter_records())
+
+    def _iter_records(self):
+        for i in range(len(self)):
+            record = self[i]
+            try:
+                yield record
+            finally:
+                record.release()
+
+    def _scan(self, iterator):
+        self._scans.add(iterator)
+        return iterator
+
+    def records(self, i):
+        """ Replay log of game i """
+        with self[i] as record:
+            return decode(record)
+
+    def replayer(self, i):
+        return Replayer(self.records(i))
+
+    def events(self, start=0, stop=None):
+        """ (game index, event record) for every event of games [start, stop),
+            decoded as they're reached """
+        return self._scan(self._events(start, len(self) if stop is None else stop))
+
+    def _events(self, start, stop):
+        for i in range(start, stop):
+            with self[i] as record:
+                records = iter_records(record)
+                next(records)
+                for event in records:
+                    yield i, event
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or summarise a game archive")
+    parser.add_argument("archive")
+    parser.add_argument("logs", nargs="*", help="replay logs (JSON lines) to add to the archive")
+    args = parser.parse_args(argv)
+
+    if args.logs:
+        with ArchiveWriter(args.archive, append=True) as writer:
+            for path in args.logs:
+                with open(path) as f:
+                    writer.write(json.loads(line) for line in f if line.strip())
+
+    archive = Archive.load(args.archive)
+    games = len(archive)
+    size = archive.offsets[games] - HEADER.size if games else 0
+    events = sum(1 for _ in archive.events())
+    archive.close()
+    print("{} games, {} events, {} bytes ({:.1f} bits per event)".format(
+        games, events, size, 8 * size / events if events else 0.0))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+""" What a player can infer about everyone else's hidden cards
+
+    A BeliefTracker watches one Game from one seat. For every opponent it
+    keeps a weight for each hand they could be holding (the multisets of
+    Card values of their hand size, at most 70 of them), and updates those
+    weights by Bayes' rule from the public decisions as they're made:
+
+        claiming an action or counter -- hands which justify it are more likely
+        declining to counter -- hands which could have countered are less likely
+        accepting / declining a challenge -- hands holding the claimed card
+            challenge a little more often
+        revealing a card -- only hands containing it remain
+        losing a life -- as revealing, then the card leaves the hand and the game
+
+    The weights only hold this evidence. The prior, how likely each hand is
+    to be dealt from the cards the viewer can't see, is applied when a
+    marginal is asked for, and the results are cached until the next event
+    that changes them, so repeated queries cost a dict lookup.
+
+    Opponents' hands are treated as independent draws from the unseen
+    cards, and a hand which changes privately (Diplomacy) starts over from
+    the prior.
+"""
+from itertools import combinations_with_replacement
+from math import comb
+
+from depose.actions import CLAIM_MASKS, COUNTERS
+from depose.model import Card, Decision
+from depose.state import HAND_SIZE
+
+NUM_CARDS = len(Card) + 1 # Indexed by Card value
+
+# Every hand of each size, as sorted tuples of Card values
+HANDS = [list(combinations_with_replacement(range(1, NUM_CARDS), n)) for n in range(HAND_SIZE + 1)]
+HAND_INDEX = [{hand: i for i, hand in enumerate(hands)} for hands in HANDS]
+HAND_COUNTS = [[tuple(hand.count(c) for c in range(NUM_CARDS)) for hand in hands] for hands in HANDS]
+HAND_MASKS = [[sum(1 << c for c in set(hand)) for hand in hands] for hands in HANDS]
+
+def _removals(n, card):
+    """ For each hand of size n - 1, the index of the same hand plus card """
+    index = HAND_INDEX[n]
+    return tuple(index[tuple(sorted(hand + (card,)))] for hand in HANDS[n - 1])
+
+# REMOVALS[n][card][j] -- index in HANDS[n] of HANDS[n - 1][j] with card added back
+REMOVALS = [None] + [[None] + [_removals(n, c) for c in range(1, NUM_CARDS)] for n in range(1, HAND_SIZE + 1)]
+
+
+class Belief():
+    """ One opponent's hand: its size and the evidence weight of every hand """
+    __slots__ = ("size", "weights", "_cache")
+
+    def __init__(self, size):
+        self.reset(size)
+
+    def reset(self, size):
+        self.size = size
+        self.weights = [1.0] * len(HANDS[size])
+        self._cache = None
+
+    def update(self, mask, held, not_held):
+        """ Scale hands sharing a card with mask by held, and the rest by not_held """
+        if mask and self.size:
+            weights = self.weights
+            for i, hand_mask in enumerate(HAND_MASKS[self.size]):
+                weights[i] *= held if hand_mask & mask else not_held
+            self._normalise()
+
+    def remove(self, card):
+        """ card was revealed and discarded from the hand """
+        if not self.size:
+            return
+        self.update(1 << card, 1.0, 0.0)
+        back = REMOVALS[self.size][card]
+        weights = self.weights
+        self.size -= 1
+        self.weights = [weights[i] for i in back]
+        self._cache = None
+
+    def _normalise(self):
+        self._cache = None
+        top = max(self.weights)
+        if top > 0:
+            self.weights = [w / top for w in self.weights]
+        else:
+            # The evidence contradicted itself (e.g. someone bluffed in a way
+            # we ruled out), so forget it rather than divide by zero
+            self.weights = [1.0] * len(self.weights)
+
+    def posterior(self, pool):
+        """ Probability of each hand in HANDS[size], given the unseen cards """
+        if self._cache is None:
+            probs = []
+            for counts, w in zip(HAND_COUNTS[self.size], self.weights):
+                if w:
+                    for have, k in zip(pool, counts):
+                        if k:
+                            w *= comb(have, k)
+                probs.append(w)
+            total = sum(probs)
+            if not total:
+                # Evidence rules out every hand the pool allows, so fall back on the pool
+                probs = [1.0 if all(k <= have for have, k in zip(pool, counts)) else 0.0
+                         for counts in HAND_COUNTS[self.size]]
+                total = sum(probs) or 1.0
+            probs = [p / total for p in probs]
+
+            expected = [0.0] * NUM_CARDS
+            holding = [0.0] * NUM_CARDS
+            for p, counts in zip(probs, HAND_COUNTS[self.size]):
+                if p:
+                    for c in range(1, NUM_CARDS):
+                        if counts[c]:
+                            expected[c] += p * counts[c]
+                            holding[c] += p
+            self._cache = (probs, tuple(expected), tuple(holding))
+        return self._cache
+
+
+class BeliefTracker():
+    """ Beliefs about every opponent of viewer, kept up to date as the Game
+        is played. Attach once the cards are dealt
+
+        Likelihoods are (if the hand holds a relevant card, if it doesn't) """
+    CLAIM = (1.0, 0.3) # Claiming an action or counter (0.3: how often players bluff)
+    COUNTER_DECLINE = (0.3, 1.0)
+    CHALLENGE_ACCEPT = (0.3, 0.2)
+    CHALLENGE_DECLINE = (0.7, 0.8)
+
+    def __init__(self, game, viewer):
+        self.game = game
+        self.players = game.players
+        self.viewer = viewer
+        self._seats = {p: i for i, p in enumerate(self.players)}
+
+        # The deck's make-up is public, so count it once from everything dealt
+        self.total = [0] * NUM_CARDS
+        for card in self.players[0].deck.cards:
+            self.total[card.value] += 1
+        for p in self.players:
+            for card in p.cards:
+                self.total[card.value] += 1
+        self.discarded = [0] * NUM_CARDS
+        self._pool = None
+
+        self.beliefs = [Belief(len(p.cards)) for p in self.players]
+        for p in self.players:
+            p.add_decision_observer(self)
+            p.add_change_observer(self)
+
+    def close(self):
+        for p in self.players:
+            p.remove_decision_observer(self)
+            p.remove_change_observer(self)
+
+    """ Events """
+    def notify_decision(self, player, prompt, value):
+        decision = prompt.decision
+        belief = self.beliefs[self._seats[player]]
+        if decision is Decision.ACTION:
+            belief.update(CLAIM_MASKS.get(value.title(), 0), *self.CLAIM)
+        elif decision is Decision.COUNTER:
+            counter = COUNTERS.get(prompt.action.name)
+            if counter is not None:
+                likelihood = self.CLAIM if value else self.COUNTER_DECLINE
+                belief.update(CLAIM_MASKS[counter], *likelihood)
+        elif decision is Decision.CHALLENGE:
+            likelihood = self.CHALLENGE_ACCEPT if value else self.CHALLENGE_DECLINE
+            belief.update(CLAIM_MASKS.get(prompt.action.name, 0), *likelihood)
+        elif decision is Decision.REVEAL:
+            belief.update(1 << value.value, 1.0, 0.0)
+        elif decision is Decision.LOSE_LIFE:
+            belief.remove(value.value)
+            self.discarded[value.value] += 1
+            self._changed_pool()
+        # Targets are public but say nothing about cards, and which card
+        # was returned is private
+
+    def notify_coins(self, player):
+        pass
+
+    def notify_cards(self, player):
+        """ Only the number of cards is public. A hand which changed size
+            other than by losing a life drew or returned cards in private """
+        belief = self.beliefs[self._seats[player]]
+        if len(player.cards) != belief.size:
+            belief.reset(len(player.cards))
+        if player is self.viewer:
+            self._changed_pool()
+
+    def _changed_pool(self):
+        self._pool = None
+        for belief in self.beliefs:
+            belief._cache = None
+
+    """ Queries """
+    def pool(self):
+        """ Count of each Card value the viewer can't see (in opponents'
+            hands or the deck), indexed by value """
+        if self._pool is None:
+            pool = [t - d for t, d in zip(self.total, self.discarded)]
+            for card in self.viewer.cards:
+                pool[card.value] -= 1
+            self._pool = tuple(max(0, n) for n in pool)
+        return self._pool
+
+    def _posterior(self, player):
+        if player is self.viewer:
+            raise ValueError("The viewer's own hand isn't a belief")
+        return self.beliefs[self._seats[player]].posterior(self.pool())
+
+    def hands(self, player):
+        """ [(hand as a tuple of Cards, probability)] for every hand player
+            could hold, most likely first """
+        probs = self._posterior(player)[0]
+        size = self.beliefs[self._seats[player]].size
+        hands = [(tuple(Card(c) for c in hand), p) for hand, p in zip(HANDS[size], probs) if p]
+        hands.sort(key=lambda h: -h[1])
+        return hands
+
+    def expected(self, player):
+        """ Expected number of each card in player's hand, indexed by Card value """
+        return self._posterior(player)[1]
+
+    def holding(self, player):
+        """ Probability player holds at least one of each card, indexed by Card value """
+        return self._posterior(player)[2]
+
+    def can_claim(self, player, name):
+        """ Probability player holds a card justifying the named action """
+        mask = CLAIM_MASKS.get(name, 0)
+        if not mask:
+            return 1.0
+        belief = self.beliefs[self._seats[player]]
+        probs = self._posterior(player)[0]
+        return sum(p for p, hand_mask in zip(probs, HAND_MASKS[belief.size]) if hand_mask & mask)
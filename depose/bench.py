@@ -0,0 +1,230 @@
+""" Benchmarks for the engine's hot paths
+
+    python -m depose.bench                        # table of results
+    python -m depose.bench --json -o bench.json   # machine-readable
+    python -m depose.bench --compare bench.json   # exit 1 on regressions
+
+    Each benchmark times a batch of operations with time.perf_counter,
+    excluding its own setup, and the best of --repeat runs is reported.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from depose.actions import ActionFactory, JUSTIFIED_BY
+from depose.game import Game
+from depose.headless import HeadlessDriver, HeadlessUI, new_game, random_choice
+from depose.model import Card, Deck
+from depose.player import Player
+
+VERSION = 1
+TOLERANCE = 0.2 # Slowdown allowed by --compare before it counts as a regression
+
+
+def bench_deck(n):
+    """ One get() and add() on a full deck """
+    deck = Deck(random.Random(0))
+    for card in Card:
+        for _ in range(3):
+            deck.add(card)
+
+    start = time.perf_counter()
+    for _ in range(n):
+        deck.add(deck.get())
+    return time.perf_counter() - start
+
+def bench_create(name):
+    """ ActionFactory.create() and release() for one action """
+    def bench(n):
+        af = ActionFactory()
+        actor = Player("Bench", Deck(), af, HeadlessUI())
+        start = time.perf_counter()
+        for _ in range(n):
+            af.release(af.create(name, actor))
+        return time.perf_counter() - start
+    bench.__doc__ = "ActionFactory.create() and release() of {}".format(name)
+    return bench
+
+def bench_can_perform(n):
+    """ Game.can_perform() for one card and action """
+    game, ui = new_game(2, rng=random.Random(0))
+    pairs = [(card, name) for card in Card for name in JUSTIFIED_BY]
+    actions = [(card, ActionFactory.build(name, None)) for card, name in pairs]
+    m = len(actions)
+
+    start = time.perf_counter()
+    for i in range(n):
+        card, action = actions[i % m]
+        game.can_perform(card, action)
+    return time.perf_counter() - start
+
+
+def scripted_game(hands, answers):
+    """ Two-player Game with fixed hands, answering prompts with the option
+        values in answers, in order """
+    ui = HeadlessUI()
+    af = ActionFactory()
+    deck = Deck(random.Random(0))
+    players = [Player(name, deck, af, ui) for name in ("Alice", "Bob")]
+    for p, hand in zip(players, hands):
+        p.player_list = players
+        p.coins = 2
+        for card in hand:
+            p.add_card(card)
+
+    answers = list(answers)
+    def choose(player, state):
+        value = answers.pop(0)
+        for option in state.options:
+            if option.value == value:
+                return option
+        raise ValueError("{} is not an option for {}".format(value, state.prompt))
+
+    game = Game(players=players, ui=ui)
+    return HeadlessDriver(game, ui, choose), len(answers)
+
+def bench_turn(hands, answers):
+    def bench(n):
+        elapsed = 0.0
+        for _ in range(n):
+            driver, steps = scripted_game(hands, answers)
+            start = time.perf_counter()
+            driver.start()
+            for _ in range(steps):
+                driver.step()
+            elapsed += time.perf_counter() - start
+        return elapsed
+    return bench
+
+# Tithe, challenged; the Lord is revealed and the challenger loses a life
+bench_challenge = bench_turn(
+    [(Card.LORD, Card.BANDIT), (Card.MEDIC, Card.MEDIC)],
+    ["TITHE", True, Card.LORD, Card.MEDIC],
+)
+bench_challenge.__doc__ = "Turn with a ChallengableAction resolved through Game"
+
+# Donations, countered; the counter is challenged and turns out to be a bluff
+bench_counter = bench_turn(
+    [(Card.LORD, Card.BANDIT), (Card.MEDIC, Card.MEDIC)],
+    ["DONATIONS", True, True, Card.MEDIC, Card.MEDIC],
+)
+bench_counter.__doc__ = "Turn with a CounterableAction resolved through Game"
+
+def bench_games(num_players):
+    """ Complete random headless games """
+    def bench(n):
+        rng = random.Random(num_players)
+        elapsed = 0.0
+        for _ in range(n):
+            game, ui = new_game(num_players, rng=random.Random(rng.getrandbits(64)))
+            driver = HeadlessDriver(game, ui, random_choice(random.Random(rng.getrandbits(64))))
+            start = time.perf_counter()
+            driver.run()
+            elapsed += time.perf_counter() - start
+        return elapsed
+    bench.__doc__ = "Complete random headless games with {} players".format(num_players)
+    return bench
+
+
+# name -> (function(n) returning seconds, default n)
+BENCHMARKS = {
+    "deck.get_add": (bench_deck, 100000),
+    "game.can_perform": (bench_can_perform, 100000),
+    "game.challenge_turn": (bench_challenge, 5000),
+    "game.counter_turn": (bench_counter, 5000),
+}
+for _name in ActionFactory.CHAINS:
+    BENCHMARKS["factory.create." + _name.lower().replace(" ", "_")] = (bench_create(_name), 50000)
+for _n in range(2, 7):
+    BENCHMARKS["games.{}_players".format(_n)] = (bench_games(_n), 200)
+
+
+def run(names=None, scale=1.0, repeat=3):
+    """ Run the named benchmarks (all by default), returning result dicts """
+    results = []
+    for name in names or BENCHMARKS:
+        try:
+            function, n = BENCHMARKS[name]
+        except KeyError:
+            raise ValueError("Unknown benchmark: {}".format(name))
+        n = max(1, int(n * scale))
+        seconds = min(function(n) for _ in range(repeat))
+        results.append({
+            "name": name,
+            "ops": n,
+            "seconds": seconds,
+            "ops_per_sec": n / seconds if seconds else float("inf"),
+            "ns_per_op": seconds / n * 1e9,
+        })
+    return results
+
+def report(results):
+    return {
+        "version": VERSION,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """ Benchmarks more than tolerance slower per op than in baseline, as
+        (name, baseline ns/op, current ns/op) """
+    before = {r["name"]: r["ns_per_op"] for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = before.get(r["name"])
+        if old is not None and r["ns_per_op"] > old * (1 + tolerance):
+            regressions.append((r["name"], old, r["ns_per_op"]))
+    return regressions
+
+
+def format_results(results):
+    width = max(len(r["name"]) for r in results)
+    return "\n".join(
+        "{:<{}}  {:>12.0f} ops/s  {:>12.0f} ns/op".format(r["name"], width, r["ops_per_sec"], r["ns_per_op"])
+        for r in results
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine's hot paths")
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument("-l", "--list", action="store_true", help="list the benchmarks")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every batch size")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("-o", "--output", help="also write the JSON report here")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON report to check for regressions against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (function, n) in BENCHMARKS.items():
+            print("{}: {}".format(name, function.__doc__.strip()))
+        return 0
+
+    try:
+        results = run(args.names, args.scale, args.repeat)
+    except ValueError as e:
+        parser.error(str(e))
+
+    data = report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=2)
+    print(json.dumps(data) if args.json else format_results(results))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, old, new in regressions:
+            print("REGRESSION {}: {:.0f} -> {:.0f} ns/op".format(name, old, new), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
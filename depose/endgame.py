@@ -0,0 +1,321 @@
+""" Solved two-player endgames
+
+    Once only two players are left, a position at the start of a turn is
+    just both players' coins and both hands: at most 13 * 13 * 20 * 20
+    positions. This module plays out every turn from every one of them with
+    GameState, solves the lot by retrograde analysis and saves the result as
+    a flat table with one byte per position, which is memory-mapped when
+    it's loaded.
+
+    Positions are solved open-handed: both players can see both hands,
+    which is as well as anyone can play. Bots don't know their opponent's
+    hand, so EndgamePolicy (depose.policies) averages the table's verdicts
+    over the hands its BeliefTracker thinks the opponent might hold.
+
+    Diplomacy is left out of the solved game, since it's the only action
+    which draws from the Deck and the Deck would multiply the table a
+    thousandfold. Without it coins never exceed 12 and hands only shrink.
+
+    python -m depose.endgame -o endgame.tbl
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from itertools import combinations_with_replacement
+
+from depose.model import Card
+from depose.state import ACTION, DIPLOMACY, GameState, OVER
+
+VERSION = 1
+MAX_COINS = 12 # A turn starting below 10 coins ends with at most 12
+HEADER = struct.Struct("<4sBBB5s3x") # magic, version, max coins, number of cards, cards
+MAGIC = b"DPEG"
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "endgame.tbl")
+
+# Table entries, from the point of view of the player about to move
+DRAW = 0
+WIN = 0 # + turns until the win, 1 to 127
+LOSS = 128 # + turns until the loss
+MAX_TURNS = 127
+
+# Tree leaves which aren't positions
+ACTOR_WINS, ACTOR_LOSES = -1, -2
+
+
+def entry_score(entry):
+    """ Score for the player to move: higher is better, wins sooner and
+        losses later are better """
+    if entry == DRAW:
+        return 0
+    if entry < LOSS:
+        return 1000 - entry
+    return entry - LOSS - 1000
+
+
+class EndgameTable():
+    """ Value of every two-player position, indexed by coins and hands
+
+        data -- one entry per position (bytes, bytearray or an mmap)
+        cards -- the Card values hands are made from (all of them, or a
+            subset for a smaller table) """
+    def __init__(self, data, max_coins=MAX_COINS, cards=None):
+        self.data = data
+        self.max_coins = max_coins
+        self.cards = tuple(cards or (card.value for card in Card))
+        self.hands = [hand for n in (1, 2) for hand in combinations_with_replacement(self.cards, n)]
+        self._hand_index = {hand: i for i, hand in enumerate(self.hands)}
+        self.size = (max_coins + 1) ** 2 * len(self.hands) ** 2
+        if len(data) < self.size:
+            raise ValueError("Endgame table is truncated")
+        self._file = None
+
+    def __len__(self):
+        return self.size
+
+    """ Files """
+    @classmethod
+    def load(cls, path):
+        """ Memory-map a table saved by save() """
+        f = open(path, "rb")
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            f.close()
+            raise ValueError("{} is not an endgame table".format(path))
+        magic, version, max_coins, num_cards, cards = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            data.close()
+            f.close()
+            raise ValueError("{} is not a version {} endgame table".format(path, VERSION))
+
+        table = cls(memoryview(data)[HEADER.size:], max_coins, cards[:num_cards])
+        table._file = (f, data)
+        return table
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.max_coins, len(self.cards), bytes(self.cards)))
+            f.write(self.data[:self.size])
+
+    def close(self):
+        if self._file is not None:
+            self.data.release()
+            f, data = self._file
+            data.close()
+            f.close()
+            self._file = None
+
+    """ Positions """
+    def index(self, mover_coins, other_coins, mover_hand, other_hand):
+        """ Index of a position. Hands are sorted tuples of Card values """
+        hands = len(self.hands)
+        i = mover_coins * (self.max_coins + 1) + other_coins
+        return (i * hands + self._hand_index[mover_hand]) * hands + self._hand_index[other_hand]
+
+    def position(self, index):
+        """ GameState at the start of a turn for the position at index,
+            with the mover in seat 0 """
+        hands = len(self.hands)
+        index, other = divmod(index, hands)
+        index, mover = divmod(index, hands)
+        mover_coins, other_coins = divmod(index, self.max_coins + 1)
+
+        state = GameState(2)
+        state.coins[:] = bytes([mover_coins, other_coins])
+        for seat, hand in enumerate((self.hands[mover], self.hands[other])):
+            for card in hand:
+                state.add_card(seat, card)
+        return state
+
+    def _state_index(self, state):
+        mover = state.order[0]
+        other = state.order[1]
+        return self.index(
+            state.coins[mover], state.coins[other],
+            tuple(sorted(state.cards(mover))), tuple(sorted(state.cards(other))),
+        )
+
+    def covers(self, state):
+        """ Test if state is a two-player position the table can answer for """
+        if state.phase == OVER or len(state.order) != 2 or state.action == DIPLOMACY:
+            return False
+        known = self._hand_index
+        for seat in state.order:
+            if state.coins[seat] > self.max_coins or tuple(sorted(state.cards(seat))) not in known:
+                return False
+        return True
+
+    def entry(self, state):
+        """ Table entry for state, which must be at the start of a turn """
+        return self.data[self._state_index(state)]
+
+    """ Moves """
+    def move_scores(self, state):
+        """ {move: score} for the player deciding in state, playing the
+            rest of the turn out optimally (see entry_score) """
+        if not self.covers(state):
+            raise ValueError("Not a two-player endgame position")
+        seat = state.player
+        scores = {}
+        for move in state.moves():
+            if move == DIPLOMACY and state.phase == ACTION:
+                continue
+            child = state.copy()
+            child.step(move)
+            scores[move] = self._score(child, seat)
+        return scores
+
+    def best_move(self, state):
+        scores = self.move_scores(state)
+        return max(scores, key=scores.get)
+
+    def _score(self, state, seat):
+        """ Minimax score for seat, within the turn """
+        if state.phase == OVER:
+            return 999 if state.winner == seat else -999
+        if state.phase == ACTION:
+            # Next turn. Scores count turns, so it's one further off from here
+            score = entry_score(self.entry(state))
+            score -= (score > 0) - (score < 0)
+            return score if state.order[0] == seat else -score
+
+        best = None
+        for move in state.moves():
+            child = state.copy()
+            child.step(move)
+            score = self._score(child, seat)
+            if best is None or (score > best if state.player == seat else score < best):
+                best = score
+        return best
+
+
+""" Solving """
+WON, LOST = 1, 2
+
+def _turn_tree(state, actor, table, leaves, root=True):
+    """ Every way the turn starting at state can go, as nested
+        (actor decides, children) tuples. Leaves are the indexes of the
+        positions the next turn can start from (also added to leaves),
+        ACTOR_WINS or ACTOR_LOSES """
+    if state.phase == OVER:
+        return ACTOR_WINS if state.winner == actor else ACTOR_LOSES
+    if state.phase == ACTION and not root:
+        i = table._state_index(state)
+        leaves.add(i)
+        return i
+
+    children = []
+    for move in state.moves():
+        if root and move == DIPLOMACY:
+            continue
+        child = state.copy()
+        child.step(move)
+        tree = _turn_tree(child, actor, table, leaves, False)
+        if tree not in children:
+            children.append(tree)
+    if len(children) == 1:
+        return children[0]
+    return (state.player == actor, tuple(children))
+
+def _proven(tree, results, win):
+    """ Test if the actor is sure to win (or sure to lose, if not win),
+        counting unsolved positions as going the other way """
+    if isinstance(tree, int):
+        if tree >= 0:
+            # The other player moves next, so their loss is the actor's win
+            return results[tree] == (LOST if win else WON)
+        return tree == (ACTOR_WINS if win else ACTOR_LOSES)
+    actor, children = tree
+    if actor == win:
+        return any(_proven(c, results, win) for c in children)
+    return all(_proven(c, results, win) for c in children)
+
+def solve(cards=None, max_coins=MAX_COINS, progress=None):
+    """ Solve every position, returning an EndgameTable
+
+        cards -- Card values hands may hold (all of them by default). Hands
+            only shrink, so any subset makes a complete, smaller table
+        progress -- callable(message) for progress reports """
+    num_cards = len(cards) if cards else len(Card)
+    hands = num_cards + num_cards * (num_cards + 1) // 2
+    table = EndgameTable(bytearray((max_coins + 1) ** 2 * hands ** 2), max_coins, cards)
+    size = table.size
+
+    trees = []
+    preds = [[] for _ in range(size)]
+    for i in range(size):
+        leaves = set()
+        trees.append(_turn_tree(table.position(i), 0, table, leaves))
+        for leaf in leaves:
+            preds[leaf].append(i)
+    if progress:
+        progress("Expanded {} positions".format(size))
+
+    # Pass n proves the positions won or lost within n turns
+    results = bytearray(size)
+    data = table.data
+    candidates = range(size)
+    turns = 0
+    while candidates:
+        turns += 1
+        if turns > MAX_TURNS:
+            raise ValueError("Endgames last longer than {} turns".format(MAX_TURNS))
+        solved = []
+        for i in candidates:
+            if results[i]:
+                continue
+            if _proven(trees[i], results, True):
+                solved.append((i, WON))
+            elif _proven(trees[i], results, False):
+                solved.append((i, LOST))
+
+        for i, result in solved:
+            results[i] = result
+            data[i] = (WIN if result == WON else LOSS) + turns
+        candidates = sorted({p for i, _ in solved for p in preds[i] if not results[p]})
+        if progress:
+            progress("Turn {}: {} positions solved".format(turns, len(solved)))
+    return table
+
+
+_table = None
+_loaded = False
+
+def get_table():
+    """ The table at DEPOSE_ENDGAME (or DEFAULT_PATH), loaded on first use,
+        or None if there isn't one """
+    global _table, _loaded
+    if not _loaded:
+        _loaded = True
+        path = path_from_env() or DEFAULT_PATH
+        if os.path.exists(path):
+            _table = EndgameTable.load(path)
+    return _table
+
+def path_from_env(environ=os.environ):
+    return environ.get("DEPOSE_ENDGAME") or None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve every two-player endgame")
+    parser.add_argument("-o", "--output", default=path_from_env() or DEFAULT_PATH)
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    progress = None if args.quiet else lambda message: print(message, file=sys.stderr)
+    table = solve(progress=progress)
+    table.save(args.output)
+
+    data = table.data
+    wins = sum(1 for e in data if DRAW < e < LOSS)
+    losses = sum(1 for e in data if e > LOSS)
+    print("{} positions: {} won, {} lost, {} drawn for the player to move ({:.0f}s)".format(
+        len(data), wins, losses, len(data) - wins - losses, time.perf_counter() - start))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
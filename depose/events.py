@@ -0,0 +1,76 @@
+""" Observer channels shared by the engine, the UIs and their listeners
+
+    Anything which notifies observers (Players, Actions, the Game, the Deck
+    and the UIs) keeps one Channel per kind of event. A Channel is an
+    ordered set: observers are called in the order they subscribed,
+    subscribing and unsubscribing are O(1), subscribing twice has no effect
+    and unsubscribing something which isn't there is ignored.
+
+    Each Channel names the events it carries, and notify() refuses any
+    other, so a typo fails loudly instead of quietly reaching nobody:
+
+        self.state_obs = Channel("notify_lose_life", "notify_return_card")
+        self.state_obs.notify("notify_lose_life", self)
+
+    Dispatch goes over the observers subscribed when it started, skipping
+    any which unsubscribe before their turn, so callbacks can add and remove
+    observers (themselves included) while an event is being sent.
+"""
+
+
+class Channel():
+    """ Ordered set of observers which are sent the named events """
+    __slots__ = ("events", "_obs", "_snapshot")
+
+    def __init__(self, *events):
+        self.events = frozenset(events)
+        self._obs = {} # observer -> None, in subscription order
+        self._snapshot = () # tuple of _obs, or None once it's changed
+
+    def add(self, obs):
+        if obs not in self._obs:
+            self._obs[obs] = None
+            self._snapshot = None
+
+    def remove(self, obs):
+        """ Unsubscribe obs, returning whether it was subscribed """
+        if obs not in self._obs:
+            return False
+        del self._obs[obs]
+        self._snapshot = None
+        return True
+
+    def clear(self):
+        if self._obs:
+            self._obs.clear()
+            self._snapshot = None
+
+    def __contains__(self, obs):
+        return obs in self._obs
+
+    def __len__(self):
+        return len(self._obs)
+
+    def __iter__(self):
+        """ Observers subscribed now, less any removed before they're reached """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = tuple(self._obs)
+        for o in snapshot:
+            if self._snapshot is snapshot or o in self._obs:
+                yield o
+
+    def __repr__(self):
+        return "Channel({})".format(list(self._obs))
+
+    def notify(self, event, *args):
+        """ Call event(*args) on every observer """
+        if event not in self.events:
+            raise ValueError("{} is not an event of this channel".format(event))
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = tuple(self._obs)
+        for o in snapshot:
+            # Until a callback changes the channel, there's nothing to skip
+            if self._snapshot is snapshot or o in self._obs:
+                getattr(o, event)(*args)
@@ -1,7 +1,8 @@
 from functools import partial
 from collections import deque
 
-from depose.model import Card
+from depose import actions, metrics
+from depose.events import Channel
 from depose.player import Player
 
 
@@ -12,8 +13,13 @@ class Game():
             p.add_action_observer(self)
 
         self.ui = ui
-        self.obs = []
+        # Decorators waiting on the current challenge / counter query
+        self.obs = Channel("notify_accept", "notify_decline", "challenge_success", "challenge_failed")
         self.turn_queue = deque(players)
+        self.winner = None
+        self.current_action = None
+        self.questions = deque()
+        self.query = None # "challenge" or "counter" while asking around
 
     def play(self):
         self.active_player = self.turn_queue.popleft()
@@ -21,6 +27,9 @@ class Game():
         self.ui.update_active_player(self.active_player)
 
         self.message("{}'s TURN".format(self.active_player.name))
+        if metrics.enabled:
+            metrics.start("turn", self)
+            metrics.start("action_selection", self)
         self.active_player.choose_action()
 
     def message(self, message):
@@ -29,6 +38,10 @@ class Game():
     def receive_action(self, action):
         """ Perform & listen for the outcome of the action """
         self.message("{} chose {}\n".format(action.actor.name, action.name))
+        self.current_action = action
+        if metrics.enabled:
+            metrics.stop("action_selection", self)
+            metrics.incr("actions_chosen", action.name)
         action.add_observer(self)
         action.add_decorator_observer(self)
         action.perform()
@@ -46,43 +59,59 @@ class Game():
         self.cleanup()
 
     def cleanup(self):
+        if self.current_action is not None:
+            # Finished with, so the factory can reuse it
+            self.current_action.actor.action_factory.release(self.current_action)
+            self.current_action = None
+        if metrics.enabled:
+            metrics.stop("turn", self)
         self.turn_queue.append(self.active_player)
         for p in self.players:
             if p in self.turn_queue and len(p.cards) == 0:
                 self.message("{} has no more cards and was eliminated!\n".format(p.name))
                 self.turn_queue.remove(p)
 
-        self.play()
+        if len(self.turn_queue) == 1:
+            self.winner = self.turn_queue[0]
+            self.message("{} wins!".format(self.winner.name))
+        else:
+            self.play()
 
     def add_observer(self, obs):
-        self.obs.append(obs)
+        self.obs.add(obs)
 
     def remove_observer(self, obs):
-        if obs in self.obs:
-            self.obs.remove(obs)
+        self.obs.remove(obs)
 
     def ask_for_challenges(self, action):
         """ Prepare the list of challenge queries to ask players """
         self.message("Check if anyone challenges {}".format(action.name))
-        self.questions = iter(
+        self.questions = deque(
             [(p.name, partial(Player.ask_to_challenge, p, action)) 
-                for p in self.players if p is not action.actor]
+                for p in self.players if p is not action.actor and p.cards]
         )
-        self.receive_decline()
+        self._start_query("challenge")
 
     def ask_for_counters(self, action):
         """ Prepare the list of counter queries to ask players """
         self.message("Check if anyone counters {}".format(action.name))
         if action.target is not None:
             # Only the target can block targeted actions
-            self.message("Asking {}...".format(action.target.name))
-            action.target.ask_to_counter(action)
+            candidates = [action.target]
         else:
-            self.questions = iter(
-                [(p.name, partial(Player.ask_to_counter, p, action))
-                    for p in self.players if p is not action.actor]
-            )
-            self.receive_decline()
+            candidates = [p for p in self.players if p is not action.actor]
+
+        self.questions = deque(
+            [(p.name, partial(Player.ask_to_counter, p, action))
+                for p in candidates if p.cards]
+        )
+        self._start_query("counter")
+
+    def _start_query(self, query):
+        self.query = query
+        if metrics.enabled:
+            metrics.start(query + "_query", self)
+        self.receive_decline()
 
     def receive_decline(self, source=None):
         """ Ask the next player in the challenge / counter query list
@@ -91,21 +120,28 @@ class Game():
             source -- the Player who sent the event """
         if source is not None:
             self.message("{} declined".format(source.name))
+            if metrics.enabled:
+                metrics.incr("declines", self.query)
 
-        try:
-            name, next_question = next(self.questions)
+        if self.questions:
+            name, next_question = self.questions.popleft()
             self.message("Asking {}...".format(name))
+            if metrics.enabled:
+                metrics.incr("questions_asked", self.query)
             next_question()
-        except StopIteration:
+        else:
             self.message("No more players to ask\n")
-            for o in self.obs:
-                o.notify_decline()
+            if metrics.enabled:
+                metrics.stop(self.query + "_query", self)
+            self.obs.notify("notify_decline")
 
     def receive_accept(self, source):
         """ Notify observers if the challenge / counter was accepted """
         self.message("{} accepted!\n".format(source.name))
-        for o in self.obs:
-            o.notify_accept(source)
+        if metrics.enabled:
+            metrics.incr("accepts", self.query)
+            metrics.stop(self.query + "_query", self)
+        self.obs.notify("notify_accept", source)
 
     def resolve_challenge(self, action, challenger):
         """ Prompt action's actor to reveal a card """
@@ -114,18 +150,24 @@ class Game():
         ))
         self.challenger = challenger
         self.action = action
+        if metrics.enabled:
+            metrics.start("challenge_resolution", self)
         action.actor.resolve_challenge(action)
 
     def receive_challenge_card(self, actor, card):
         """ Resolve challenge with chosen card, notifying observers of the result """
         self.message("{} revealed {}!".format(actor.name, card.name))
-        if self.can_perform(card, self.action):
+        held = self.can_perform(card, self.action)
+        if metrics.enabled:
+            metrics.stop("challenge_resolution", self)
+            metrics.incr("challenges", "held" if held else "failed")
+        if held:
             self.message("{} was wrong and lost a life!\n".format(self.challenger.name))
-            self.challenge_result = lambda: [o.challenge_failed() for o in self.obs]
+            self.challenge_result = lambda: self.obs.notify("challenge_failed")
             wrong_player = self.challenger
         else:
             self.message("{} cannot perform {} and loses a life!\n".format(actor.name, self.action.name))
-            self.challenge_result = lambda: [o.challenge_success() for o in self.obs]
+            self.challenge_result = lambda: self.obs.notify("challenge_success")
             wrong_player = actor
 
         wrong_player.add_state_observer(self)
@@ -137,15 +179,4 @@ class Game():
 
     def can_perform(self, card, action):
         """ Test if card can perform a given action """
-        if card == Card.LORD:
-            return action.name in ["Tithe", "Counter Donations"]
-        elif card == Card.BANDIT:
-            return action.name in ["Mug", "Counter Mug"]
-        elif card == Card.MERCENARY:
-            return action.name in ["Murder"]
-        elif card == Card.MEDIC:
-            return action.name in ["Counter Murder"]
-        elif card == Card.DIPLOMAT:
-            return action.name in ["Diplomacy", "Counter Mug"]
-        else:
-            return False
+        return actions.can_perform(card, action.name)
@@ -0,0 +1,114 @@
+import random
+from collections import deque
+
+from depose.actions import ActionFactory
+from depose.events import Channel
+from depose.game import Game
+from depose.main import create_deck, create_players
+
+
+class HeadlessUI():
+    """ Stand-in for the GUI which queues prompts instead of rendering them
+
+        Player.wait_for_input registers itself as an observer right before
+        setting the state, so each prompt is paired with the player that asked """
+    def __init__(self):
+        self.obs = Channel("handle")
+        self.prompts = deque()
+        self._requester = None
+
+    def add_observer(self, obs):
+        self._requester = obs
+        self.obs.add(obs)
+
+    def remove_observer(self, obs):
+        self.obs.remove(obs)
+
+    def set_state(self, state):
+        self.prompts.append((self._requester, state))
+
+    def update_active_player(self, player):
+        pass
+
+    def message(self, text):
+        pass
+
+
+def random_choice(rng=None):
+    """ Return a chooser which picks uniformly among the offered options """
+    rng = rng or random.Random()
+
+    def choose(player, state):
+        return rng.choice(state.options)
+
+    return choose
+
+
+class HeadlessDriver():
+    """ Run a Game to completion without a GUI
+
+        Each answer is handed back to its Player from this loop rather than
+        from inside the previous callback, so the stack unwinds after every
+        decision and stays the same depth no matter how long the game runs.
+
+        choose -- callable(player, state) returning one of state.options
+        max_decisions -- give up after this many decisions (None for no limit) """
+    def __init__(self, game, ui, choose=None, max_decisions=None):
+        self.game = game
+        self.ui = ui
+        self.choose = choose or random_choice()
+        self.max_decisions = max_decisions
+        self.decisions = 0
+
+    def start(self):
+        """ Start the first turn, queueing its prompt """
+        self.game.play()
+
+    def run(self):
+        """ Play until there's a winner, returning the winning Player
+            (or None if the decision limit was reached first) """
+        self.start()
+        while self.game.winner is None and self.ui.prompts:
+            if self.max_decisions is not None and self.decisions >= self.max_decisions:
+                break
+
+            self.step()
+
+        return self.game.winner
+
+    def step(self):
+        """ Answer the oldest outstanding prompt """
+        player, state = self.ui.prompts.popleft()
+        option = self.choose(player, state)
+        self.decisions += 1
+        player.handle(option.value)
+
+
+def new_game(num_players=4, ui=None, rng=None, names=None):
+    """ Deal a fresh game the same way main() does, returning (game, ui)
+
+        rng -- random source for the deck, for repeatable games
+        names -- player names in seat order (see create_players) """
+    ui = ui or HeadlessUI()
+    af = ActionFactory()
+    deck = create_deck(rng=rng)
+
+    players = create_players(
+        num_players=num_players,
+        deck=deck,
+        action_factory=af,
+        ui=ui,
+        names=names,
+    )
+
+    for p in players:
+        p.player_list = players
+        p.draw_cards(2)
+
+    return Game(players=players, ui=ui), ui
+
+
+def play_game(num_players=4, choose=None, max_decisions=None):
+    """ Play one complete headless game, returning the winning Player """
+    game, ui = new_game(num_players)
+    return HeadlessDriver(game, ui, choose, max_decisions).run()
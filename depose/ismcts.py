@@ -0,0 +1,122 @@
+""" Information-set Monte Carlo Tree Search
+
+    Each iteration deals the cards the searching player can't see (the
+    opponents' hands and the deck) at random from the pool of cards that
+    haven't been revealed, then walks a single shared tree using only the
+    moves legal in that deal, and plays out the rest of the game at random
+    on a GameState copy. Visit counts at the root decide the move, which is
+    how depose.policies.IsmctsPolicy plays.
+"""
+import math
+import random
+import time
+
+from depose.model import Card
+from depose.state import HAND_SIZE, OVER, legal_moves
+
+
+class Node():
+    __slots__ = ("move", "parent", "player", "children", "visits", "reward", "avail")
+
+    def __init__(self, move=None, parent=None, player=None):
+        self.move = move
+        self.parent = parent
+        self.player = player # Seat which made move to reach this node
+        self.children = {}
+        self.visits = 0
+        self.reward = 0.0
+        self.avail = 1
+
+    def ucb(self, exploration):
+        return (self.reward / self.visits
+                + exploration * math.sqrt(math.log(self.avail) / self.visits))
+
+
+def unseen_cards(state, seat):
+    """ Cards seat can't see: the opponents' hands and the deck. Lost cards
+        leave the game face up, so they're never part of the pool """
+    pool = []
+    for s in range(state.num_players):
+        if s != seat:
+            pool += state.cards(s)
+    for card in Card:
+        pool += [card.value] * state.deck[card.value]
+    return pool
+
+def determinize(state, seat, rng):
+    """ Copy of state with the hidden cards redealt at random """
+    d = state.copy()
+    pool = unseen_cards(state, seat)
+    rng.shuffle(pool)
+
+    for s in range(d.num_players):
+        if s == seat:
+            continue
+        count = d.num_cards(s)
+        base = s * HAND_SIZE
+        d.hands[base:base + HAND_SIZE] = bytes(pool[:count]) + bytes(HAND_SIZE - count)
+        del pool[:count]
+
+    for card in Card:
+        d.deck[card.value] = pool.count(card.value)
+    return d
+
+def rollout(state, rng, max_steps=500):
+    """ Play state out at random, returning the winning seat (None if it stalls) """
+    steps = 0
+    while state.phase != OVER and steps < max_steps:
+        state.step(rng.choice(legal_moves(state)), rng)
+        steps += 1
+    return state.winner if state.phase == OVER else None
+
+def search(state, seat, iterations=200, time_limit=None, exploration=0.7, seed=None):
+    """ Run ISMCTS from seat's point of view, returning {move: root visits} """
+    rng = random.Random(seed)
+    root = Node()
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+
+    for i in range(iterations):
+        if deadline is not None and i and time.perf_counter() >= deadline:
+            break
+
+        d = determinize(state, seat, rng)
+        node = root
+
+        # Select, only considering moves which are legal in this determinization
+        while d.phase != OVER:
+            moves = legal_moves(d)
+            untried = [m for m in moves if m not in node.children]
+            if untried:
+                move = rng.choice(untried)
+                player = d.player
+                d.step(move, rng)
+                child = Node(move, node, player)
+                node.children[move] = child
+                node = child
+                break
+
+            children = [node.children[m] for m in moves]
+            for child in children:
+                child.avail += 1
+            node = max(children, key=lambda c: c.ucb(exploration))
+            d.step(node.move, rng)
+
+        winner = rollout(d, rng)
+
+        # Backpropagate, scoring each move for the seat which made it
+        share = 1.0 / d.num_players
+        while node is not None:
+            node.visits += 1
+            if node.player is not None:
+                node.reward += share if winner is None else float(winner == node.player)
+            node = node.parent
+
+    return {move: child.visits for move, child in root.children.items()}
+
+def game_of(player):
+    """ The Game a Player is taking part in """
+    from depose.game import Game
+    for o in player.action_obs:
+        if isinstance(o, Game):
+            return o
+    raise ValueError("{} is not in a game".format(player.name))
@@ -1,9 +1,15 @@
+import os
+import random
+
+from depose import metrics, trace
 from depose.model import Deck, Card
 from depose.player import Player
 from depose.actions import ActionFactory
 from depose.game import Game
 from depose.view import GUI, IdleState
 
+NAMES = ("Shinji", "Rei", "Asuka", "Misato", "Gendo", "Kaworu")
+
 class FakeGUI():
     def set_state(self, state):
         prompt = state.prompt
@@ -23,6 +29,10 @@ class FakeGUI():
 
 
 def main():
+    trace.set_sink(trace.sink_from_env())
+    metrics_path = metrics.path_from_env()
+    if metrics_path:
+        metrics.enable()
     #fake_gui = FakeGUI()
     ui = GUI()
     af = ActionFactory()
@@ -45,13 +55,22 @@ def main():
     )
     
     g = Game(players=players, ui=ui)
+    recorder = None
+    if os.environ.get("DEPOSE_RECORD"):
+        from depose.replay import Recorder
+        recorder = Recorder(g, file=open(os.environ["DEPOSE_RECORD"], "w"))
     g.play()
 
     ui.mainloop()
     ui.destroy()
+    if recorder is not None:
+        recorder.close()
+        recorder.file.close()
+    if metrics_path:
+        metrics.get_metrics().write(metrics_path)
 
-def create_deck(num_sets=3):
-    deck = Deck()
+def create_deck(num_sets=3, rng=None):
+    deck = Deck(rng)
     for _ in range(num_sets):
         deck.add(Card.LORD)
         deck.add(Card.BANDIT)
@@ -61,13 +80,18 @@ def create_deck(num_sets=3):
 
     return deck
 
-def create_players(num_players, deck, action_factory, ui):
-    import random
-    names = ["Shinji", "Rei", "Asuka", "Misato", "Gendo", "Kaworu"]
-    random.shuffle(names)
+def create_players(num_players, deck, action_factory, ui, names=None):
+    """ names -- one per player, in seat order (by default, a shuffled
+        selection from NAMES) """
+    if names is None:
+        names = list(NAMES)
+        random.shuffle(names)
+        names = names[:num_players]
+    if len(names) != num_players:
+        raise ValueError("{} names for {} players".format(len(names), num_players))
 
     players = []
-    for name in names[:num_players]:
+    for name in names:
         p = Player(name, deck=deck, action_factory=action_factory, ui=ui)
         players.append(p)
     return players
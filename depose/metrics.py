@@ -0,0 +1,163 @@
+""" Counters and per-phase timers for the engine
+
+    Call sites guard on the module-level flag, like depose.trace, so
+    nothing is measured when metrics are off:
+
+        if metrics.enabled:
+            metrics.start("challenge_query", self)
+
+    A phase is timed from start(phase, owner) to stop(phase, owner) with
+    time.perf_counter, so it includes any time spent waiting on a player.
+    Phases are keyed by their owner (a Game, Player or Action), so any
+    number of games can be measured in one process.
+
+    Phases: turn, action_selection, targeting, challenge_query,
+    counter_query, challenge_resolution, life_loss
+
+    Counters (kind in brackets): actions_chosen [action name],
+    questions_asked / declines / accepts [challenge or counter],
+    challenges [whether the claim held or failed], lives_lost
+
+    Enable with enable(), or from the environment with
+    DEPOSE_METRICS=path/to/metrics.json (or metrics.prom for Prometheus text)
+"""
+import json
+import os
+import time
+
+
+class Timer():
+    """ Count, total, min and max of a phase's durations, in seconds """
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min or 0.0,
+            "max": self.max or 0.0,
+        }
+
+
+class Metrics():
+    """ Counters (keyed by name and an optional kind) and phase Timers """
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+        self._open = {} # (phase, id(owner)) -> start time
+
+    def incr(self, name, kind=None, n=1):
+        key = (name, kind)
+        self.counters[key] = self.counters.get(key, 0) + n
+
+    def start(self, phase, owner):
+        self._open[(phase, id(owner))] = time.perf_counter()
+
+    def stop(self, phase, owner):
+        """ Finish timing owner's phase. Does nothing if it wasn't started """
+        started = self._open.pop((phase, id(owner)), None)
+        if started is not None:
+            self.observe(phase, time.perf_counter() - started)
+
+    def observe(self, phase, seconds):
+        timer = self.timers.get(phase)
+        if timer is None:
+            timer = self.timers[phase] = Timer()
+        timer.observe(seconds)
+
+    def reset(self):
+        self.counters.clear()
+        self.timers.clear()
+        self._open.clear()
+
+    def snapshot(self):
+        """ Plain dict copy of everything measured so far """
+        counters = {}
+        for (name, kind), n in sorted(self.counters.items(), key=lambda i: (i[0][0], str(i[0][1]))):
+            if kind is None:
+                counters[name] = n
+            else:
+                counters.setdefault(name, {})[kind] = n
+        return {
+            "counters": counters,
+            "phases": {phase: t.to_dict() for phase, t in sorted(self.timers.items())},
+        }
+
+    def to_prometheus(self, prefix="depose"):
+        """ Everything in the Prometheus text exposition format """
+        lines = []
+        names = sorted({name for name, kind in self.counters})
+        for name in names:
+            metric = "{}_{}_total".format(prefix, name)
+            lines.append("# TYPE {} counter".format(metric))
+            for (n, kind), value in sorted(self.counters.items(), key=lambda i: str(i[0][1])):
+                if n == name:
+                    labels = '{{kind="{}"}}'.format(kind) if kind is not None else ""
+                    lines.append("{}{} {}".format(metric, labels, value))
+
+        if self.timers:
+            metric = "{}_phase_seconds".format(prefix)
+            lines.append("# TYPE {} summary".format(metric))
+            for phase, t in sorted(self.timers.items()):
+                lines.append('{}_count{{phase="{}"}} {}'.format(metric, phase, t.count))
+                lines.append('{}_sum{{phase="{}"}} {!r}'.format(metric, phase, t.total))
+            lines.append("# TYPE {}_max gauge".format(metric))
+            for phase, t in sorted(self.timers.items()):
+                lines.append('{}_max{{phase="{}"}} {!r}'.format(metric, phase, t.max))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """ Save to path, as Prometheus text if it ends in .prom, otherwise JSON """
+        with open(path, "w") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), f, indent=2)
+
+
+enabled = False
+_metrics = Metrics()
+
+def enable(metrics=None):
+    """ Start measuring into metrics (or the current registry), returning it """
+    global enabled, _metrics
+    if metrics is not None:
+        _metrics = metrics
+    enabled = True
+    return _metrics
+
+def disable():
+    global enabled
+    enabled = False
+
+def get_metrics():
+    return _metrics
+
+# Only call these when enabled is set
+def incr(name, kind=None, n=1):
+    _metrics.incr(name, kind, n)
+
+def start(phase, owner):
+    _metrics.start(phase, owner)
+
+def stop(phase, owner):
+    _metrics.stop(phase, owner)
+
+def path_from_env(environ=os.environ):
+    """ Where DEPOSE_METRICS says to save metrics, or None if it isn't set """
+    return environ.get("DEPOSE_METRICS") or None
@@ -1,6 +1,8 @@
 import random
 from enum import Enum, auto
 
+from depose.events import Channel
+
 class Card(Enum):
     LORD = auto()
     BANDIT = auto()
@@ -9,14 +11,71 @@ class Card(Enum):
     DIPLOMAT = auto()
 
 
+class Decision(Enum):
+    """ The kinds of prompt a Player can be asked to answer """
+    ACTION = auto()
+    TARGET = auto()
+    CHALLENGE = auto()
+    COUNTER = auto()
+    REVEAL = auto()
+    LOSE_LIFE = auto()
+    RETURN = auto()
+
+
 class Deck():
-    def __init__(self):
+    """ Unordered pile of cards, drawn from at random
+
+        rng -- a random.Random or numpy.random.Generator (defaults to the
+               random module) so each deck can be seeded independently """
+    def __init__(self, rng=None):
         self.cards = []
+        self.rng = rng or random
+        self.obs = Channel("notify_draw", "notify_add")
+
+    @property
+    def rng(self):
+        return self._rng
+
+    @rng.setter
+    def rng(self, rng):
+        self._rng = rng
+        self._randbelow = getattr(rng, "integers", None) or rng.randrange
+
+    def __len__(self):
+        return len(self.cards)
+
+    def add_observer(self, obs):
+        self.obs.add(obs)
+
+    def remove_observer(self, obs):
+        self.obs.remove(obs)
 
     def add(self, card):
         self.cards.append(card)
+        self.obs.notify("notify_add", self, card)
+
+    def remove(self, card):
+        """ Take a particular card out of the deck """
+        self.cards.remove(card)
+        self.obs.notify("notify_draw", self, [card])
 
     def get(self):
-        selection = random.choice(self.cards)
-        self.cards.remove(selection)
-        return selection
+        return self.draw(1)[0]
+
+    def draw(self, number=1):
+        """ Remove and return a list of number randomly chosen cards
+
+            Each pick is swapped with the last card and popped, so drawing
+            doesn't depend on the size of the deck """
+        cards = self.cards
+        if number > len(cards):
+            raise ValueError("Cannot draw {} from a deck of {}".format(number, len(cards)))
+
+        drawn = []
+        for _ in range(number):
+            i = int(self._randbelow(len(cards)))
+            cards[i], cards[-1] = cards[-1], cards[i]
+            drawn.append(cards.pop())
+
+        self.obs.notify("notify_draw", self, drawn)
+        return drawn
@@ -1,6 +1,21 @@
+from depose import metrics
+from depose.events import Channel
+from depose.model import Decision
 from depose.view import Option
 
 class Player():
+    # Action options by coin bracket, built once rather than on every prompt
+    BASE_ACTIONS = (
+        Option("Salary", "SALARY"),
+        Option("Donations", "DONATIONS"),
+        Option("Tithe", "TITHE"),
+        Option("Mug", "MUG"),
+        Option("Diplomacy", "DIPLOMACY"),
+    )
+    MURDER_ACTIONS = BASE_ACTIONS + (Option("Murder", "MURDER"),)
+    DEPOSE_ACTIONS = MURDER_ACTIONS + (Option("Depose", "DEPOSE"),)
+    FORCED_ACTIONS = (Option("Depose", "DEPOSE"),)
+
     def __init__(self, name, deck, action_factory, ui):
         self.name = name
         self._coins = 0
@@ -10,9 +25,12 @@ class Player():
         self.action_factory = action_factory
         self.ui = ui
         
-        self.action_obs = []
-        self.target_obs = []
-        self.state_obs = []
+        self.action_obs = Channel("receive_action", "receive_challenge_card", "receive_accept", "receive_decline")
+        self.target_obs = Channel("receive_target")
+        self.state_obs = Channel("notify_lose_life", "notify_return_card")
+        self.decision_obs = Channel("notify_decision")
+        self.change_obs = Channel("notify_coins", "notify_cards")
+        self.prompt = None
 
     @property
     def coins(self):
@@ -20,7 +38,10 @@ class Player():
 
     @coins.setter
     def coins(self, value):
-        self._coins = max(0, value)
+        value = max(0, value)
+        if value != self._coins:
+            self._coins = value
+            self.change_obs.notify("notify_coins", self)
 
     @property
     def cards(self):
@@ -28,45 +49,69 @@ class Player():
 
     def add_card(self, card):
         self._cards.append(card)
+        self._notify_cards()
+
+    def remove_card(self, card):
+        self._cards.remove(card)
+        self._notify_cards()
+
+    def set_cards(self, cards):
+        self._cards[:] = cards
+        self._notify_cards()
+
+    def _notify_cards(self):
+        self.change_obs.notify("notify_cards", self)
 
     def __str__(self):
         return "{} (Coins: {}, Cards: {})".format(self.name, self._coins, len(self.cards))
 
     def add_action_observer(self, obs):
-        self.action_obs.append(obs)
+        self.action_obs.add(obs)
 
     def add_target_observer(self, obs):
-        self.target_obs.append(obs)
+        self.target_obs.add(obs)
     
     def remove_target_observer(self, obs):
-        if obs in self.target_obs:
-            self.target_obs.remove(obs)
+        self.target_obs.remove(obs)
+
+    def add_decision_observer(self, obs):
+        self.decision_obs.add(obs)
+
+    def remove_decision_observer(self, obs):
+        self.decision_obs.remove(obs)
+
+    def add_change_observer(self, obs):
+        """ obs is told about coin and card changes with notify_coins(player)
+            and notify_cards(player) """
+        self.change_obs.add(obs)
+
+    def remove_change_observer(self, obs):
+        self.change_obs.remove(obs)
 
     def add_state_observer(self, obs):
-        self.state_obs.append(obs)
+        self.state_obs.add(obs)
 
     def remove_state_observer(self, obs):
-        if obs in self.state_obs:
-            self.state_obs.remove(obs)
+        self.state_obs.remove(obs)
 
     def draw_cards(self, number=1):
-        for _ in range(number):
-            self.add_card(self.deck.get())
+        for card in self.deck.draw(number):
+            self.add_card(card)
 
     def handle(self, event):
         self.ui.remove_observer(self)
+        self.decision_obs.notify("notify_decision", self, self.prompt, event)
         self.callback(event)
 
     def callback(self, event):
         pass
 
-    def wait_for_input(self, prompt, optionlist, callback):
+    def wait_for_input(self, prompt, optionlist, callback, decision=None, action=None):
         from depose.view import OptionListState
         self.ui.add_observer(self)
         self.callback = callback
-        self.ui.set_state(
-            OptionListState(self.ui, prompt, optionlist)
-        )
+        self.prompt = OptionListState(self.ui, prompt, optionlist, decision, action)
+        self.ui.set_state(self.prompt)
 
     def _cardlist(self):
         cl = []
@@ -81,15 +126,15 @@ class Player():
             self.wait_for_input(
                 "Select a card to return",
                 self._cardlist(),
-                self._return_card
+                self._return_card,
+                Decision.RETURN
             )
 
     def _return_card(self, card):
         try:
+            self.remove_card(card)
             self.deck.add(card)
-            self.cards.remove(card)
-            for o in self.state_obs:
-                o.notify_return_card(self, card)
+            self.state_obs.notify("notify_return_card", self, card)
         except ValueError:
             raise ValueError("{}: {} is not in {}".format(self.name, card, self.cards))
 
@@ -97,34 +142,44 @@ class Player():
         self.wait_for_input(
             "{} was challenged, choose a card to reveal".format(action.name),
             self._cardlist(),
-            self._resolve_challenge
+            self._resolve_challenge,
+            Decision.REVEAL,
+            action
         )
 
     def _resolve_challenge(self, card):
-        for o in self.action_obs:
-            o.receive_challenge_card(self, card)
+        self.action_obs.notify("receive_challenge_card", self, card)
 
     def lose_life(self, card=None):
-        if card is None:
+        if not self.cards:
+            # Already out of the game, there's nothing left to reveal
+            self.state_obs.notify("notify_lose_life", self)
+        elif card is None:
+            if metrics.enabled:
+                metrics.start("life_loss", self)
             self.wait_for_input(
                 "You lost a life, reveal a card",
                 self._cardlist(),
-                self._lose_life
+                self._lose_life,
+                Decision.LOSE_LIFE
             )
         else:
             self._lose_life(card)
     
     def _lose_life(self, card):
-        self.cards.remove(card)
-        for o in self.state_obs:
-            o.notify_lose_life(self)
+        if metrics.enabled:
+            metrics.stop("life_loss", self)
+            metrics.incr("lives_lost")
+        self.remove_card(card)
+        self.state_obs.notify("notify_lose_life", self)
 
     def choose_action(self):
         actionlist = self._get_valid_actions()
         self.wait_for_input(
             "Select an action",
             actionlist,
-            self._choose_action
+            self._choose_action,
+            Decision.ACTION
         )
 
     def _choose_action(self, action):
@@ -134,23 +189,14 @@ class Player():
             )
 
     def _get_valid_actions(self):
-        if self.coins >= 10:
-            return [Option("Depose", "DEPOSE")]
-
-        actions = [
-            Option("Salary", "SALARY"),
-            Option("Donations", "DONATIONS"),
-            Option("Tithe", "TITHE"),
-            Option("Mug", "MUG"),
-            Option("Diplomacy", "DIPLOMACY")
-        ]
-
-        if self.coins >= 3:
-            actions.append(Option("Murder", "MURDER"))
-        if self.coins >= 7:
-            actions.append(Option("Depose", "DEPOSE"))
-
-        return actions
+        coins = self.coins
+        if coins >= 10:
+            return list(self.FORCED_ACTIONS)
+        elif coins >= 7:
+            return list(self.DEPOSE_ACTIONS)
+        elif coins >= 3:
+            return list(self.MURDER_ACTIONS)
+        return list(self.BASE_ACTIONS)
 
     def choose_target(self):
         target_list = []
@@ -161,31 +207,33 @@ class Player():
         self.wait_for_input(
             "Choose a target",
             target_list,
-            self._choose_target
+            self._choose_target,
+            Decision.TARGET
         )
 
     def _choose_target(self, target):
-        for o in self.target_obs:
-            o.receive_target(target)
+        self.target_obs.notify("receive_target", target)
 
     def ask_to_counter(self, action):
         self.wait_for_input(
             "{}, counter {}'s {}?".format(self.name, action.actor.name, action.name),
             [Option("Yes", True), Option("No", False)],
-            self.receive_response
+            self.receive_response,
+            Decision.COUNTER,
+            action
         )
 
     def ask_to_challenge(self, action):
         self.wait_for_input(
             "{}, challenge {}'s {}?".format(self.name, action.actor.name, action.name),
             [Option("Yes", True), Option("No", False)],
-            self.receive_response
+            self.receive_response,
+            Decision.CHALLENGE,
+            action
         )
     
     def receive_response(self, response):
         if response == True:
-            for o in self.action_obs:
-                o.receive_accept(self)
+            self.action_obs.notify("receive_accept", self)
         else:
-            for o in self.action_obs:
-                o.receive_decline(self)
+            self.action_obs.notify("receive_decline", self)
@@ -0,0 +1,282 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from depose.actions import COUNTERS, JUSTIFIED_BY
+from depose.belief import BeliefTracker
+from depose.endgame import get_table
+from depose.ismcts import game_of, search
+from depose.state import GameState, HAND_SIZE, to_value
+
+
+def action_name(value):
+    """ Convert an action option value ("COUNTER MUG") to its name ("Counter Mug") """
+    return value.title()
+
+def can_claim(cards, name):
+    """ Test if any of cards justifies claiming the named action """
+    justified_by = JUSTIFIED_BY.get(name)
+    if not justified_by:
+        return True
+    return any(c in justified_by for c in cards)
+
+def justified_option(state):
+    """ Return the card option which justifies state.action, if there is one """
+    for option in state.options:
+        if can_claim([option.value], state.action.name):
+            return option
+    return None
+
+
+class Policy():
+    """ Base class for automated players, which picks options at random
+
+        choose() is given the Player being asked and the OptionListState
+        describing the prompt, and returns one of the state's options """
+    name = "random"
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+
+    def start(self, game, player):
+        """ Called once the cards are dealt, before the first turn, with the
+            Player this policy is playing """
+        pass
+
+    def close(self):
+        """ Called once the game is over, to free anything start() or
+            choose() set up """
+        pass
+
+    def choose(self, player, state):
+        handler = getattr(self, "choose_" + state.decision.name.lower(), None)
+        if handler is not None:
+            option = handler(player, state)
+            if option is not None:
+                return option
+
+        return self.rng.choice(state.options)
+
+    def _option(self, state, value):
+        for option in state.options:
+            if option.value == value:
+                return option
+        return None
+
+
+class RandomPolicy(Policy):
+    """ Picks uniformly among the offered options """
+    name = "random"
+
+
+class HonestPolicy(Policy):
+    """ Never bluffs or challenges, and saves up for a Depose """
+    name = "honest"
+    PREFERENCE = ["DEPOSE", "MURDER", "TITHE", "MUG", "DONATIONS", "SALARY"]
+
+    def choose_action(self, player, state):
+        offered = [o.value for o in state.options]
+        for value in self.PREFERENCE:
+            if value == "DEPOSE" and player.coins < 7:
+                continue
+            if value in offered and can_claim(player.cards, action_name(value)):
+                return self._option(state, value)
+        return None
+
+    def choose_target(self, player, state):
+        return max(state.options, key=lambda o: (len(o.value.cards), o.value.coins))
+
+    def choose_challenge(self, player, state):
+        return self._option(state, False)
+
+    def choose_counter(self, player, state):
+        counter = COUNTERS.get(state.action.name)
+        return self._option(state, counter is not None and can_claim(player.cards, counter))
+
+    def choose_reveal(self, player, state):
+        return justified_option(state)
+
+
+class AggressivePolicy(Policy):
+    """ Bluffs freely and challenges often """
+    name = "aggressive"
+    PREFERENCE = ["DEPOSE", "MURDER", "TITHE", "MUG"]
+    CHALLENGE_RATE = 0.4
+
+    def choose_action(self, player, state):
+        offered = [o.value for o in state.options]
+        for value in self.PREFERENCE:
+            if value in offered:
+                return self._option(state, value)
+        return None
+
+    def choose_target(self, player, state):
+        return max(state.options, key=lambda o: o.value.coins)
+
+    def choose_challenge(self, player, state):
+        if can_claim(player.cards, state.action.name):
+            # We hold the card, so they're less likely to
+            return self._option(state, False)
+        return self._option(state, self.rng.random() < self.CHALLENGE_RATE)
+
+    def choose_counter(self, player, state):
+        return self._option(state, True)
+
+    def choose_reveal(self, player, state):
+        return justified_option(state)
+
+
+class BayesPolicy(HonestPolicy):
+    """ Plays honestly, but challenges claims its BeliefTracker thinks are
+        probably bluffs """
+    name = "bayes"
+    CHALLENGE_BELOW = 0.35 # Challenge when the claim is less likely than this to be true
+
+    def __init__(self, rng=None):
+        super().__init__(rng)
+        self.tracker = None
+
+    def start(self, game, player):
+        if self.tracker is not None:
+            self.tracker.close()
+        self.tracker = BeliefTracker(game, player)
+
+    def beliefs(self, player):
+        """ The BeliefTracker for player's game. Drivers should call start()
+            so it sees the whole game: started here on the first prompt
+            instead, it misses whatever happened before """
+        game = game_of(player)
+        if self.tracker is None or self.tracker.game is not game or self.tracker.viewer is not player:
+            self.start(game, player)
+        return self.tracker
+
+    def choose(self, player, state):
+        self.beliefs(player)
+        return super().choose(player, state)
+
+    def close(self):
+        if self.tracker is not None:
+            self.tracker.close()
+            self.tracker = None
+
+    def choose_challenge(self, player, state):
+        action = state.action
+        justified = self.tracker.can_claim(action.actor, action.name)
+        return self._option(state, justified < self.CHALLENGE_BELOW)
+
+
+class EndgamePolicy(BayesPolicy):
+    """ Plays two-player endgames from the solved table (see depose.endgame),
+        and like BayesPolicy before then or without a table
+
+        The table assumes both hands are face up, so each move is scored
+        against every hand the opponent might hold, weighted by how likely
+        the BeliefTracker thinks it is """
+    name = "endgame"
+
+    def __init__(self, rng=None, table=None):
+        super().__init__(rng)
+        self.table = table
+        self.endgame_decisions = 0
+
+    def choose(self, player, state):
+        tracker = self.beliefs(player)
+        table = self.table or get_table()
+        if table is not None and len(state.options) > 1:
+            option = self._endgame_option(table, tracker, player, state)
+            if option is not None:
+                self.endgame_decisions += 1
+                return option
+        return super().choose(player, state)
+
+    def _endgame_option(self, table, tracker, player, state):
+        game = tracker.game
+        position = GameState.from_game(game, state, player)
+        if not table.covers(position):
+            return None
+
+        opponent = next(s for s in position.order if s != position.player)
+        base = opponent * HAND_SIZE
+        expected = {} # move -> expected result, 1 for a win and 0 for a loss
+        for hand, p in tracker.hands(game.players[opponent]):
+            guess = position.copy()
+            guess.hands[base:base + HAND_SIZE] = bytes(c.value for c in hand) + bytes(HAND_SIZE - len(hand))
+            if not table.covers(guess):
+                continue
+            for move, score in table.move_scores(guess).items():
+                expected[move] = expected.get(move, 0.0) + p * (0.5 + score / 2000)
+
+        if not expected:
+            return None
+        move = max(expected, key=expected.get)
+        return self._option(state, to_value(game, state.decision, move))
+
+
+class IsmctsPolicy(Policy):
+    """ Answers every prompt with ISMCTS (see depose.ismcts)
+
+        iterations -- search iterations per decision
+        time_limit -- optional per-decision budget in seconds
+        workers -- split the iterations across this many processes, which
+            are kept until close() """
+    name = "ismcts"
+    EXPLORATION = 0.7
+
+    def __init__(self, rng=None, iterations=200, time_limit=None, workers=1):
+        super().__init__(rng)
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.workers = workers
+        self._executor = None
+
+    def choose(self, player, prompt):
+        if len(prompt.options) == 1:
+            return prompt.options[0]
+
+        game = game_of(player)
+        state = GameState.from_game(game, prompt, player)
+        seat = game.players.index(player)
+        visits = self.search(state, seat)
+
+        move = max(visits, key=lambda m: (visits[m], -m))
+        option = self._option(prompt, to_value(game, prompt.decision, move))
+        return option if option is not None else self.rng.choice(prompt.options)
+
+    def search(self, state, seat):
+        if self.workers <= 1:
+            return search(state, seat, self.iterations, self.time_limit,
+                          self.EXPLORATION, self.rng.getrandbits(64))
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        share = max(1, self.iterations // self.workers)
+        jobs = [self._executor.submit(search, state, seat, share, self.time_limit,
+                                      self.EXPLORATION, self.rng.getrandbits(64))
+                for _ in range(self.workers)]
+
+        visits = {}
+        for job in jobs:
+            for move, n in job.result().items():
+                visits[move] = visits.get(move, 0) + n
+        return visits
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+POLICIES = {
+    RandomPolicy.name: RandomPolicy,
+    HonestPolicy.name: HonestPolicy,
+    AggressivePolicy.name: AggressivePolicy,
+    BayesPolicy.name: BayesPolicy,
+    EndgamePolicy.name: EndgamePolicy,
+    IsmctsPolicy.name: IsmctsPolicy,
+}
+
+def create_policy(name, rng=None):
+    """ Build a policy by its registered name """
+    try:
+        return POLICIES[name](rng=rng)
+    except KeyError:
+        raise ValueError("Unknown policy: {}".format(name))
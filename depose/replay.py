@@ -0,0 +1,238 @@
+""" Deterministic game logs and a headless replayer
+
+    A log is JSON lines: a header object describing the deal, then one
+    short array per event
+
+        ["d", seat, decision, move] -- a Player answered a prompt
+        ["c", card, ...]            -- cards drawn from the deck
+        ["w", seat]                 -- the winner
+
+    Decisions use the GameState move encoding (see depose.state), cards
+    their Card value. Replays feed the recorded draws back to the deck, so
+    they reproduce the game exactly however its deck was originally seeded.
+
+    python -m depose.replay game.jsonl --turn 12
+"""
+import argparse
+import json
+from collections import deque
+
+from depose.actions import ActionFactory
+from depose.game import Game
+from depose.headless import HeadlessDriver, HeadlessUI
+from depose.model import Card, Deck, Decision
+from depose.player import Player
+from depose.state import GameState, to_move, to_value
+
+VERSION = 1
+
+
+class ReplayError(ValueError):
+    """ The log doesn't match what happened when it was replayed """
+
+
+class Recorder():
+    """ Logs every decision and deck draw in a game
+
+        Attach before the first turn is played (after the cards are dealt).
+        Works with any UI, since it listens to the Players and Deck directly """
+    def __init__(self, game, seed=None, file=None):
+        self.game = game
+        self.file = file
+        self.records = []
+        self.turns = 0
+
+        players = game.players
+        deck = players[0].deck
+        self._write({
+            "version": VERSION,
+            "seed": seed,
+            "players": [p.name for p in players],
+            "hands": [[c.value for c in p.cards] for p in players],
+            "coins": [p.coins for p in players],
+            "deck": [c.value for c in deck.cards],
+            "order": [players.index(p) for p in game.turn_queue],
+        })
+
+        self._seats = {p: i for i, p in enumerate(players)}
+        for p in players:
+            p.add_decision_observer(self)
+        deck.add_observer(self)
+
+    def _write(self, record):
+        self.records.append(record)
+        if self.file is not None:
+            self.file.write(json.dumps(record, separators=(",", ":")))
+            self.file.write("\n")
+
+    def notify_decision(self, player, prompt, value):
+        decision = prompt.decision
+        if decision is Decision.ACTION:
+            self.turns += 1
+        self._write(["d", self._seats[player], decision.value, to_move(self.game, decision, value)])
+
+    def notify_draw(self, deck, cards):
+        self._write(["c"] + [c.value for c in cards])
+
+    def notify_add(self, deck, card):
+        pass # Returned cards are already implied by the decisions
+
+    def close(self):
+        """ Stop listening, noting the winner if the game has finished """
+        for p in self.game.players:
+            p.remove_decision_observer(self)
+        self.game.players[0].deck.remove_observer(self)
+        if self.game.winner is not None:
+            self._write(["w", self._seats[self.game.winner]])
+        if self.file is not None:
+            self.file.flush()
+
+
+class _ScriptedRandom():
+    """ Stands in for a Deck's rng, picking the cards recorded in the log """
+    def __init__(self, deck, draws):
+        self.deck = deck
+        self.draws = draws
+
+    def randrange(self, n):
+        if not self.draws:
+            raise ReplayError("Deck drawn from more often than recorded")
+        card = self.draws.popleft()
+        try:
+            return self.deck.cards.index(card)
+        except ValueError:
+            raise ReplayError("Recorded draw of {} is not in the deck".format(card.name))
+
+
+class Replayer():
+    """ Re-runs a logged game headlessly
+
+        replayer = Replayer(records)
+        game = replayer.run(until_turn=12) # Paused as turn 12 starts
+    """
+    def __init__(self, records):
+        records = list(records)
+        if not records or not isinstance(records[0], dict):
+            raise ReplayError("Missing log header")
+
+        self.header = records[0]
+        if self.header.get("version") != VERSION:
+            raise ReplayError("Unsupported log version: {}".format(self.header.get("version")))
+
+        self.decisions = deque(r[1:] for r in records[1:] if r[0] == "d")
+        draws = deque(Card(c) for r in records[1:] if r[0] == "c" for c in r[1:])
+        winners = [r[1] for r in records[1:] if r[0] == "w"]
+        self.recorded_winner = winners[0] if winners else None
+
+        self.ui = HeadlessUI()
+        self.game = self._deal(draws)
+        self.turn = 0
+        self.driver = HeadlessDriver(self.game, self.ui, self._choose)
+        self.driver.start()
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.loads(line) for line in f if line.strip())
+
+    def _deal(self, draws):
+        header = self.header
+        deck = Deck()
+        deck.rng = _ScriptedRandom(deck, draws)
+        for card in header["deck"]:
+            deck.add(Card(card))
+
+        af = ActionFactory()
+        players = [Player(name, deck, af, self.ui) for name in header["players"]]
+        for p, hand, coins in zip(players, header["hands"], header["coins"]):
+            p.player_list = players
+            p.coins = coins
+            for card in hand:
+                p.add_card(Card(card))
+
+        game = Game(players=players, ui=self.ui)
+        game.turn_queue.clear()
+        game.turn_queue.extend(players[s] for s in header["order"])
+        return game
+
+    def _choose(self, player, prompt):
+        if not self.decisions:
+            raise ReplayError("Log ended before the game did")
+
+        seat, decision, move = self.decisions.popleft()
+        if seat != self.game.players.index(player) or decision != prompt.decision.value:
+            raise ReplayError("Expected {} from seat {}, but {} was asked for {}".format(
+                Decision(decision).name, seat, player.name, prompt.decision.name
+            ))
+
+        value = to_value(self.game, prompt.decision, move)
+        for option in prompt.options:
+            if option.value == value:
+                return option
+        raise ReplayError("Recorded move {} is not one of the options".format(value))
+
+    @property
+    def pending(self):
+        """ The next (player, prompt) waiting to be answered """
+        return self.ui.prompts[0] if self.ui.prompts else (None, None)
+
+    def step(self):
+        """ Replay a single decision """
+        player, prompt = self.pending
+        if prompt is None:
+            raise ReplayError("Nothing left to replay")
+        if prompt.decision is Decision.ACTION:
+            self.turn += 1
+        self.driver.step()
+
+    def run(self, until_turn=None):
+        """ Fast-forward until turn until_turn is about to start (or to the
+            end of the game), returning the Game """
+        while self.game.winner is None and self.decisions:
+            player, prompt = self.pending
+            if (until_turn is not None and prompt.decision is Decision.ACTION
+                    and self.turn + 1 >= until_turn):
+                break
+            self.step()
+
+        if until_turn is None and self.game.winner is not None and self.recorded_winner is not None:
+            if self.game.players.index(self.game.winner) != self.recorded_winner:
+                raise ReplayError("Replay finished with a different winner")
+
+        return self.game
+
+    def state(self):
+        """ GameState at the current decision point """
+        player, prompt = self.pending
+        return GameState.from_game(self.game, prompt, player)
+
+
+def record_game(game, ui, choose=None, seed=None, file=None, max_decisions=None):
+    """ Play a headless game to the end while recording it, returning the Recorder """
+    recorder = Recorder(game, seed=seed, file=file)
+    HeadlessDriver(game, ui, choose, max_decisions).run()
+    recorder.close()
+    return recorder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded game")
+    parser.add_argument("log")
+    parser.add_argument("-t", "--turn", type=int, default=None,
+                        help="stop as this turn starts")
+    args = parser.parse_args(argv)
+
+    replayer = Replayer.load(args.log)
+    game = replayer.run(args.turn)
+    if game.winner is not None:
+        print("{} won after {} turns".format(game.winner.name, replayer.turn))
+    else:
+        player, prompt = replayer.pending
+        print("Turn {}: {} is asked to {}".format(
+            replayer.turn + 1, player.name, prompt.decision.name.lower()
+        ))
+    for p in game.players:
+        print("  {} (Coins: {}, Cards: {})".format(p.name, p.coins, ", ".join(c.name for c in p.cards)))
+
+if __name__ == "__main__":
+    main()
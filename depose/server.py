@@ -0,0 +1,329 @@
+""" asyncio server hosting many networked tables in one process
+
+    Clients speak newline-delimited JSON over TCP:
+
+        -> {"type": "join", "name": "Alice"}
+        <- {"type": "seated", "table": 3, "players": ["Alice", ...]}
+        <- {"type": "message", "text": "GAME: Alice chose Salary"}
+        <- {"type": "prompt", "id": 7, "decision": "ACTION",
+            "prompt": "Choose an action", "options": ["Salary", ...]}
+        -> {"type": "answer", "id": 7, "index": 0}
+        <- {"type": "timeout", "id": 7}   (answer came too late, a default was used)
+        <- {"type": "over", "winner": "Alice"}
+
+    Each table drives its Game the same way HeadlessDriver does, but awaits
+    the seated client's answer between decisions, so every table in the
+    process interleaves on a single event loop.
+
+    python -m depose.server --port 8765 --players 4
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+
+from depose.headless import HeadlessUI, new_game, random_choice
+
+DECISION_TIMEOUT = 30.0 # Seconds a client has to answer a prompt
+SEND_TIMEOUT = 10.0 # Seconds a client can leave its socket unread before it's dropped
+JOIN_TIMEOUT = 10.0
+MAX_LINE = 4096 # Longest message accepted from a client
+
+
+class TableUI(HeadlessUI):
+    """ HeadlessUI which also keeps the game's messages for the clients """
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def message(self, text):
+        self.messages.append(text)
+
+
+class Connection():
+    """ One client socket, sending and receiving JSON lines
+
+        Every send waits for the socket's write buffer to drain, so a client
+        which stops reading holds up only its own table. One which stays
+        stuck for send_timeout is dropped """
+    def __init__(self, reader, writer, send_timeout=SEND_TIMEOUT):
+        self.reader = reader
+        self.writer = writer
+        self.send_timeout = send_timeout
+        self.name = None
+        self.closed = False
+        self.finished = asyncio.Event()
+        self.watcher = None # Task watching the connection while it's in the lobby
+
+    async def send(self, message):
+        if self.closed:
+            return
+        try:
+            self.writer.write(json.dumps(message).encode() + b"\n")
+            await asyncio.wait_for(self.writer.drain(), self.send_timeout)
+        except (ConnectionError, asyncio.TimeoutError):
+            self.close()
+
+    async def receive(self):
+        """ Next message from the client. Raises ConnectionError once it's gone """
+        try:
+            line = await self.reader.readline()
+        except ValueError:
+            raise ConnectionError("Line too long")
+        if not line:
+            raise ConnectionError("Connection closed")
+        try:
+            message = json.loads(line)
+        except ValueError:
+            raise ConnectionError("Malformed message")
+        if not isinstance(message, dict):
+            raise ConnectionError("Malformed message")
+        return message
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+        self.finished.set()
+
+
+class Table():
+    """ A Game between connected clients
+
+        decision_timeout -- seconds to wait for each answer
+        fallback -- callable(player, state) answering for clients which time
+            out or disconnect (defaults to a random option) """
+    def __init__(self, connections, decision_timeout=DECISION_TIMEOUT, fallback=None, rng=None, number=0):
+        self.rng = rng or random.Random()
+        self.game, self.ui = new_game(len(connections), TableUI(), rng=self.rng)
+        self.connections = connections
+        self.seats = {}
+        for player, conn in zip(self.game.players, connections):
+            if conn.name:
+                player.name = conn.name
+            self.seats[player] = conn
+
+        self.decision_timeout = decision_timeout
+        self.fallback = fallback or random_choice(self.rng)
+        self.number = number
+        self.timeouts = 0
+        self._ids = itertools.count(1)
+
+    async def broadcast(self, message):
+        await asyncio.gather(*(c.send(message) for c in self.connections))
+
+    async def _flush_messages(self):
+        messages, self.ui.messages = self.ui.messages, []
+        for text in messages:
+            await self.broadcast({"type": "message", "text": text})
+
+    async def run(self):
+        """ Play the game out, returning the winning Player """
+        await self.broadcast({
+            "type": "seated",
+            "table": self.number,
+            "players": [p.name for p in self.game.players],
+        })
+
+        self.game.play()
+        while self.game.winner is None and self.ui.prompts:
+            await self._flush_messages()
+            player, state = self.ui.prompts.popleft()
+            option = await self.ask(player, state)
+            player.handle(option.value)
+
+        await self._flush_messages()
+        winner = self.game.winner
+        await self.broadcast({"type": "over", "winner": winner.name if winner else None})
+        return winner
+
+    async def ask(self, player, state):
+        """ Send a prompt to player's client and wait for a valid answer """
+        conn = self.seats[player]
+        prompt_id = next(self._ids)
+        await conn.send({
+            "type": "prompt",
+            "id": prompt_id,
+            "decision": state.decision.name if state.decision else None,
+            "prompt": state.prompt,
+            "options": [option.label for option in state.options],
+        })
+
+        if not conn.closed:
+            try:
+                index = await asyncio.wait_for(self._answer(conn, prompt_id, state), self.decision_timeout)
+                return state.options[index]
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                await conn.send({"type": "timeout", "id": prompt_id})
+            except ConnectionError:
+                conn.close()
+
+        return self.fallback(player, state)
+
+    async def _answer(self, conn, prompt_id, state):
+        while True:
+            message = await conn.receive()
+            if message.get("type") != "answer" or message.get("id") != prompt_id:
+                continue # Late answer to a prompt which already timed out
+
+            index = message.get("index")
+            if isinstance(index, int) and 0 <= index < len(state.options):
+                return index
+            await conn.send({"type": "error", "id": prompt_id, "text": "Invalid option"})
+
+
+class GameServer():
+    """ Seats clients at tables as they join and plays the tables concurrently
+
+        players_per_table -- a table starts as soon as this many have joined
+        max_tables -- tables playing at once. Full tables beyond this wait for
+            a free slot, which keeps the load on the loop bounded """
+    def __init__(self, host="127.0.0.1", port=0, players_per_table=4, max_tables=100,
+                 decision_timeout=DECISION_TIMEOUT, send_timeout=SEND_TIMEOUT, rng=None):
+        if not 2 <= players_per_table <= 6:
+            raise ValueError("Tables need between 2 and 6 players")
+
+        self.host = host
+        self.port = port
+        self.players_per_table = players_per_table
+        self.max_tables = max_tables
+        self.decision_timeout = decision_timeout
+        self.send_timeout = send_timeout
+        self.rng = rng or random.Random()
+
+        self.server = None
+        self.lobby = []
+        self.tables = set()
+        self.results = []
+        self._numbers = itertools.count(1)
+        self._slots = None
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(self.max_tables)
+        self.server = await asyncio.start_server(self._accept, self.host, self.port, limit=MAX_LINE)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        """ Stop accepting clients and wait for the running tables to finish """
+        self.server.close()
+        await self.server.wait_closed()
+        if self.tables:
+            await asyncio.gather(*self.tables, return_exceptions=True)
+
+    async def _accept(self, reader, writer):
+        conn = Connection(reader, writer, self.send_timeout)
+        try:
+            hello = await asyncio.wait_for(conn.receive(), JOIN_TIMEOUT)
+        except (ConnectionError, asyncio.TimeoutError):
+            conn.close()
+            return
+        if hello.get("type") != "join":
+            await conn.send({"type": "error", "text": "Expected join"})
+            conn.close()
+            return
+
+        conn.name = str(hello.get("name") or "Player")[:32]
+        conn.watcher = asyncio.ensure_future(self._wait_in_lobby(conn))
+        self.lobby.append(conn)
+        self._seat_table()
+
+        # The connection belongs to its table from here on
+        await conn.finished.wait()
+
+    async def _wait_in_lobby(self, conn):
+        """ Watch a client waiting for a table, dropping it from the lobby if
+            it disconnects. Nothing it sends means anything until it's seated """
+        try:
+            while True:
+                await conn.receive()
+        except ConnectionError:
+            conn.close()
+            if conn in self.lobby:
+                self.lobby.remove(conn)
+
+    def _seat_table(self):
+        """ Start a table if enough clients are still connected in the lobby """
+        for conn in self.lobby:
+            if conn.reader.at_eof():
+                conn.close() # Gone, though its watcher hasn't noticed yet
+        self.lobby = [conn for conn in self.lobby if not conn.closed]
+        if len(self.lobby) < self.players_per_table:
+            return
+
+        seats = self.lobby[:self.players_per_table]
+        del self.lobby[:self.players_per_table]
+        for conn in seats:
+            # The table reads from the connection from here on
+            conn.watcher.cancel()
+        task = asyncio.ensure_future(self._host(seats))
+        self.tables.add(task)
+        task.add_done_callback(self.tables.discard)
+
+    async def _host(self, seats):
+        async with self._slots:
+            table = Table(
+                seats,
+                decision_timeout=self.decision_timeout,
+                rng=random.Random(self.rng.getrandbits(64)),
+                number=next(self._numbers),
+            )
+            try:
+                winner = await table.run()
+                self.results.append((table.number, winner.name if winner else None))
+            finally:
+                for conn in seats:
+                    conn.close()
+
+
+async def play_client(host, port, name, choose=None):
+    """ Simple client which joins a table and answers every prompt, returning
+        the winner's name
+
+        choose -- callable(prompt message) returning an option index
+            (defaults to a random one) """
+    rng = random.Random()
+    choose = choose or (lambda message: rng.randrange(len(message["options"])))
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(json.dumps({"type": "join", "name": name}).encode() + b"\n")
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return None
+            message = json.loads(line)
+            if message["type"] == "prompt":
+                answer = {"type": "answer", "id": message["id"], "index": choose(message)}
+                writer.write(json.dumps(answer).encode() + b"\n")
+                await writer.drain()
+            elif message["type"] == "over":
+                return message["winner"]
+    finally:
+        writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Host networked Depose tables")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("-p", "--players", type=int, default=4, help="players per table")
+    parser.add_argument("--max-tables", type=int, default=100)
+    parser.add_argument("-t", "--timeout", type=float, default=DECISION_TIMEOUT,
+                        help="seconds allowed per decision")
+    args = parser.parse_args(argv)
+
+    server = GameServer(args.host, args.port, args.players, args.max_tables, args.timeout)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+""" Batch self-play between automated policies
+
+    python -m depose.sim --games 10000 --policies honest aggressive random random
+"""
+import argparse
+import json
+import random
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from depose.actions import COUNTERS
+from depose.headless import HeadlessDriver, new_game
+from depose.model import Decision
+from depose.policies import POLICIES, create_policy
+
+MAX_DECISIONS = 10000 # Games still going after this many decisions count as draws
+
+
+class Summary():
+    """ Aggregate results for a batch of games. Summaries from different
+        batches (or processes) can be merged together """
+    def __init__(self):
+        self.games = 0
+        self.draws = 0
+        self.turns = 0
+        self.seat_games = Counter()
+        self.seat_wins = Counter()
+        self.policy_games = Counter()
+        self.policy_wins = Counter()
+        self.lengths = Counter() # Number of games lasting n turns
+        self.actions = Counter()
+
+    def record(self, seat_policies, winner_seat, turns, actions):
+        self.games += 1
+        self.turns += turns
+        self.lengths[turns] += 1
+        self.actions.update(actions)
+
+        for seat, policy in enumerate(seat_policies):
+            self.seat_games[seat] += 1
+            self.policy_games[policy] += 1
+
+        if winner_seat is None:
+            self.draws += 1
+        else:
+            self.seat_wins[winner_seat] += 1
+            self.policy_wins[seat_policies[winner_seat]] += 1
+
+    def merge(self, other):
+        self.games += other.games
+        self.draws += other.draws
+        self.turns += other.turns
+        for name in ["seat_games", "seat_wins", "policy_games", "policy_wins", "lengths", "actions"]:
+            getattr(self, name).update(getattr(other, name))
+        return self
+
+    @property
+    def mean_turns(self):
+        return self.turns / self.games if self.games else 0.0
+
+    def seat_win_rates(self):
+        return {s: self.seat_wins[s] / n for s, n in sorted(self.seat_games.items())}
+
+    def policy_win_rates(self):
+        """ Fraction of seats held by each policy which went on to win """
+        return {p: self.policy_wins[p] / n for p, n in sorted(self.policy_games.items())}
+
+    def action_frequencies(self):
+        total = sum(self.actions.values())
+        if not total:
+            return {}
+        return {a: n / total for a, n in self.actions.most_common()}
+
+    def to_dict(self):
+        return {
+            "games": self.games,
+            "draws": self.draws,
+            "mean_turns": self.mean_turns,
+            "seat_win_rates": self.seat_win_rates(),
+            "policy_win_rates": self.policy_win_rates(),
+            "lengths": dict(sorted(self.lengths.items())),
+            "actions": dict(self.actions.most_common()),
+        }
+
+
+def play_one(seed, seat_policies):
+    """ Play a single seeded game, returning (winner_seat, turns, action counts) """
+    rng = random.Random(seed)
+    game, ui = new_game(len(seat_policies), rng=random.Random(rng.getrandbits(64)))
+    agents = {}
+    for player, name in zip(game.players, seat_policies):
+        agents[player] = create_policy(name, random.Random(rng.getrandbits(64)))
+        agents[player].start(game, player)
+
+    actions = Counter()
+    turns = 0
+    def choose(player, state):
+        nonlocal turns
+        option = agents[player].choose(player, state)
+        if state.decision is Decision.ACTION:
+            turns += 1
+            actions[option.value] += 1
+        elif state.decision is Decision.COUNTER and option.value:
+            # Counter-actions aren't chosen as actions, but are used all the same
+            actions[COUNTERS[state.action.name].upper()] += 1
+        return option
+
+    try:
+        winner = HeadlessDriver(game, ui, choose, MAX_DECISIONS).run()
+    finally:
+        for agent in agents.values():
+            agent.close()
+    winner_seat = game.players.index(winner) if winner is not None else None
+    return winner_seat, turns, actions
+
+def seating(policies, game_number):
+    """ Rotate the policies around the table so no policy keeps the same seat """
+    shift = game_number % len(policies)
+    return policies[shift:] + policies[:shift]
+
+def run_batch(batch):
+    """ Play games [start, stop) and summarise them. Runs inside a worker process """
+    start, stop, policies, seed = batch
+    summary = Summary()
+    for g in range(start, stop):
+        seat_policies = seating(policies, g)
+        summary.record(seat_policies, *play_one(seed + g, seat_policies))
+    return summary
+
+def simulate(num_games, policies, workers=None, seed=0, batch_size=250):
+    """ Play num_games spread across a process pool, yielding a Summary per
+        finished batch as results come back
+
+        policies -- list of policy names, one per seat
+        workers -- number of processes (1 plays everything in this process) """
+    for name in policies:
+        if name not in POLICIES:
+            raise ValueError("Unknown policy: {}".format(name))
+
+    batches = [
+        (start, min(start + batch_size, num_games), list(policies), seed)
+        for start in range(0, num_games, batch_size)
+    ]
+
+    if workers == 1:
+        yield from map(run_batch, batches)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # As each finishes, so one slow batch doesn't hold up the rest
+            for future in as_completed([executor.submit(run_batch, b) for b in batches]):
+                yield future.result()
+
+def run(num_games, policies, workers=None, seed=0, batch_size=250):
+    """ Play num_games and return the merged Summary """
+    total = Summary()
+    for summary in simulate(num_games, policies, workers, seed, batch_size):
+        total.merge(summary)
+    return total
+
+
+def format_summary(summary):
+    lines = [
+        "Games: {} (draws: {}), mean length {:.1f} turns".format(
+            summary.games, summary.draws, summary.mean_turns
+        ),
+        "Win rate by seat:",
+    ]
+    lines += ["  {}: {:.1%}".format(s + 1, r) for s, r in summary.seat_win_rates().items()]
+    lines.append("Win rate by policy:")
+    lines += ["  {}: {:.1%}".format(p, r) for p, r in summary.policy_win_rates().items()]
+    lines.append("Actions:")
+    lines += ["  {}: {:.1%}".format(a, r) for a, r in summary.action_frequencies().items()]
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch self-play between automated policies")
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("-p", "--policies", nargs="+", default=["random"] * 4,
+                        choices=sorted(POLICIES), help="one policy per seat (2-6)")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=250)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    if not 2 <= len(args.policies) <= 6:
+        parser.error("between 2 and 6 policies are needed")
+
+    total = Summary()
+    for summary in simulate(args.games, args.policies, args.workers, args.seed, args.batch_size):
+        total.merge(summary)
+        print("{}/{} games".format(total.games, args.games), file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(total.to_dict()))
+    else:
+        print(format_summary(total))
+
+if __name__ == "__main__":
+    main()
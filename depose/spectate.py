@@ -0,0 +1,208 @@
+""" Watch bots play each other without tying the game to Tk
+
+    The game runs in a worker thread at full speed and pushes a Snapshot
+    after every decision, and the messages logged since the previous one
+    onto a queue of their own. The Tk side polls for them with after() at a
+    fixed frame rate, renders only the newest Snapshot and writes out every
+    message, including those of the frames it skipped.
+
+    python -m depose.spectate --policies honest aggressive random random
+"""
+import argparse
+import random
+import threading
+import time
+from collections import deque, namedtuple
+
+from depose.events import Channel
+from depose.headless import HeadlessDriver, HeadlessUI, new_game
+from depose.model import Decision
+from depose.policies import POLICIES, create_policy
+from depose.sim import MAX_DECISIONS
+
+# seats: (name, coins, cards) per player, active: name of the player whose
+# turn it is
+Snapshot = namedtuple("Snapshot", ["turn", "seats", "active", "prompt", "winner"])
+
+MAX_FRAMES = 1000 # Frames buffered before the oldest are dropped
+
+
+class SpectatorUI(HeadlessUI):
+    """ HeadlessUI which collects the game's messages between snapshots """
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.active_player = None
+
+    def update_active_player(self, player):
+        self.active_player = player
+
+    def message(self, text):
+        self.messages.append(text)
+
+
+class GameThread(threading.Thread):
+    """ Plays one game between policies, publishing a Snapshot per decision
+
+        frames -- deque the snapshots are appended to. It's bounded, so if
+            nothing reads it the oldest frames are dropped instead of
+            holding up the game
+        messages -- deque the game's messages are appended to as each
+            snapshot is taken. Unbounded, so none are lost with the frames
+        delay -- seconds to pause after each decision (0 for full speed) """
+    def __init__(self, policies, seed=None, delay=0, max_decisions=MAX_DECISIONS, frames=None,
+                 messages=None):
+        super().__init__(daemon=True)
+        rng = random.Random(seed)
+        self.game, self.ui = new_game(len(policies), SpectatorUI(), rng=random.Random(rng.getrandbits(64)))
+        self.agents = {
+            player: create_policy(name, random.Random(rng.getrandbits(64)))
+            for player, name in zip(self.game.players, policies)
+        }
+        for player, agent in self.agents.items():
+            agent.start(self.game, player)
+        self.driver = HeadlessDriver(self.game, self.ui, self.choose, max_decisions)
+        self.frames = frames if frames is not None else deque(maxlen=MAX_FRAMES)
+        self.messages = messages if messages is not None else deque()
+        self.delay = delay
+        self.turn = 0
+        self._halt = threading.Event()
+
+    def choose(self, player, state):
+        return self.agents[player].choose(player, state)
+
+    def snapshot(self):
+        game = self.game
+        prompt = None
+        if self.ui.prompts:
+            player, state = self.ui.prompts[0]
+            prompt = "{}: {}".format(player.name, state.prompt)
+        active = self.ui.active_player
+        self.messages.extend(self.ui.messages)
+        self.ui.messages = []
+        return Snapshot(
+            turn=self.turn,
+            seats=[(p.name, p.coins, tuple(p.cards)) for p in game.players],
+            active=active.name if active else None,
+            prompt=prompt,
+            winner=game.winner.name if game.winner else None,
+        )
+
+    def run(self):
+        try:
+            self.play()
+        finally:
+            for agent in self.agents.values():
+                agent.close()
+
+    def play(self):
+        self.driver.start()
+        self.frames.append(self.snapshot())
+        while self.game.winner is None and self.ui.prompts and not self._halt.is_set():
+            limit = self.driver.max_decisions
+            if limit is not None and self.driver.decisions >= limit:
+                break
+            if self.ui.prompts[0][1].decision is Decision.ACTION:
+                self.turn += 1
+            self.driver.step()
+            self.frames.append(self.snapshot())
+            if self.delay:
+                time.sleep(self.delay)
+
+    def stop(self):
+        self._halt.set()
+
+
+def drain(frames, messages):
+    """ Take every buffered frame and message, returning (newest Snapshot or
+        None, list of messages). Frames are taken first, so no message is
+        left behind for a frame which has been taken """
+    latest = None
+    while frames:
+        latest = frames.popleft()
+    lines = []
+    while messages:
+        lines.append(messages.popleft())
+    return latest, lines
+
+
+class SeatView():
+    """ Stands in for a Player in the PlayerPanel, holding the last
+        rendered values so the worker's Players are never read from Tk """
+    def __init__(self, name):
+        self.name = name
+        self.coins = 0
+        self.cards = ()
+        self.change_obs = Channel("notify_coins", "notify_cards")
+
+    def add_change_observer(self, obs):
+        self.change_obs.add(obs)
+
+    def update(self, coins, cards):
+        if coins != self.coins:
+            self.coins = coins
+            self.change_obs.notify("notify_coins", self)
+        if cards != self.cards:
+            self.cards = cards
+            self.change_obs.notify("notify_cards", self)
+
+
+class Spectator():
+    """ Renders a GameThread in a GUI at a fixed frame rate """
+    def __init__(self, gui, thread, fps=30):
+        self.gui = gui
+        self.thread = thread
+        self.interval = max(1, int(1000 / fps))
+        self.frames_rendered = 0
+
+        self.views = [SeatView(p.name) for p in thread.game.players]
+        self._views = {v.name: v for v in self.views} # Names are unique at a table
+        gui.attach_player_panel(self.views)
+
+    def start(self):
+        self.thread.start()
+        self.gui.master.after(self.interval, self.poll)
+
+    def poll(self):
+        snapshot, messages = drain(self.thread.frames, self.thread.messages)
+        for text in messages:
+            self.gui.message(text)
+        if snapshot is not None:
+            self.render(snapshot)
+
+        if self.thread.is_alive() or self.thread.frames or self.thread.messages:
+            self.gui.master.after(self.interval, self.poll)
+
+    def render(self, snapshot):
+        for view, (name, coins, cards) in zip(self.views, snapshot.seats):
+            view.update(coins, cards)
+        self.gui.update_active_player(self._views.get(snapshot.active))
+
+        if snapshot.winner is not None:
+            self.gui.show_prompt("{} wins after {} turns".format(snapshot.winner, snapshot.turn))
+        else:
+            self.gui.show_prompt("Turn {}. {}".format(snapshot.turn, snapshot.prompt or ""))
+        self.frames_rendered += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch automated policies play")
+    parser.add_argument("-p", "--policies", nargs="+", default=["honest", "aggressive", "random", "random"],
+                        choices=sorted(POLICIES), help="one policy per seat (2-6)")
+    parser.add_argument("-s", "--seed", type=int, default=None)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--delay", type=float, default=0, help="seconds to pause after each decision")
+    args = parser.parse_args(argv)
+
+    if not 2 <= len(args.policies) <= 6:
+        parser.error("between 2 and 6 policies are needed")
+
+    from depose.view import GUI
+    gui = GUI()
+    spectator = Spectator(gui, GameThread(args.policies, args.seed, args.delay), args.fps)
+    spectator.start()
+    gui.mainloop()
+    spectator.thread.stop()
+
+if __name__ == "__main__":
+    main()
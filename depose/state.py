@@ -0,0 +1,545 @@
+""" Compact, copyable game state for search and rollouts
+
+    A GameState packs everything about a game into a handful of bytearrays
+    and small ints, and steps through the same decision sequence as the
+    Game / Player / ActionDecorator objects: choose an action, pick a
+    target, then the challenge and counter queries, reveals, lost lives and
+    returned cards. Copying one is a few slice operations, so a bot can
+    clone and play out positions without touching the real Game.
+"""
+import random
+
+from depose.actions import CLAIM_MASKS
+from depose.model import Card, Decision
+
+NONE = -1
+OVER = 0 # Phase once the game has a winner
+
+# Action codes, in the order Player offers them. Option values map to code - 1
+ACTIONS = [
+    "SALARY", "DONATIONS", "TITHE", "DEPOSE", "MUG", "MURDER", "DIPLOMACY",
+    "COUNTER DONATIONS", "COUNTER MUG", "COUNTER MURDER",
+]
+ACTION_CODES = {value: code for code, value in enumerate(ACTIONS, 1)}
+(SALARY, DONATIONS, TITHE, DEPOSE, MUG, MURDER, DIPLOMACY,
+    COUNTER_DONATIONS, COUNTER_MUG, COUNTER_MURDER) = range(1, len(ACTIONS) + 1)
+
+COUNTER_OF = {
+    DONATIONS: COUNTER_DONATIONS,
+    MUG: COUNTER_MUG,
+    MURDER: COUNTER_MURDER,
+}
+
+# Bitmask of Card values which can perform each action, indexed by code
+JUSTIFY = [0] + [CLAIM_MASKS[value.title()] for value in ACTIONS]
+
+# Phases each action passes through before it's performed (the decorator chain)
+ACTION, TARGET, CHALLENGE, COUNTER, REVEAL, LOSE_LIFE, RETURN = (d.value for d in Decision)
+STAGES = {
+    SALARY: (),
+    DONATIONS: (COUNTER,),
+    TITHE: (CHALLENGE,),
+    DEPOSE: (TARGET,),
+    MUG: (TARGET, CHALLENGE, COUNTER),
+    MURDER: (TARGET, CHALLENGE, COUNTER),
+    DIPLOMACY: (CHALLENGE,),
+}
+
+# What happens once a LOSE_LIFE decision is made
+CLAIM_HELD, CLAIM_FAILED, PERFORMED = 1, 2, 3
+
+HAND_SIZE = 4 # Two cards, plus two more while in the middle of Diplomacy
+BASE_ACTIONS = (SALARY, DONATIONS, TITHE, MUG, DIPLOMACY)
+
+
+class GameState():
+    """ Snapshot of a game at a single decision point
+
+        Players are referred to by seat (their index in Game.players), cards
+        by their Card value. phase is the Decision value of the pending
+        prompt and player is the seat which has to answer it """
+    __slots__ = (
+        "coins", "hands", "deck", "order", "queue",
+        "phase", "player", "action", "target", "stage",
+        "claim", "claimant", "countered", "challenger",
+        "after", "returns", "winner",
+    )
+
+    def __init__(self, num_players):
+        self.coins = bytearray(num_players)
+        self.hands = bytearray(num_players * HAND_SIZE)
+        self.deck = bytearray(len(Card) + 1) # Indexed by Card value
+        self.order = bytes(range(num_players)) # Turn order, active player first
+        self.queue = b"" # Players still to be asked in a challenge / counter query
+        self._start_turn()
+
+    def _start_turn(self):
+        self.phase = ACTION
+        self.player = self.order[0]
+        self.action = 0
+        self.target = NONE
+        self.stage = NONE
+        self.claim = 0
+        self.claimant = NONE
+        self.countered = False
+        self.challenger = NONE
+        self.after = 0
+        self.returns = 0
+        self.winner = NONE
+
+    def copy(self):
+        s = GameState.__new__(GameState)
+        s.coins = self.coins[:]
+        s.hands = self.hands[:]
+        s.deck = self.deck[:]
+        s.order = self.order
+        s.queue = self.queue
+        s.phase = self.phase
+        s.player = self.player
+        s.action = self.action
+        s.target = self.target
+        s.stage = self.stage
+        s.claim = self.claim
+        s.claimant = self.claimant
+        s.countered = self.countered
+        s.challenger = self.challenger
+        s.after = self.after
+        s.returns = self.returns
+        s.winner = self.winner
+        return s
+
+    __copy__ = copy
+
+    @property
+    def num_players(self):
+        return len(self.coins)
+
+    @property
+    def decision(self):
+        """ The pending Decision, or None once the game is over """
+        return Decision(self.phase) if self.phase != OVER else None
+
+    def __eq__(self, other):
+        return all(getattr(self, n) == getattr(other, n) for n in self.__slots__)
+
+    """ Hands """
+    def cards(self, seat):
+        base = seat * HAND_SIZE
+        return [c for c in self.hands[base:base + HAND_SIZE] if c]
+
+    def num_cards(self, seat):
+        base = seat * HAND_SIZE
+        return HAND_SIZE - self.hands[base:base + HAND_SIZE].count(0)
+
+    def add_card(self, seat, card):
+        base = seat * HAND_SIZE
+        slot = self.hands.index(0, base, base + HAND_SIZE)
+        self.hands[slot] = card
+
+    def remove_card(self, seat, card):
+        """ Remove the first copy of card, keeping the rest in order """
+        base, end = seat * HAND_SIZE, (seat + 1) * HAND_SIZE
+        try:
+            slot = self.hands.index(card, base, end)
+        except ValueError:
+            raise ValueError("Seat {} does not hold {}".format(seat, Card(card).name))
+        self.hands[slot:end] = self.hands[slot + 1:end] + b"\0"
+
+    """ Moves """
+    def moves(self):
+        """ Legal answers to the pending decision, in the order Player offers them """
+        phase = self.phase
+        if phase == ACTION:
+            coins = self.coins[self.player]
+            if coins >= 10:
+                return (DEPOSE,)
+            moves = BASE_ACTIONS
+            if coins >= 3:
+                moves += (MURDER,)
+            if coins >= 7:
+                moves += (DEPOSE,)
+            return moves
+        elif phase == TARGET:
+            return tuple(s for s in range(self.num_players)
+                         if s != self.player and self.num_cards(s))
+        elif phase == CHALLENGE or phase == COUNTER:
+            return (1, 0)
+        elif phase == OVER:
+            return ()
+        else:
+            return tuple(dict.fromkeys(self.cards(self.player)))
+
+    def step(self, move, rng=random):
+        """ Answer the pending decision, advancing to the next one
+
+            rng -- source of randomness for cards drawn from the deck """
+        phase = self.phase
+        if phase == ACTION:
+            self.action = move
+            self.stage = NONE
+            self._advance(rng)
+        elif phase == TARGET:
+            self.target = move
+            self._advance(rng)
+        elif phase == CHALLENGE:
+            if move:
+                self.challenger = self.player
+                self.queue = b""
+                self.phase = REVEAL
+                self.player = self.claimant
+            else:
+                self._ask_next(rng)
+        elif phase == COUNTER:
+            if move:
+                # The counter-action can itself be challenged by anyone else
+                self.countered = True
+                self.claim = COUNTER_OF[self.action]
+                self.claimant = self.player
+                self._query(CHALLENGE, self.player, rng)
+            else:
+                self._ask_next(rng)
+        elif phase == REVEAL:
+            if JUSTIFY[self.claim] >> move & 1:
+                self._lose_life(self.challenger, CLAIM_HELD, rng)
+            else:
+                self._lose_life(self.claimant, CLAIM_FAILED, rng)
+        elif phase == LOSE_LIFE:
+            self.remove_card(self.player, move)
+            self._after_loss(rng)
+        elif phase == RETURN:
+            self.remove_card(self.player, move)
+            self.deck[move] += 1
+            self.returns -= 1
+            if self.returns <= 0:
+                self._end_turn()
+        else:
+            raise ValueError("The game is over")
+
+    def _advance(self, rng):
+        """ Move on to the next decorator in the action's chain """
+        self.stage += 1
+        self.challenger = NONE
+        self.after = 0
+        stages = STAGES[self.action]
+        if self.stage >= len(stages):
+            self._perform(rng)
+            return
+
+        stage = stages[self.stage]
+        actor = self.order[0]
+        if stage == TARGET:
+            self.phase = TARGET
+            self.player = actor
+        elif stage == CHALLENGE:
+            self.claim = self.action
+            self.claimant = actor
+            self._query(CHALLENGE, actor, rng)
+        else:
+            self.claim = self.action
+            self.claimant = actor
+            if self.target != NONE:
+                # Only the target can block targeted actions
+                self.queue = bytes([self.target]) if self.num_cards(self.target) else b""
+                self.phase = COUNTER
+                self._ask_next(rng)
+            else:
+                self._query(COUNTER, actor, rng)
+
+    def _query(self, phase, excluding, rng):
+        """ Ask everyone else still holding cards, in seat order """
+        self.queue = bytes(s for s in range(self.num_players)
+                           if s != excluding and self.num_cards(s))
+        self.phase = phase
+        self._ask_next(rng)
+
+    def _ask_next(self, rng):
+        if self.queue:
+            self.player = self.queue[0]
+            self.queue = self.queue[1:]
+        elif self.phase == CHALLENGE and self.countered:
+            # Unchallenged counter-action stops the action
+            self._end_turn()
+        else:
+            self._advance(rng)
+
+    def _lose_life(self, seat, after, rng):
+        self.after = after
+        if self.num_cards(seat):
+            self.phase = LOSE_LIFE
+            self.player = seat
+        else:
+            self._after_loss(rng)
+
+    def _after_loss(self, rng):
+        after = self.after
+        if after == PERFORMED:
+            self._end_turn()
+        elif (after == CLAIM_HELD) != self.countered:
+            # Action's claim held up, or a counter's claim fell through
+            self._advance(rng)
+        else:
+            self._end_turn()
+
+    def _perform(self, rng):
+        self.claim = 0
+        self.claimant = NONE
+        self.countered = False
+
+        action = self.action
+        actor = self.order[0]
+        coins = self.coins
+        if action == SALARY:
+            coins[actor] = min(255, coins[actor] + 1)
+        elif action == DONATIONS:
+            coins[actor] = min(255, coins[actor] + 2)
+        elif action == TITHE:
+            coins[actor] = min(255, coins[actor] + 3)
+        elif action == MUG:
+            theft = min(2, coins[self.target])
+            coins[actor] = min(255, coins[actor] + theft)
+            coins[self.target] -= theft
+        elif action == DEPOSE or action == MURDER:
+            coins[actor] = max(0, coins[actor] - (7 if action == DEPOSE else 3))
+            self._lose_life(self.target, PERFORMED, rng)
+            return
+        elif action == DIPLOMACY:
+            self.returns = 0
+            for _ in range(2):
+                card = self.draw(rng)
+                if card:
+                    self.add_card(actor, card)
+                    self.returns += 1
+            if self.returns:
+                self.phase = RETURN
+                self.player = actor
+                return
+
+        self._end_turn()
+
+    def draw(self, rng=random):
+        """ Take a random card from the deck, returning its value (0 if empty) """
+        deck = self.deck
+        total = sum(deck)
+        if not total:
+            return 0
+        r = rng.randrange(total)
+        for card in range(1, len(deck)):
+            r -= deck[card]
+            if r < 0:
+                deck[card] -= 1
+                return card
+
+    def _end_turn(self):
+        order = self.order[1:] + self.order[:1]
+        self.order = bytes(s for s in order if self.num_cards(s))
+        self.queue = b""
+        if len(self.order) == 1:
+            self.phase = OVER
+            self.player = NONE
+            self.winner = self.order[0]
+        else:
+            self._start_turn()
+
+    """ Conversion to / from Game objects """
+    @classmethod
+    def from_game(cls, game, prompt=None, player=None):
+        """ Capture game's state
+
+            Between turns (or while the active player chooses an action) the
+            game alone is enough. Mid-turn, pass the pending OptionListState
+            and the Player it was shown to as well """
+        s = cls(len(game.players))
+        for i, p in enumerate(game.players):
+            s.coins[i] = min(255, p.coins)
+            for card in p.cards:
+                s.add_card(i, card.value)
+        for card in game.players[0].deck.cards:
+            s.deck[card.value] += 1
+
+        s.load_turn(game, prompt, player)
+        return s
+
+    def load_turn(self, game, prompt=None, player=None):
+        """ Fill in the turn order and pending decision from game, leaving
+            coins, hands and the deck alone (see from_game) """
+        seat = {p: i for i, p in enumerate(game.players)}
+        order = [seat[p] for p in game.turn_queue]
+        active = getattr(game, "active_player", None)
+        if active is not None and active not in game.turn_queue:
+            order.insert(0, seat[active])
+        self.order = bytes(order)
+
+        if game.winner is not None:
+            self.phase = OVER
+            self.player = NONE
+            self.winner = seat[game.winner]
+        elif prompt is not None and prompt.decision is not Decision.ACTION:
+            self._load_prompt(game, prompt, seat[player], seat)
+        elif game.current_action is not None:
+            raise ValueError("The pending prompt is needed to capture a game mid-turn")
+        else:
+            self._start_turn()
+
+    def _load_prompt(self, game, prompt, player, seat):
+        top = game.current_action
+        self.phase = prompt.decision.value
+        self.player = player
+        self.action = ACTION_CODES[top.name.upper()]
+        self.target = seat.get(_chain_target(top), NONE)
+        stages = STAGES[self.action]
+
+        if self.phase == TARGET:
+            self.stage = stages.index(TARGET)
+        elif self.phase in (CHALLENGE, COUNTER):
+            self._load_claim(prompt.action, seat)
+            self.queue = bytes(seat[q.args[0]] for _, q in game.questions)
+        elif self.phase == REVEAL:
+            self._load_claim(prompt.action, seat)
+            self.challenger = seat[game.challenger]
+        elif self.phase == LOSE_LIFE and game in game.players[player].state_obs:
+            # Lost a challenge
+            self._load_claim(game.action, seat)
+            self.challenger = seat[game.challenger]
+            self.after = CLAIM_HELD if player == self.challenger else CLAIM_FAILED
+        else:
+            self.stage = len(stages)
+            if self.phase == LOSE_LIFE:
+                self.after = PERFORMED
+            else:
+                returned = [o.returned_count for o in game.players[player].state_obs
+                            if hasattr(o, "returned_count")]
+                self.returns = 2 - returned[0]
+
+    def _load_claim(self, action, seat):
+        """ Fill in claim details for a challenge / counter on action """
+        stages = STAGES[self.action]
+        self.claim = ACTION_CODES[action.name.upper()]
+        self.claimant = seat[action.actor]
+        self.countered = self.claim != self.action
+        if self.countered or self.phase == COUNTER:
+            self.stage = stages.index(COUNTER)
+        else:
+            self.stage = stages.index(CHALLENGE)
+
+    def apply_to(self, game):
+        """ Write this state back into game's Players, Deck and turn queue
+
+            Only possible between turns; call game.play() afterwards to start
+            the active player's turn """
+        if self.phase not in (ACTION, OVER):
+            raise ValueError("Only states between turns can be applied to a Game")
+
+        players = game.players
+        for i, p in enumerate(players):
+            p.coins = self.coins[i]
+            p.set_cards([Card(c) for c in self.cards(i)])
+
+        deck = players[0].deck
+        deck.cards = []
+        for card in Card:
+            for _ in range(self.deck[card.value]):
+                deck.add(card)
+
+        game.turn_queue.clear()
+        game.turn_queue.extend(players[s] for s in self.order)
+        game.active_player = None
+        game.current_action = None
+        game.winner = players[self.winner] if self.winner != NONE else None
+
+    def to_game(self, ui, names=None):
+        """ Build a fresh Game (with its own Deck and Players) in this state """
+        from depose.actions import ActionFactory
+        from depose.game import Game
+        from depose.model import Deck
+        from depose.player import Player
+
+        names = names or ["Player {}".format(i + 1) for i in range(self.num_players)]
+        deck = Deck()
+        af = ActionFactory()
+        players = [Player(name, deck, af, ui) for name in names]
+        for p in players:
+            p.player_list = players
+
+        game = Game(players=players, ui=ui)
+        self.apply_to(game)
+        return game
+
+
+# Moves which don't depend on anything but the phase (and coin bracket)
+RESPONSES = (1, 0)
+ACTION_MOVES = (
+    BASE_ACTIONS,
+    BASE_ACTIONS + (MURDER,),
+    BASE_ACTIONS + (MURDER, DEPOSE),
+    (DEPOSE,),
+)
+_ALIVE = bytes([0] + [1] * 255) # Card value in a hand's first slot -> still playing
+_moves_cache = {}
+
+def move_key(state):
+    """ Small key capturing everything which decides state's legal moves:
+        the coin bracket for actions, who's left to target, or the hand the
+        answer has to come from """
+    phase = state.phase
+    if phase == ACTION:
+        coins = state.coins[state.player]
+        return (ACTION, 3 if coins >= 10 else 2 if coins >= 7 else 1 if coins >= 3 else 0)
+    elif phase == TARGET:
+        # Hands are packed from their first slot, so it's empty once a player is out
+        return (TARGET, state.player, bytes(state.hands[::HAND_SIZE].translate(_ALIVE)))
+    elif phase in (CHALLENGE, COUNTER, OVER):
+        return (phase,)
+    else:
+        base = state.player * HAND_SIZE
+        return (phase, bytes(state.hands[base:base + HAND_SIZE]))
+
+def legal_moves(state):
+    """ Legal answers to the pending decision, the same as GameState.moves()
+
+        Results are shared tuples: fixed ones for actions and challenge /
+        counter answers, and the rest memoized on move_key, so search can
+        ask millions of times without rebuilding them """
+    phase = state.phase
+    if phase == CHALLENGE or phase == COUNTER:
+        return RESPONSES
+    elif phase == ACTION:
+        coins = state.coins[state.player]
+        return ACTION_MOVES[3 if coins >= 10 else 2 if coins >= 7 else 1 if coins >= 3 else 0]
+
+    key = move_key(state)
+    moves = _moves_cache.get(key)
+    if moves is None:
+        moves = _moves_cache[key] = state.moves()
+    return moves
+
+
+def _chain_target(action):
+    """ Find the target stored somewhere in a decorator chain """
+    while action is not None:
+        target = getattr(action, "target", None)
+        if target is not None:
+            return target
+        action = getattr(action, "base_action", None)
+    return None
+
+def to_move(game, decision, value):
+    """ Encode an Option value as a GameState move """
+    if decision is Decision.ACTION:
+        return ACTION_CODES[value]
+    elif decision is Decision.TARGET:
+        return game.players.index(value)
+    elif decision in (Decision.CHALLENGE, Decision.COUNTER):
+        return int(value)
+    else:
+        return value.value
+
+def to_value(game, decision, move):
+    """ Decode a GameState move back into an Option value """
+    if decision is Decision.ACTION:
+        return ACTIONS[move - 1]
+    elif decision is Decision.TARGET:
+        return game.players[move]
+    elif decision in (Decision.CHALLENGE, Decision.COUNTER):
+        return bool(move)
+    else:
+        return Card(move)
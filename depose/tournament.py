@@ -0,0 +1,547 @@
+""" Tournaments between automated policies, with Elo and TrueSkill ratings
+
+    Each entrant is a policy (see depose.policies). A tournament is played
+    in rounds of matches, where a match is a few games between the same
+    table_size entrants with the seats turned round between games: each
+    rotation of the table in turn, then the next arrangement, so every
+    permutation is played once games_per_match reaches table_size!
+
+        round-robin -- every group of table_size entrants plays a match
+            every round
+        swiss -- each round, entrants are seated with those closest to
+            them in the standings whom they've met least. Leftover entrants
+            sit the round out, lowest and fewest times first
+
+    A game ranks its players: the winner, then the rest in reverse order of
+    elimination. Games still going after max_decisions are drawn between
+    everyone left (honest bots can stall each other indefinitely, and
+    the games that do finish are over in well under a hundred decisions).
+    Ratings come from every pair of players in every game:
+
+        Elo -- a Bradley-Terry fit to the pairwise results (order doesn't
+            matter), centred on 0, with 95% intervals from its curvature
+        TrueSkill -- the Weng-Lin approximation of TrueSkill, updated game
+            by game, as mu +- 1.96 sigma
+
+    Finished games are appended to a checkpoint as they come back from the
+    process pool, so an interrupted tournament carries on from where it
+    stopped when it's run again with the same checkpoint.
+
+    python -m depose.tournament honest aggressive bayes random --rounds 50 -c t.jsonl
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations, permutations
+
+from depose.headless import HeadlessDriver, new_game
+from depose.policies import POLICIES, create_policy
+
+MAX_DECISIONS = 1000
+BATCH_SIZE = 50
+VERSION = 1
+
+Fixture = namedtuple("Fixture", "index round seats") # seats -- entrant names in seat order
+Result = namedtuple("Result", "index seats ranks decisions") # ranks -- 0 for the winner, per seat
+
+
+def seatings(table, games):
+    """ games seat orders for table, rotating it before rearranging it """
+    first, rest = table[0], table[1:]
+    orders = []
+    while len(orders) < games:
+        for order in permutations(rest):
+            order = (first,) + order
+            for shift in range(len(order)):
+                orders.append(order[shift:] + order[:shift])
+    return orders[:games]
+
+
+class Eliminations():
+    """ Records the order players run out of cards in """
+    def __init__(self, players):
+        self.order = []
+        for p in players:
+            p.add_change_observer(self)
+
+    def notify_coins(self, player):
+        pass
+
+    def notify_cards(self, player):
+        if not player.cards and player not in self.order:
+            self.order.append(player)
+
+
+def play_game(fixture, seed, max_decisions=MAX_DECISIONS):
+    """ Play one seeded game of fixture, returning its Result """
+    rng = random.Random(seed)
+    seats = fixture.seats
+    game, ui = new_game(len(seats), rng=random.Random(rng.getrandbits(64)), names=list(seats))
+    agents = {p: create_policy(name, random.Random(rng.getrandbits(64)))
+              for p, name in zip(game.players, seats)}
+    for player, agent in agents.items():
+        agent.start(game, player)
+    eliminations = Eliminations(game.players)
+
+    def choose(player, state):
+        return agents[player].choose(player, state)
+
+    driver = HeadlessDriver(game, ui, choose, max_decisions)
+    try:
+        driver.run()
+    finally:
+        for agent in agents.values():
+            agent.close()
+
+    # Everyone left shares first place: the winner, or all those drawing
+    last = len(seats) - 1
+    out = {p: last - k for k, p in enumerate(eliminations.order)}
+    ranks = tuple(out.get(p, 0) for p in game.players)
+    return Result(fixture.index, seats, ranks, driver.decisions)
+
+def run_batch(batch):
+    """ Play a list of fixtures. Runs inside a worker process """
+    fixtures, seed, max_decisions = batch
+    return [play_game(f, seed + f.index, max_decisions) for f in fixtures]
+
+
+class Tournament():
+    """ The schedule and results of a tournament
+
+        entrants -- distinct policy names
+        rounds -- by default 1 for round-robin, log2(entrants) for swiss
+        table_size -- players per game
+        games_per_match -- by default table_size, one game per rotation """
+    FORMATS = ("round-robin", "swiss")
+
+    def __init__(self, entrants, format="round-robin", rounds=None, table_size=2,
+                 games_per_match=None, seed=0, max_decisions=MAX_DECISIONS):
+        entrants = list(entrants)
+        for name in entrants:
+            if name not in POLICIES:
+                raise ValueError("Unknown policy: {}".format(name))
+        if len(set(entrants)) != len(entrants):
+            raise ValueError("Entrants must be distinct")
+        if format not in self.FORMATS:
+            raise ValueError("Unknown format: {}".format(format))
+        if not 2 <= table_size <= 6:
+            raise ValueError("Tables seat 2 to 6 players")
+        if len(entrants) < table_size:
+            raise ValueError("{} entrants can't fill a table of {}".format(len(entrants), table_size))
+
+        if rounds is None:
+            rounds = 1 if format == "round-robin" else max(1, math.ceil(math.log2(len(entrants))))
+        if rounds < 1 or (games_per_match is not None and games_per_match < 1):
+            raise ValueError("Tournaments need at least one round and one game per match")
+
+        self.entrants = entrants
+        self.format = format
+        self.rounds = rounds
+        self.table_size = table_size
+        self.games_per_match = games_per_match or table_size
+        self.seed = seed
+        self.max_decisions = max_decisions
+        self.results = {} # index -> Result
+
+        if format == "round-robin":
+            matches = math.comb(len(entrants), table_size)
+        else:
+            matches = len(entrants) // table_size
+        self.games_per_round = matches * self.games_per_match
+
+    def config(self):
+        """ Everything which decides the schedule, as saved in checkpoints """
+        return {
+            "version": VERSION,
+            "entrants": self.entrants,
+            "format": self.format,
+            "rounds": self.rounds,
+            "table_size": self.table_size,
+            "games_per_match": self.games_per_match,
+            "seed": self.seed,
+            "max_decisions": self.max_decisions,
+        }
+
+    @property
+    def num_games(self):
+        return self.rounds * self.games_per_round
+
+    @property
+    def finished(self):
+        return len(self.results) == self.num_games
+
+    """ Scheduling """
+    def tables(self, round):
+        """ The tables (tuples of entrants) playing a match in round. Swiss
+            rounds need every earlier round's results """
+        if self.format == "round-robin":
+            return list(combinations(self.entrants, self.table_size))
+
+        first = round * self.games_per_round
+        if any(i not in self.results for i in range(first)):
+            raise ValueError("Round {} can't be drawn before the rounds before it finish".format(round))
+        scores, met, byes = self._history(first)
+
+        seed_order = {e: i for i, e in enumerate(self.entrants)}
+        standings = sorted(self.entrants, key=lambda e: (-scores[e], seed_order[e]))
+        spare = len(standings) % self.table_size
+        if spare:
+            for e in sorted(reversed(standings), key=byes.__getitem__)[:spare]:
+                standings.remove(e)
+
+        tables = []
+        while standings:
+            table = [standings.pop(0)]
+            while len(table) < self.table_size:
+                best = min(standings, key=lambda e: sum(met[frozenset((e, s))] for s in table))
+                standings.remove(best)
+                table.append(best)
+            tables.append(tuple(table))
+        return tables
+
+    def _history(self, stop):
+        """ (score, meetings per pair, byes) from the games before index stop """
+        scores = Counter()
+        met = Counter()
+        byes = Counter()
+        for i in range(0, stop, self.games_per_match):
+            seats = self.results[i].seats
+            for pair in combinations(seats, 2):
+                met[frozenset(pair)] += 1
+        for r in range(stop // self.games_per_round):
+            played = {e for i in range(r * self.games_per_round, (r + 1) * self.games_per_round)
+                      for e in self.results[i].seats}
+            byes.update(e for e in self.entrants if e not in played)
+        for i in range(stop):
+            for name, score in zip(self.results[i].seats, game_scores(self.results[i].ranks)):
+                scores[name] += score
+        return scores, met, byes
+
+    def fixtures(self, round):
+        """ Every game of round """
+        index = round * self.games_per_round
+        fixtures = []
+        for table in self.tables(round):
+            for seats in seatings(table, self.games_per_match):
+                fixtures.append(Fixture(index, round, seats))
+                index += 1
+        return fixtures
+
+    def stages(self):
+        """ Lists of fixtures which can be played at once. Swiss rounds come
+            one at a time, each drawn once the one before has been recorded """
+        if self.format == "round-robin":
+            yield [f for r in range(self.rounds) for f in self.fixtures(r)]
+        else:
+            for r in range(self.rounds):
+                yield self.fixtures(r)
+
+    """ Results """
+    def record(self, result):
+        self.results[result.index] = result
+
+    def played(self):
+        """ Results in the order the games were scheduled """
+        return [self.results[i] for i in sorted(self.results)]
+
+    def standings(self):
+        """ [(entrant, stats)] best first, where stats has games, wins,
+            draws, score (mean share of opponents beaten), elo, elo_interval,
+            mu and mu_interval """
+        played = self.played()
+        elo = elo_ratings(self.entrants, played)
+        trueskill = TrueSkill(self.entrants)
+        for result in played:
+            trueskill.rate(result.seats, result.ranks)
+
+        stats = {e: {"games": 0, "wins": 0, "draws": 0, "score": 0.0} for e in self.entrants}
+        for result in played:
+            drawn = result.ranks.count(0) > 1
+            for name, rank, score in zip(result.seats, result.ranks, game_scores(result.ranks)):
+                s = stats[name]
+                s["games"] += 1
+                s["score"] += score
+                if rank == 0:
+                    s["draws" if drawn else "wins"] += 1
+
+        for e, s in stats.items():
+            if s["games"]:
+                s["score"] /= s["games"]
+            s["elo"], s["elo_interval"] = elo[e]
+            mu, sigma = trueskill.ratings[e]
+            s["mu"], s["mu_interval"] = mu, 1.96 * sigma
+        return sorted(stats.items(), key=lambda item: -item[1]["elo"])
+
+    """ Playing """
+    def play(self, workers=None, batch_size=BATCH_SIZE, checkpoint=None, progress=None):
+        """ Play every game not yet recorded, on a process pool
+
+            workers -- number of processes (1 plays everything in this process)
+            checkpoint -- Checkpoint to append each finished game to
+            progress -- callable(tournament), after each batch """
+        executor = None if workers == 1 else ProcessPoolExecutor(max_workers=workers)
+        try:
+            for fixtures in self.stages():
+                fixtures = [f for f in fixtures if f.index not in self.results]
+                batches = [(fixtures[i:i + batch_size], self.seed, self.max_decisions)
+                           for i in range(0, len(fixtures), batch_size)]
+                if executor is None:
+                    done = map(run_batch, batches)
+                else:
+                    done = (f.result() for f in as_completed([executor.submit(run_batch, b) for b in batches]))
+
+                for results in done:
+                    for result in results:
+                        self.record(result)
+                    if checkpoint is not None:
+                        checkpoint.write(results)
+                    if progress:
+                        progress(self)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self
+
+
+class Checkpoint():
+    """ JSON lines: the tournament's config, then one array per finished game
+
+        [index, seats, ranks, decisions]
+
+        Opening an existing checkpoint for a tournament loads the games it
+        holds into it, dropping a last line cut short by a crash """
+    def __init__(self, path, tournament):
+        self.path = path
+        config = tournament.config()
+        if os.path.exists(path) and os.path.getsize(path):
+            self._load(tournament, config)
+            self.file = open(path, "a")
+        else:
+            self.file = open(path, "w")
+            self._write(config)
+
+    def _load(self, tournament, config):
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            # Only lines which made it to their newline were finished
+            lines = data[:data.rfind(b"\n") + 1].split(b"\n")[:-1]
+            if not lines or json.loads(lines[0]) != config:
+                raise ValueError("{} is a checkpoint for a different tournament".format(self.path))
+
+            good = len(lines[0]) + 1
+            for line in lines[1:]:
+                try:
+                    index, seats, ranks, decisions = json.loads(line)
+                except ValueError:
+                    break
+                tournament.record(Result(index, tuple(seats), tuple(ranks), decisions))
+                good += len(line) + 1
+            f.truncate(good)
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def write(self, results):
+        for r in results:
+            self._write([r.index, r.seats, r.ranks, r.decisions])
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+""" Ratings """
+def game_scores(ranks):
+    """ Each player's share of their opponents beaten, ties counting half """
+    n = len(ranks) - 1
+    return [sum(1.0 if r < other else 0.5 if r == other else 0.0
+                for j, other in enumerate(ranks) if j != i) / n
+            for i, r in enumerate(ranks)]
+
+def pairwise(entrants, results):
+    """ (score, games) matrices of every entrant against every other, counting
+        each game as 1 / (players - 1) of a game between each pair, so every
+        game is worth the same to each player whatever the table size """
+    seat = {e: i for i, e in enumerate(entrants)}
+    n = len(entrants)
+    score = [[0.0] * n for _ in range(n)]
+    games = [[0.0] * n for _ in range(n)]
+    for result in results:
+        weight = 1.0 / (len(result.seats) - 1)
+        for (a, ra), (b, rb) in combinations(zip(result.seats, result.ranks), 2):
+            i, j = seat[a], seat[b]
+            s = 1.0 if ra < rb else 0.5 if ra == rb else 0.0
+            score[i][j] += weight * s
+            score[j][i] += weight * (1.0 - s)
+            games[i][j] += weight
+            games[j][i] += weight
+    return score, games
+
+ELO_PRIOR = 1.0 # Virtual drawn games between every pair which met, so unbeaten entrants stay finite
+ELO_SCALE = 400 / math.log(10)
+
+def elo_ratings(entrants, results, tolerance=1e-9, max_iterations=10000):
+    """ {entrant: (elo, 95% interval)} by maximum likelihood over the pairwise
+        results (Hunter's MM algorithm for Bradley-Terry). Intervals treat the
+        other ratings as known, so they're a little narrow """
+    score, games = pairwise(entrants, results)
+    n = len(entrants)
+    for i in range(n):
+        for j in range(n):
+            if games[i][j]:
+                score[i][j] += ELO_PRIOR / 2
+                games[i][j] += ELO_PRIOR
+
+    strength = [1.0] * n
+    wins = [sum(row) for row in score]
+    for _ in range(max_iterations):
+        new = []
+        for i in range(n):
+            total = sum(games[i][j] / (strength[i] + strength[j]) for j in range(n) if games[i][j])
+            new.append(wins[i] / total if total else 1.0)
+        centre = math.exp(sum(math.log(s) for s in new) / n)
+        new = [s / centre for s in new]
+        change = max(abs(a - b) / b for a, b in zip(new, strength))
+        strength = new
+        if change < tolerance:
+            break
+
+    ratings = {}
+    for i, e in enumerate(entrants):
+        information = sum(games[i][j] * strength[i] * strength[j] / (strength[i] + strength[j]) ** 2
+                          for j in range(n))
+        interval = 1.96 * ELO_SCALE / math.sqrt(information) if information else math.inf
+        ratings[e] = (ELO_SCALE * math.log(strength[i]), interval)
+    return ratings
+
+
+def _pdf(x):
+    return math.exp(-x * x / 2) / math.sqrt(2 * math.pi)
+
+def _cdf(x):
+    return math.erfc(-x / math.sqrt(2)) / 2
+
+def _v(x, t):
+    """ Mean shift of a win by a margin of x over a draw margin of t """
+    d = _cdf(x - t)
+    return _pdf(x - t) / d if d > 1e-300 else t - x
+
+def _w(x, t):
+    v = _v(x, t)
+    return v * (v + x - t)
+
+def _v_draw(x, t):
+    d = _cdf(t - x) - _cdf(-t - x)
+    if d < 1e-300:
+        return -x
+    return (_pdf(-t - x) - _pdf(t - x)) / d
+
+def _w_draw(x, t):
+    d = _cdf(t - x) - _cdf(-t - x)
+    if d < 1e-300:
+        return 1.0
+    v = _v_draw(x, t)
+    return v * v + ((t - x) * _pdf(t - x) + (t + x) * _pdf(t + x)) / d
+
+
+class TrueSkill():
+    """ Bayesian skill ratings (mu, sigma), using the closed-form Weng-Lin
+        (Thurstone-Mosteller, full pair) update in place of TrueSkill's
+        factor graph. Bots don't learn, so skills aren't allowed to drift """
+    MU = 25.0
+    SIGMA = 25.0 / 3
+    BETA = 25.0 / 6 # Performance spread within a game
+    DRAW_MARGIN = 0.1
+    KAPPA = 1e-4 # Lower bound on how far one game can shrink a variance
+
+    def __init__(self, entrants):
+        self.ratings = {e: (self.MU, self.SIGMA) for e in entrants}
+
+    def rate(self, seats, ranks):
+        """ Update everyone in a game from its ranks (lower is better) """
+        ratings = [self.ratings[name] for name in seats]
+        updated = []
+        for i, (mu, sigma) in enumerate(ratings):
+            omega = delta = 0.0
+            for q, (mu_q, sigma_q) in enumerate(ratings):
+                if q == i:
+                    continue
+                c = math.sqrt(sigma ** 2 + sigma_q ** 2 + 2 * self.BETA ** 2)
+                x, t = (mu - mu_q) / c, self.DRAW_MARGIN / c
+                share = sigma ** 2 / c
+                if ranks[i] < ranks[q]:
+                    omega += share * _v(x, t)
+                    w = _w(x, t)
+                elif ranks[i] > ranks[q]:
+                    omega -= share * _v(-x, t)
+                    w = _w(-x, t)
+                else:
+                    omega += share * _v_draw(x, t)
+                    w = _w_draw(x, t)
+                delta += (sigma / c) * (sigma ** 2 / c ** 2) * w
+            updated.append((mu + omega, sigma * math.sqrt(max(1 - delta, self.KAPPA))))
+
+        for name, rating in zip(seats, updated):
+            self.ratings[name] = rating
+
+
+def format_standings(tournament):
+    results = tournament.results.values()
+    draws = sum(1 for r in results if r.ranks.count(0) > 1)
+    lines = [
+        "{}: {} entrants, {} rounds, {} games (draws: {})".format(
+            tournament.format, len(tournament.entrants), tournament.rounds, len(results), draws
+        ),
+        "     {:<12} {:>6} {:>6} {:>7} {:>11} {:>13}".format(
+            "entrant", "games", "wins", "score", "elo", "trueskill"),
+    ]
+    for place, (name, s) in enumerate(tournament.standings(), 1):
+        elo = "{:+.0f} +-{:.0f}".format(s["elo"], min(s["elo_interval"], 9999))
+        trueskill = "{:.1f} +-{:.1f}".format(s["mu"], s["mu_interval"])
+        lines.append("  {:>2} {:<12} {:>6} {:>6} {:>7.1%} {:>11} {:>13}".format(
+            place, name, s["games"], s["wins"], s["score"], elo, trueskill))
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rated tournaments between automated policies")
+    parser.add_argument("entrants", nargs="+", choices=sorted(POLICIES))
+    parser.add_argument("-f", "--format", default="round-robin", choices=Tournament.FORMATS)
+    parser.add_argument("-r", "--rounds", type=int, default=None)
+    parser.add_argument("-t", "--table-size", type=int, default=2, help="players per game (2-6)")
+    parser.add_argument("-g", "--games-per-match", type=int, default=None)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-c", "--checkpoint", help="JSON lines file to save progress to and resume from")
+    parser.add_argument("--max-decisions", type=int, default=MAX_DECISIONS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--json", action="store_true", help="print standings as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        tournament = Tournament(args.entrants, args.format, args.rounds, args.table_size,
+                                args.games_per_match, args.seed, args.max_decisions)
+        checkpoint = Checkpoint(args.checkpoint, tournament) if args.checkpoint else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    def progress(t):
+        print("{}/{} games".format(len(t.results), t.num_games), file=sys.stderr)
+
+    try:
+        tournament.play(args.workers, args.batch_size, checkpoint, progress)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+    if args.json:
+        print(json.dumps([{"entrant": name, **stats} for name, stats in tournament.standings()]))
+    else:
+        print(format_standings(tournament))
+
+if __name__ == "__main__":
+    main()
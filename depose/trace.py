@@ -0,0 +1,113 @@
+""" Structured tracing of the action / observer machinery
+
+    Call sites guard on the module-level flag so nothing is built when
+    tracing is off:
+
+        if trace.enabled:
+            trace.emit("listen", action=self.name, observer=obs)
+
+    Enable it by installing a sink with set_sink(), or from the environment
+    with DEPOSE_TRACE=stdout or DEPOSE_TRACE=path/to/trace.jsonl
+"""
+import json
+import os
+import sys
+from collections import deque, namedtuple
+
+TraceEvent = namedtuple("TraceEvent", ["event", "action", "actor", "phase", "observer", "detail"])
+
+
+def name_of(obj):
+    """ Readable name for an actor / observer (the Game has no name) """
+    if obj is None or isinstance(obj, str):
+        return obj
+    return getattr(obj, "name", obj.__class__.__name__)
+
+
+class NullSink():
+    """ Discards everything """
+    def emit(self, event):
+        pass
+
+    def close(self):
+        pass
+
+
+class RingBufferSink():
+    """ Keeps the most recent capacity events in memory """
+    def __init__(self, capacity=10000):
+        self.events = deque(maxlen=capacity)
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink():
+    """ Writes one JSON object per event to a file (path or file object) """
+    def __init__(self, file):
+        if isinstance(file, str):
+            file = open(file, "a")
+            self._owned = True
+        else:
+            self._owned = False
+        self.file = file
+
+    def emit(self, event):
+        record = {k: v for k, v in event._asdict().items() if v is not None and k != "detail"}
+        record.update(event.detail)
+        self.file.write(json.dumps(record, default=str))
+        self.file.write("\n")
+
+    def close(self):
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class PrintSink():
+    """ Human-readable lines, one per event """
+    def __init__(self, file=None):
+        self.file = file
+
+    def emit(self, event):
+        fields = ["{}={}".format(k, v) for k, v in event._asdict().items()
+                  if v is not None and k not in ("event", "action", "detail")]
+        fields += ["{}={}".format(k, v) for k, v in event.detail.items()]
+        print("{}: {} {}".format(event.action, event.event, " ".join(fields)),
+              file=self.file or sys.stdout)
+
+    def close(self):
+        pass
+
+
+enabled = False
+_sink = NullSink()
+
+def set_sink(sink):
+    """ Route events to sink, returning the previous one. None turns tracing off """
+    global enabled, _sink
+    previous = _sink
+    _sink = sink or NullSink()
+    enabled = sink is not None and not isinstance(sink, NullSink)
+    return previous
+
+def get_sink():
+    return _sink
+
+def emit(event, action=None, actor=None, phase=None, observer=None, **detail):
+    """ Record an event. Only call this when enabled is set """
+    _sink.emit(TraceEvent(event, action, name_of(actor), phase, name_of(observer), detail))
+
+def sink_from_env(environ=os.environ):
+    """ Build the sink named by DEPOSE_TRACE, or None if it isn't set """
+    target = environ.get("DEPOSE_TRACE")
+    if not target:
+        return None
+    elif target == "stdout":
+        return PrintSink()
+    else:
+        return JsonLinesSink(target)
@@ -0,0 +1,124 @@
+""" Undo journal for trying out moves on a live Game
+
+    UndoLog listens to a Game's Players and Deck and records every change
+    as a small reversible delta: a seat's old coins, a seat's old hand
+    (at most four cards), or the cards drawn from / added to the deck.
+    mark() notes the current position; restore(mark) pops and reverses
+    only the deltas recorded since, so rolling back costs O(changes), not
+    O(state size), and nothing is deep-copied.
+
+        log = UndoLog(game)
+        mark = log.mark()     # While the active player chooses an action
+        ...                   # play on
+        log.restore(mark)     # back to the same decision
+"""
+from collections import deque, namedtuple
+
+COINS, CARDS, DRAW, ADD = range(4)
+
+# size: journal length. The turn order is at most six seats, so it's
+# cheaper to keep a copy than to journal every rotation of the deque
+Mark = namedtuple("Mark", ["size", "turn_queue", "active_player", "winner"])
+
+
+class UndoLog():
+    def __init__(self, game):
+        self.game = game
+        self.players = game.players
+        self.deck = game.players[0].deck
+        self.entries = []
+        self._restoring = False
+
+        self._coins = {p: p.coins for p in self.players}
+        self._hands = {p: tuple(p.cards) for p in self.players}
+        for p in self.players:
+            p.add_change_observer(self)
+        self.deck.add_observer(self)
+
+    def close(self):
+        for p in self.players:
+            p.remove_change_observer(self)
+        self.deck.remove_observer(self)
+
+    def __len__(self):
+        return len(self.entries)
+
+    """ Recording """
+    def notify_coins(self, player):
+        if not self._restoring:
+            self.entries.append((COINS, player, self._coins[player]))
+        self._coins[player] = player.coins
+
+    def notify_cards(self, player):
+        if not self._restoring:
+            self.entries.append((CARDS, player, self._hands[player]))
+        self._hands[player] = tuple(player.cards)
+
+    def notify_draw(self, deck, cards):
+        if not self._restoring:
+            self.entries.append((DRAW, None, cards))
+
+    def notify_add(self, deck, card):
+        if not self._restoring:
+            self.entries.append((ADD, None, card))
+
+    """ Snapshots """
+    def mark(self):
+        """ Note the current position. Only possible while the active player
+            is choosing an action (or the game is over), since mid-turn the
+            position also lives in the Action chain being resolved """
+        game = self.game
+        if game.current_action is not None:
+            raise ValueError("Can only mark a game between actions")
+        return Mark(len(self.entries), tuple(game.turn_queue),
+                    getattr(game, "active_player", None), game.winner)
+
+    def restore(self, mark):
+        """ Undo everything since mark and ask the active player for an
+            action again. Prompts still waiting from the abandoned line of
+            play are dropped """
+        if mark.size > len(self.entries):
+            raise ValueError("Mark is newer than the journal (already restored past it?)")
+
+        self._restoring = True
+        try:
+            while len(self.entries) > mark.size:
+                kind, player, old = self.entries.pop()
+                if kind == COINS:
+                    player.coins = old
+                elif kind == CARDS:
+                    player.set_cards(old)
+                elif kind == DRAW:
+                    for card in old:
+                        self.deck.add(card)
+                else:
+                    self.deck.remove(old)
+        finally:
+            self._restoring = False
+
+        self._reset_turn(mark)
+
+    def _reset_turn(self, mark):
+        game = self.game
+        ui = game.ui
+
+        # Drop whatever the abandoned Action chain was listening to
+        for p in self.players:
+            p.target_obs.clear()
+            p.state_obs.clear()
+            ui.remove_observer(p)
+        game.obs.clear()
+        game.questions = deque()
+        game.current_action = None
+        game.query = None
+        game.turn_queue.clear()
+        game.turn_queue.extend(mark.turn_queue)
+        game.active_player = mark.active_player
+        game.winner = mark.winner
+
+        prompts = getattr(ui, "prompts", None)
+        if prompts is not None:
+            prompts.clear()
+        if game.winner is None and mark.active_player is not None:
+            ui.update_active_player(mark.active_player)
+            mark.active_player.choose_action()
@@ -0,0 +1,397 @@
+""" Vectorised batch of games for training policies (requires numpy)
+
+    VecEnv holds num_envs games in NumPy arrays and advances all of them
+    at once: step() takes one move per game and applies the same rules as
+    Game / GameState with masked array operations, so thousands of games
+    cost roughly the same number of Python operations as one.
+
+    Every decision shares a flat move space
+
+        0 .. 6                  actions, in code order (Salary .. Diplomacy)
+        7 .. 7+P-1              target seat
+        7+P, 7+P+1              decline / accept (challenge or counter)
+        7+P+2 .. 7+P+6          card, by Card value (reveal, lose life, return)
+
+    and legal_mask() gives the moves allowed for each game's pending decision.
+"""
+import numpy as np
+
+from depose import state as S
+from depose.model import Card
+
+NUM_ACTIONS = 7
+NUM_CARDS = len(Card)
+ACTION, TARGET, CHALLENGE, COUNTER, REVEAL, LOSE_LIFE, RETURN = (
+    S.ACTION, S.TARGET, S.CHALLENGE, S.COUNTER, S.REVEAL, S.LOSE_LIFE, S.RETURN
+)
+OVER = S.OVER
+
+# Internal phases, resolved inside step() before control returns
+_ADVANCE, _ASK, _PERFORM, _LOSE, _AFTER_LOSS, _END_TURN = range(10, 16)
+
+# Rule tables indexed by action code
+CHAIN_LEN = np.zeros(len(S.ACTIONS) + 1, dtype=np.int16)
+STAGE_TABLE = np.zeros((len(S.ACTIONS) + 1, 3), dtype=np.int16)
+for _code, _stages in S.STAGES.items():
+    CHAIN_LEN[_code] = len(_stages)
+    STAGE_TABLE[_code, :len(_stages)] = _stages
+JUSTIFY_TABLE = np.array(S.JUSTIFY, dtype=np.int16)
+COUNTER_TABLE = np.zeros(len(S.ACTIONS) + 1, dtype=np.int16)
+for _code, _counter in S.COUNTER_OF.items():
+    COUNTER_TABLE[_code] = _counter
+GAIN_TABLE = np.zeros(len(S.ACTIONS) + 1, dtype=np.int16)
+GAIN_TABLE[[S.SALARY, S.DONATIONS, S.TITHE]] = [1, 2, 3]
+COST_TABLE = np.zeros(len(S.ACTIONS) + 1, dtype=np.int16)
+COST_TABLE[[S.DEPOSE, S.MURDER]] = [7, 3]
+
+BASE_MOVES = np.array([c - 1 for c in S.BASE_ACTIONS])
+
+
+class VecEnv():
+    """ num_envs independent games of num_players each
+
+        Arrays (B games, P players):
+        coins (B, P), hands (B, P, 6) and deck (B, 6) card counts indexed by
+        Card value, active (B,) seat whose turn it is, phase (B,) Decision
+        value of the pending prompt (0 once over), player (B,) seat asked,
+        action (B,) pending action code and winner (B,) """
+    def __init__(self, num_envs, num_players=4, num_sets=3, seed=None):
+        self.num_envs = num_envs
+        self.num_players = num_players
+        self.num_sets = num_sets
+        self.rng = np.random.default_rng(seed)
+
+        self.target_base = NUM_ACTIONS
+        self.response_base = NUM_ACTIONS + num_players
+        self.card_base = self.response_base + 2
+        self.num_moves = self.card_base + NUM_CARDS
+
+        B, P = num_envs, num_players
+        self.coins = np.zeros((B, P), dtype=np.int16)
+        self.hands = np.zeros((B, P, NUM_CARDS + 1), dtype=np.int8)
+        self.deck = np.zeros((B, NUM_CARDS + 1), dtype=np.int8)
+        self.seated = np.zeros((B, P), dtype=bool) # Still playing when the turn began
+
+        scalars = [
+            "active", "phase", "player", "action", "target", "stage",
+            "claim", "claimant", "countered", "challenger", "loser", "after",
+            "returns", "query", "excluded", "ptr", "target_only", "winner",
+        ]
+        for name in scalars:
+            setattr(self, name, np.zeros(B, dtype=np.int16))
+
+        self._rows = np.arange(B)
+        self._seats = np.arange(P)
+        self.reset()
+
+    """ Setup """
+    def reset(self, mask=None):
+        """ Deal new games, in every slot or only where mask is set """
+        idx = self._rows if mask is None else np.flatnonzero(mask)
+        if not len(idx):
+            return
+
+        self.coins[idx] = 0
+        self.hands[idx] = 0
+        self.deck[idx] = self.num_sets
+        self.deck[idx, 0] = 0
+        for seat in range(self.num_players):
+            for _ in range(2):
+                self._draw(idx, np.full(len(idx), seat))
+
+        self.seated[idx] = True
+        self.active[idx] = 0
+        self.winner[idx] = S.NONE
+        self._start_turn(idx)
+
+    def _start_turn(self, idx):
+        self.phase[idx] = ACTION
+        self.player[idx] = self.active[idx]
+        self.action[idx] = 0
+        self.target[idx] = S.NONE
+        self.stage[idx] = S.NONE
+        self.claim[idx] = 0
+        self.claimant[idx] = S.NONE
+        self.countered[idx] = 0
+        self.challenger[idx] = S.NONE
+        self.after[idx] = 0
+        self.returns[idx] = 0
+
+    def _draw(self, idx, seats):
+        """ Move a random card from each deck in idx to the hand of the
+            matching seat, returning which draws succeeded """
+        deck = self.deck[idx].astype(np.int32)
+        total = deck.sum(1)
+        ok = total > 0
+        r = self.rng.integers(0, np.maximum(total, 1))
+        cards = (deck.cumsum(1) <= r[:, None]).sum(1)
+
+        idx, seats, cards = idx[ok], seats[ok], cards[ok]
+        self.deck[idx, cards] -= 1
+        self.hands[idx, seats, cards] += 1
+        return ok
+
+    """ Moves """
+    def alive(self):
+        """ (B, P) mask of players still holding cards """
+        return self.hands.sum(2) > 0
+
+    def legal_mask(self):
+        """ (B, num_moves) mask of legal moves for each pending decision """
+        mask = np.zeros((self.num_envs, self.num_moves), dtype=bool)
+        phase, player = self.phase, self.player
+
+        a = np.flatnonzero(phase == ACTION)
+        coins = self.coins[a, player[a]]
+        rich = coins >= 10
+        mask[np.ix_(a[~rich], BASE_MOVES)] = True
+        mask[a, S.MURDER - 1] = (coins >= 3) & ~rich
+        mask[a, S.DEPOSE - 1] = coins >= 7
+
+        t = np.flatnonzero(phase == TARGET)
+        mask[t, self.target_base:self.response_base] = (
+            self.alive()[t] & (self._seats != player[t][:, None])
+        )
+
+        q = np.flatnonzero((phase == CHALLENGE) | (phase == COUNTER))
+        mask[q, self.response_base:self.card_base] = True
+
+        c = np.flatnonzero((phase == REVEAL) | (phase == LOSE_LIFE) | (phase == RETURN))
+        mask[c, self.card_base:] = self.hands[c, player[c], 1:] > 0
+        return mask
+
+    def random_moves(self, mask=None):
+        """ A uniformly random legal move for every game (0 where it's over) """
+        mask = self.legal_mask() if mask is None else mask
+        return (self.rng.random(mask.shape) * mask).argmax(1)
+
+    def step(self, moves):
+        """ Answer every game's pending decision, returning a (B,) mask of
+            games which finished on this step. Finished games ignore moves
+            until they're reset """
+        moves = np.asarray(moves)
+        phase = self.phase.copy()
+        player = self.player
+
+        m = np.flatnonzero(phase == ACTION)
+        self.action[m] = moves[m] + 1
+        self.stage[m] = S.NONE
+        self.phase[m] = _ADVANCE
+
+        m = np.flatnonzero(phase == TARGET)
+        self.target[m] = moves[m] - self.target_base
+        self.phase[m] = _ADVANCE
+
+        accept = moves == self.response_base + 1
+        m = np.flatnonzero((phase == CHALLENGE) & accept)
+        self.challenger[m] = player[m]
+        self.player[m] = self.claimant[m]
+        self.phase[m] = REVEAL
+
+        m = np.flatnonzero((phase == COUNTER) & accept)
+        # The counter-action can itself be challenged by anyone else
+        self.countered[m] = 1
+        self.claim[m] = COUNTER_TABLE[self.action[m]]
+        self.claimant[m] = player[m]
+        self._query(m, CHALLENGE, player[m], 0)
+
+        m = np.flatnonzero(((phase == CHALLENGE) | (phase == COUNTER)) & ~accept)
+        self.phase[m] = _ASK
+
+        card = moves - self.card_base + 1
+        m = np.flatnonzero(phase == REVEAL)
+        held = (JUSTIFY_TABLE[self.claim[m]] >> card[m]) & 1 == 1
+        self.loser[m] = np.where(held, self.challenger[m], self.claimant[m])
+        self.after[m] = np.where(held, S.CLAIM_HELD, S.CLAIM_FAILED)
+        self.phase[m] = _LOSE
+
+        m = np.flatnonzero(phase == LOSE_LIFE)
+        self.hands[m, player[m], card[m]] -= 1
+        self.phase[m] = _AFTER_LOSS
+
+        m = np.flatnonzero(phase == RETURN)
+        self.hands[m, player[m], card[m]] -= 1
+        self.deck[m, card[m]] += 1
+        self.returns[m] -= 1
+        self.phase[m[self.returns[m] <= 0]] = _END_TURN
+
+        self._resolve()
+        return (self.phase == OVER) & (phase != OVER)
+
+    """ Rules """
+    def _resolve(self):
+        """ Run internal transitions until every game waits on a decision """
+        handlers = [
+            (_ADVANCE, self._advance), (_ASK, self._ask), (_PERFORM, self._perform),
+            (_LOSE, self._lose), (_AFTER_LOSS, self._after_loss), (_END_TURN, self._end_turn),
+        ]
+        while True:
+            phase = self.phase.copy()
+            if not (phase >= _ADVANCE).any():
+                return
+            for code, handler in handlers:
+                m = np.flatnonzero(phase == code)
+                if len(m):
+                    handler(m)
+
+    def _query(self, m, kind, excluded, target_only):
+        """ Start asking everyone (or only the target) in seat order """
+        self.query[m] = kind
+        self.excluded[m] = excluded
+        self.target_only[m] = target_only
+        self.ptr[m] = 0
+        self.phase[m] = _ASK
+
+    def _advance(self, m):
+        """ Move on to the next decorator in each action's chain """
+        self.stage[m] += 1
+        self.challenger[m] = S.NONE
+        self.after[m] = 0
+
+        done = self.stage[m] >= CHAIN_LEN[self.action[m]]
+        self.phase[m[done]] = _PERFORM
+
+        m = m[~done]
+        kind = STAGE_TABLE[self.action[m], self.stage[m]]
+        t = m[kind == TARGET]
+        self.phase[t] = TARGET
+        self.player[t] = self.active[t]
+
+        m, kind = m[kind != TARGET], kind[kind != TARGET]
+        self.claim[m] = self.action[m]
+        self.claimant[m] = self.active[m]
+        # Only the target can block targeted actions
+        self._query(m, kind, self.active[m], (kind == COUNTER) & (self.target[m] >= 0))
+
+    def _ask(self, m):
+        seats = self._seats
+        candidates = (
+            self.alive()[m]
+            & (seats >= self.ptr[m][:, None])
+            & (seats != self.excluded[m][:, None])
+            & ((self.target_only[m] == 0)[:, None] | (seats == self.target[m][:, None]))
+        )
+        found = candidates.any(1)
+        nxt = candidates.argmax(1)
+
+        a = m[found]
+        self.player[a] = nxt[found]
+        self.ptr[a] = nxt[found] + 1
+        self.phase[a] = self.query[a]
+
+        # Nobody took the chance. An unchallenged counter stops the action
+        e = m[~found]
+        stopped = (self.query[e] == CHALLENGE) & (self.countered[e] == 1)
+        self.phase[e[stopped]] = _END_TURN
+        self.phase[e[~stopped]] = _ADVANCE
+
+    def _perform(self, m):
+        self.claim[m] = 0
+        self.claimant[m] = S.NONE
+        self.countered[m] = 0
+        action, actor = self.action[m], self.active[m]
+
+        self.coins[m, actor] += GAIN_TABLE[action]
+        self.phase[m] = _END_TURN
+
+        g = action == S.MUG
+        mm, thief, target = m[g], actor[g], self.target[m[g]]
+        theft = np.minimum(2, self.coins[mm, target])
+        self.coins[mm, thief] += theft
+        self.coins[mm, target] -= theft
+
+        k = COST_TABLE[action] > 0
+        km = m[k]
+        self.coins[km, actor[k]] = np.maximum(0, self.coins[km, actor[k]] - COST_TABLE[action[k]])
+        self.loser[km] = self.target[km]
+        self.after[km] = S.PERFORMED
+        self.phase[km] = _LOSE
+
+        d = action == S.DIPLOMACY
+        dm = m[d]
+        self.returns[dm] = 0
+        for _ in range(2):
+            self.returns[dm] += self._draw(dm, actor[d])
+        self.player[dm] = actor[d]
+        self.phase[dm] = np.where(self.returns[dm] > 0, RETURN, _END_TURN)
+
+    def _lose(self, m):
+        loser = self.loser[m]
+        has_cards = self.hands[m, loser].sum(1) > 0
+        self.phase[m[has_cards]] = LOSE_LIFE
+        self.player[m[has_cards]] = loser[has_cards]
+        self.phase[m[~has_cards]] = _AFTER_LOSS
+
+    def _after_loss(self, m):
+        after = self.after[m]
+        # Action's claim held up, or a counter's claim fell through
+        advance = (after != S.PERFORMED) & ((after == S.CLAIM_HELD) != (self.countered[m] == 1))
+        self.phase[m[advance]] = _ADVANCE
+        self.phase[m[~advance]] = _END_TURN
+
+    def _end_turn(self, m):
+        alive = self.alive()[m]
+        over = alive.sum(1) <= 1
+
+        o = m[over]
+        self.phase[o] = OVER
+        self.player[o] = S.NONE
+        self.winner[o] = alive[over].argmax(1)
+
+        r, alive = m[~over], alive[~over]
+        order = (self.active[r][:, None] + 1 + self._seats) % self.num_players
+        first = alive[np.arange(len(r))[:, None], order].argmax(1)
+        self.active[r] = order[np.arange(len(r)), first]
+        self.seated[r] = alive
+        self._start_turn(r)
+
+    """ Conversion """
+    def to_state_move(self, i, move):
+        """ Convert a flat move for game i into a GameState move """
+        phase, move = self.phase[i], int(move)
+        if phase == ACTION:
+            return move + 1
+        elif phase == TARGET:
+            return move - self.target_base
+        elif phase in (CHALLENGE, COUNTER):
+            return move - self.response_base
+        return move - self.card_base + 1
+
+    def from_state_move(self, i, move):
+        """ Convert a GameState move into a flat move for game i """
+        phase = self.phase[i]
+        if phase == ACTION:
+            return move - 1
+        elif phase == TARGET:
+            return move + self.target_base
+        elif phase in (CHALLENGE, COUNTER):
+            return move + self.response_base
+        return move + self.card_base - 1
+
+    def state(self, i):
+        """ GameState copy of game i (hands are listed in Card order) """
+        s = S.GameState(self.num_players)
+        for seat in range(self.num_players):
+            s.coins[seat] = min(255, int(self.coins[i, seat]))
+            for card in Card:
+                for _ in range(self.hands[i, seat, card.value]):
+                    s.add_card(seat, card.value)
+        s.deck[:] = bytes(int(n) for n in self.deck[i])
+
+        alive = self.alive()[i]
+        order = [(int(self.active[i]) + k) % self.num_players for k in range(self.num_players)]
+        s.order = bytes(seat for seat in order if self.seated[i, seat])
+
+        for name in ["phase", "player", "action", "target", "stage", "claim",
+                     "claimant", "challenger", "after", "returns", "winner"]:
+            setattr(s, name, int(getattr(self, name)[i]))
+        s.countered = bool(self.countered[i])
+        if s.phase in (CHALLENGE, COUNTER):
+            s.queue = bytes(
+                seat for seat in range(int(self.ptr[i]), self.num_players)
+                if alive[seat] and seat != self.excluded[i]
+                and (not self.target_only[i] or seat == self.target[i])
+            )
+        if s.phase == OVER:
+            s.order = bytes([s.winner])
+        return s
@@ -1,8 +1,11 @@
 from tkinter import *
 from functools import partial
-from collections import namedtuple
+from collections import deque, namedtuple
 from copy import copy
 
+from depose import trace
+from depose.events import Channel
+
 Option = namedtuple('Option', ['label', 'value'])
 
 def rgb(r, g, b):
@@ -11,7 +14,10 @@ def rgb(r, g, b):
 
 
 class GUI():
-    def __init__(self):
+    OPTION_COLUMNS = 4
+    SCROLLBACK = 1000 # Lines kept in the message log
+
+    def __init__(self, scrollback=SCROLLBACK):
         master = Tk()
         master.grid_rowconfigure(0, weight=1)
         master.grid_columnconfigure(0, weight=1)
@@ -39,12 +45,25 @@ class GUI():
 
         scrollbar.config(command=self.text.yview)
 
+        self.scrollback = scrollback
+        self.log_lines = 0
+        # Lines beyond the scrollback would be trimmed straight away anyway
+        self.pending_messages = deque(maxlen=scrollback)
+        self.flush_scheduled = False
+
         self.dynamic_frame = None
         self.get_frame()
 
+        self.prompt_label = None
+        self.prompt_text = None
+        self.buttons = []
+        self.button_labels = []
+        self.buttons_shown = 0
+        self.option_values = []
+
         #self.set_state(IdleState(self, ""))
 
-        self.obs = []
+        self.obs = Channel("handle")
 
     def attach_player_panel(self, players):
         self.player_panel = PlayerPanel(self.frame, players)
@@ -56,13 +75,7 @@ class GUI():
     def destroy(self):
         self.master.destroy()
 
-    def _clear_view(self):
-        if self.dynamic_frame:
-            self.dynamic_frame.destroy()
-            self.dynamic_frame = None
-
     def set_state(self, state):
-        self._clear_view()
         self.player_panel.update()
         self.state = state
         self.state.update_view()
@@ -81,27 +94,99 @@ class GUI():
             self.dynamic_frame.grid_rowconfigure(2, weight=1)
 
             return self.dynamic_frame
-    
+
+    def show_prompt(self, prompt, options=()):
+        """ Show prompt above a button for each option
+
+            The label and buttons are kept between prompts; buttons are only
+            re-labelled, shown or hidden when they differ from the last prompt """
+        frame = self.get_frame()
+        if self.prompt_label is None:
+            self.prompt_label = Label(frame)
+            self.prompt_label.grid(row=0, columnspan=self.OPTION_COLUMNS, sticky=W+E+N+S)
+        if self.prompt_text != prompt:
+            self.prompt_label.config(text=prompt)
+            self.prompt_text = prompt
+
+        for i, option in enumerate(options):
+            if i == len(self.buttons):
+                self._add_button(frame)
+            button = self.buttons[i]
+            if self.button_labels[i] != option.label:
+                button.config(text=option.label)
+                self.button_labels[i] = option.label
+            if i >= self.buttons_shown:
+                button.grid()
+
+        for button in self.buttons[len(options):self.buttons_shown]:
+            button.grid_remove()
+
+        self.buttons_shown = len(options)
+        self.option_values = [option.value for option in options]
+
+    def _add_button(self, frame):
+        i = len(self.buttons)
+        # One callback per button for the lifetime of the GUI, not one per prompt
+        button = Button(
+            frame,
+            command=partial(self._press, i),
+            width=int(40 / self.OPTION_COLUMNS)
+        )
+        frame.grid_columnconfigure(i % self.OPTION_COLUMNS, weight=1)
+        button.grid(
+            row=1 + int(i / self.OPTION_COLUMNS),
+            column=(i % self.OPTION_COLUMNS),
+            sticky=W+E+N+S, pady=5
+        )
+        button.grid_remove()
+        self.buttons.append(button)
+        self.button_labels.append(None)
+
+    def _press(self, index):
+        if index < len(self.option_values):
+            self.notify(self.option_values[index])
+
     def message(self, text):
+        """ Queue a line for the log. Lines are written in one batch when Tk
+            next goes idle, however many arrive before then """
+        self.pending_messages.append(text)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.master.after_idle(self.flush_messages)
+
+    def flush_messages(self):
+        self.flush_scheduled = False
+        if not self.pending_messages:
+            return
+
+        lines = list(self.pending_messages)
+        self.pending_messages.clear()
+
+        chunk = "\n".join(lines) + "\n"
         self.text.config(state=NORMAL)
-        self.text.insert(END, text)
-        self.text.insert(END, '\n')
+        self.text.insert(END, chunk)
+        # Messages can hold newlines of their own, so count what went in
+        self.log_lines += chunk.count("\n")
+        if self.log_lines > self.scrollback:
+            # Trim the oldest lines so the log stays within its scrollback
+            excess = self.log_lines - self.scrollback
+            self.text.delete("1.0", "{}.0".format(excess + 1))
+            self.log_lines = self.scrollback
         self.text.config(state=DISABLED)
         self.text.see(END)
 
     def add_observer(self, obs):
-        print("GUI: Adding", getattr(obs, "name", obs.__class__), "as an obs")
-        if obs not in self.obs:
-            self.obs.append(obs)
+        if trace.enabled:
+            trace.emit("add_observer", "GUI", observer=obs)
+        self.obs.add(obs)
 
     def remove_observer(self, obs):
-        print("GUI: Removing", getattr(obs, "name", obs.__class__), "as an obs")
-        if obs in self.obs:
-            self.obs.remove(obs)
+        if trace.enabled:
+            trace.emit("remove_observer", "GUI", observer=obs)
+        self.obs.remove(obs)
 
     def notify(self, event):
-        for o in self.obs:
-            o.handle(event)
+        self.obs.notify("handle", event)
 
 
 class GUIState():
@@ -114,33 +199,18 @@ class IdleState(GUIState):
         self.message = message
 
     def update_view(self):
-        frame = self.context.get_frame()
-        frame.grid_rowconfigure(0, weight=1)
-        frame.grid_columnconfigure(0, weight=1)
-        Label(frame, text=self.message).grid()
+        self.context.show_prompt(self.message)
 
 class OptionListState(GUIState):
-    def __init__(self, context, prompt, options):
+    def __init__(self, context, prompt, options, decision=None, action=None):
         super().__init__(context)
         self.prompt = prompt
         self.options= options
+        self.decision = decision # Which kind of Decision is being asked for
+        self.action = action # The Action the decision is about, if any
 
     def update_view(self):
-        NUM_COLS = 4
-
-        frame = self.context.get_frame()
-        Label(frame, text=self.prompt).grid(row=0, columnspan=NUM_COLS, sticky=W+E+N+S)
-        buttons = []
-        for col, option in enumerate(self.options):
-            b = Button(
-                frame, 
-                text=option.label,
-                command=partial(self.context.notify, option.value), # partial() allows us to pass an argument to the callback
-                width=int(40 / NUM_COLS)
-            )
-            buttons.append(b)
-            frame.grid_columnconfigure(col, weight=1)
-            b.grid(row=1 + int(col / NUM_COLS), column=(col % NUM_COLS), sticky=W+E+N+S, pady=5)
+        self.context.show_prompt(self.prompt, self.options)
 
 
 class PlayerBox():
@@ -152,6 +222,7 @@ class PlayerBox():
 
     def __init__(self, master, player):
         self.player = player
+        self._shown = {} # widget -> options last configured on it
 
         self._box = Frame(
             master,
@@ -181,36 +252,42 @@ class PlayerBox():
         return self._box
 
     def update(self, myturn=False, focused=False):
-        self.set_bg_color(self.IDLE_COLOUR)
-        self.card_a.config(text="")
-        self.card_b.config(text="")
-
-        if len(self.player.cards) == 0:
-            self.set_bg_color(self.DEAD_COLOUR)
+        """ Bring the widgets in line with the player, only re-configuring
+            the options which actually changed since the last update """
+        cards = self.player.cards
+        if myturn:
+            colour = self.ACTIVE_COLOUR
+        elif focused:
+            colour = self.FOCUS_COLOUR
+        elif not cards:
+            colour = self.DEAD_COLOUR
         else:
-            if len(self.player.cards) >= 1:
-                self.card_a.config(text=self.player.cards[0].name)
-            if len(self.player.cards) >= 2:
-                self.card_b.config(text=self.player.cards[1].name)
-
-        self.coin_label.config(text="Coins: {}".format(self.player.coins))
+            colour = self.IDLE_COLOUR
 
-        if focused == True:
-            self.set_bg_color(self.FOCUS_COLOUR)
-            for label in self.labels:
-                label.config(borderwidth=4, relief=RAISED)
+        if focused:
+            border = dict(borderwidth=4, relief=RAISED)
         else:
-            for label in self.labels:
-                label.config(borderwidth=2, relief=FLAT)
+            border = dict(borderwidth=2, relief=FLAT)
 
-        if myturn == True:
-            self.set_bg_color(self.ACTIVE_COLOUR)
+        self._configure(self.card_a, text=cards[0].name if len(cards) >= 1 else "")
+        self._configure(self.card_b, text=cards[1].name if len(cards) >= 2 else "")
+        self._configure(self.coin_label, text="Coins: {}".format(self.player.coins))
+        self.set_bg_color(colour)
+        for label in self.labels:
+            self._configure(label, **border)
 
     def set_bg_color(self, color):
         for label in self.labels:
-            label.config(bg=color)
+            self._configure(label, bg=color)
+
+        self._configure(self.box, bg=color)
 
-        self.box.config(bg=color)
+    def _configure(self, widget, **options):
+        shown = self._shown.setdefault(widget, {})
+        changed = {k: v for k, v in options.items() if shown.get(k) != v}
+        if changed:
+            widget.config(**changed)
+            shown.update(changed)
 
 
 class PlayerPanel():
@@ -227,15 +304,28 @@ class PlayerPanel():
 
             self.frame.grid_rowconfigure(row, weight=1)
             player_box.box.grid(row=row, column=0, ipadx=0, sticky=W+E+N+S)
+            p.add_change_observer(self)
 
         self.active_player = None
+        self.dirty = set() # Players whose boxes need redrawing
+
+    def notify_coins(self, player):
+        self.dirty.add(player)
+
+    def notify_cards(self, player):
+        self.dirty.add(player)
 
     def set_active(self, player):
-        self.active_player = player
+        if player is not self.active_player:
+            self.dirty.update((self.active_player, player))
+            self.active_player = player
         self.update()
 
     def update(self):
+        """ Redraw the boxes of players who changed since the last update """
+        if not self.dirty:
+            return
         for box in self.player_boxes:
-            is_active = box.player == self.active_player
-            box.update(myturn=is_active)
- 
\ No newline at end of file
+            if box.player in self.dirty:
+                box.update(myturn=box.player == self.active_player)
+        self.dirty.clear()
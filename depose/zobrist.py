@@ -0,0 +1,262 @@
+""" Zobrist hashing of game positions and a transposition table
+
+    A position's hash is the XOR of a fixed random 64-bit key for every
+    feature it has: each seat's coins, each copy of a card in each hand and
+    in the deck, each seat's place in the turn order and in the query
+    queue, and every field of the pending decision. Changing one feature
+    means XORing its old key out and its new key in.
+
+    state_hash() hashes a GameState from scratch. GameHasher follows a live
+    Game instead: it listens to the Players' coin and card changes and to
+    the Deck, so the coins / cards / deck part is kept up to date as they
+    change. The Game has no events for its turn order or the pending
+    decision, so those are worked out when the hash is asked for: the turn
+    order once per turn, and the pending decision from a table between
+    turns or from the prompt mid-turn. Both give the same value for the
+    same position.
+"""
+import random
+from collections import OrderedDict
+
+from depose.model import Card, Decision
+from depose.state import GameState, HAND_SIZE
+
+MAX_SEATS = 6
+MAX_COINS = 256 # GameState keeps coins in a byte
+MAX_COPIES = 64 # Of any one card in the deck
+
+_rng = random.Random(0x2E05E)
+
+def _keys(*shape):
+    if len(shape) == 1:
+        return [_rng.getrandbits(64) for _ in range(shape[0])]
+    return [_keys(*shape[1:]) for _ in range(shape[0])]
+
+NUM_CARDS = len(Card) + 1 # Indexed by Card value
+COIN_KEYS = _keys(MAX_SEATS, MAX_COINS)
+HAND_KEYS = _keys(MAX_SEATS, NUM_CARDS, HAND_SIZE) # seat, card, n-th copy
+DECK_KEYS = _keys(NUM_CARDS, MAX_COPIES)
+ORDER_KEYS = _keys(MAX_SEATS, MAX_SEATS) # position, seat
+QUEUE_KEYS = _keys(MAX_SEATS, MAX_SEATS)
+
+# Fields of the pending decision, each offset by one so NONE (-1) has a key
+PENDING = ("phase", "player", "action", "target", "stage", "claim",
+           "claimant", "countered", "challenger", "after", "returns", "winner")
+PENDING_KEYS = _keys(len(PENDING), 16)
+
+
+def coin_key(seat, coins):
+    return COIN_KEYS[seat][min(MAX_COINS - 1, coins)]
+
+def hand_key(seat, cards):
+    """ Key for a hand, given the Card values in it (in any order) """
+    h = 0
+    counts = [0] * NUM_CARDS
+    keys = HAND_KEYS[seat]
+    for card in cards:
+        h ^= keys[card][counts[card]]
+        counts[card] += 1
+    return h
+
+def material_hash(state):
+    """ Hash of state's coins, hands and deck """
+    h = 0
+    for seat in range(state.num_players):
+        h ^= coin_key(seat, state.coins[seat]) ^ hand_key(seat, state.cards(seat))
+    for card in range(1, NUM_CARDS):
+        for k in range(state.deck[card]):
+            h ^= DECK_KEYS[card][k]
+    return h
+
+def order_key(order):
+    """ Key for a turn order, given the seats in it, active player first """
+    h = 0
+    for position, seat in enumerate(order):
+        h ^= ORDER_KEYS[position][seat]
+    return h
+
+def pending_key(state):
+    """ Key for state's query queue and pending decision """
+    h = 0
+    for position, seat in enumerate(state.queue):
+        h ^= QUEUE_KEYS[position][seat]
+    for keys, field in zip(PENDING_KEYS, PENDING):
+        h ^= keys[int(getattr(state, field)) + 1]
+    return h
+
+def turn_hash(state):
+    """ Hash of state's turn order, query queue and pending decision """
+    return order_key(state.order) ^ pending_key(state)
+
+def _start_keys():
+    state = GameState(MAX_SEATS)
+    keys = []
+    for seat in range(MAX_SEATS):
+        state.player = seat
+        keys.append(pending_key(state))
+    return keys
+
+START_KEYS = _start_keys() # Pending decision at the start of each seat's turn
+
+def state_hash(state):
+    """ Zobrist hash of a GameState """
+    return material_hash(state) ^ turn_hash(state)
+
+
+class GameHasher():
+    """ Keeps the Zobrist hash of a live Game's coins, cards and deck up to
+        date as they change, so hash() costs the same however long the game
+
+        Attach once the deck is built. If coins, cards, the deck or the turn
+        order are changed without going through Player / Deck / Game (e.g.
+        deck.cards is replaced), call rehash() """
+    def __init__(self, game):
+        self.game = game
+        self.players = game.players
+        self.deck = game.players[0].deck
+        self._seats = {p: i for i, p in enumerate(self.players)}
+        for p in self.players:
+            p.add_change_observer(self)
+        self.deck.add_observer(self)
+        self.rehash()
+
+    def rehash(self):
+        """ Recompute everything from scratch """
+        self._turn = None # (active Player, players still to play) the order key is for
+        self._order = 0
+        self.coins = [min(MAX_COINS - 1, p.coins) for p in self.players]
+        self.hands = [hand_key(i, [c.value for c in p.cards]) for i, p in enumerate(self.players)]
+        self.deck_counts = [0] * NUM_CARDS
+        self.material = 0
+        for card in self.deck.cards:
+            self._deck_add(card.value)
+        for seat in range(len(self.players)):
+            self.material ^= coin_key(seat, self.coins[seat]) ^ self.hands[seat]
+
+    def close(self):
+        for p in self.players:
+            p.remove_change_observer(self)
+        self.deck.remove_observer(self)
+
+    def notify_coins(self, player):
+        seat = self._seats[player]
+        coins = min(MAX_COINS - 1, player.coins)
+        self.material ^= coin_key(seat, self.coins[seat]) ^ coin_key(seat, coins)
+        self.coins[seat] = coins
+
+    def notify_cards(self, player):
+        seat = self._seats[player]
+        key = hand_key(seat, [c.value for c in player.cards])
+        self.material ^= self.hands[seat] ^ key
+        self.hands[seat] = key
+
+    def notify_draw(self, deck, cards):
+        for card in cards:
+            self.deck_counts[card.value] -= 1
+            self.material ^= DECK_KEYS[card.value][self.deck_counts[card.value]]
+
+    def notify_add(self, deck, card):
+        self._deck_add(card.value)
+
+    def _deck_add(self, card):
+        self.material ^= DECK_KEYS[card][self.deck_counts[card]]
+        self.deck_counts[card] += 1
+
+    def hash(self, prompt=None, player=None):
+        """ Hash of the position. Mid-turn, pass the pending prompt and the
+            Player it was shown to, as for GameState.from_game """
+        game = self.game
+        active = getattr(game, "active_player", None)
+        between_turns = prompt is None or prompt.decision is Decision.ACTION
+        if game.winner is not None or active is None or (between_turns and game.current_action is not None):
+            # Before the first turn, once it's over, or mid-turn without the
+            # prompt (which load_turn rejects)
+            position = GameState(len(self.players))
+            position.load_turn(game, prompt, player)
+            return self.material ^ turn_hash(position)
+
+        # turn_queue only changes between turns, when the active player does
+        turn = (active, len(game.turn_queue))
+        if turn != self._turn:
+            seats = self._seats
+            self._order = order_key([seats[active]] + [seats[p] for p in game.turn_queue])
+            self._turn = turn
+
+        if between_turns:
+            return self.material ^ self._order ^ START_KEYS[self._seats[active]]
+        position = GameState(len(self.players))
+        position.load_turn(game, prompt, player)
+        return self.material ^ self._order ^ pending_key(position)
+
+
+class TranspositionTable():
+    """ Bounded map from position hashes to search results
+
+        policy -- "lru" evicts the least recently used entry when full.
+            "depth" is a fixed array of capacity slots indexed by the hash,
+            where a new entry only replaces one searched at least as deep """
+    POLICIES = ("lru", "depth")
+
+    def __init__(self, capacity=1 << 16, policy="lru"):
+        if policy not in self.POLICIES:
+            raise ValueError("Unknown eviction policy: {}".format(policy))
+        if capacity < 1:
+            raise ValueError("Capacity must be positive")
+        self.capacity = capacity
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        if self.policy == "lru":
+            self._entries = OrderedDict()
+        else:
+            self._slots = [None] * self.capacity # (key, depth, value)
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries) if self.policy == "lru" else self._size
+
+    def get(self, key, default=None):
+        if self.policy == "lru":
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        else:
+            entry = self._slots[key % self.capacity]
+            if entry is not None and entry[0] != key:
+                entry = None
+
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key, value, depth=0):
+        """ Store value for key, returning whether it was kept """
+        entry = (key, depth, value)
+        if self.policy == "lru":
+            entries = self._entries
+            if key in entries:
+                entries.move_to_end(key)
+            elif len(entries) >= self.capacity:
+                entries.popitem(last=False)
+            entries[key] = entry
+            return True
+
+        slot = key % self.capacity
+        current = self._slots[slot]
+        if current is None:
+            self._size += 1
+        elif current[0] != key and current[1] > depth:
+            return False
+        self._slots[slot] = entry
+        return True
+
+    def __contains__(self, key):
+        if self.policy == "lru":
+            return key in self._entries
+        entry = self._slots[key % self.capacity]
+        return entry is not None and entry[0] == key
@@ -7,6 +7,7 @@ from depose.actions import (
     ActionFactory, 
     Salary, Donations, Tithe, Depose, Mug, Murder, Diplomacy,
     TargetedAction, CounterableAction, ChallengableAction,
+    CAPABILITIES, CLAIM_MASKS, can_perform, needs_claim,
 )
 
 @pytest.fixture
@@ -58,6 +59,62 @@ def test_actionfactory(action_factory, player):
         act = action_factory.create(action, player)
         assert act.name == action
 
+def test_capabilities():
+    assert {"Diplomacy", "Counter Mug"} == CAPABILITIES[Card.DIPLOMAT]
+    assert {"Counter Murder"} == CAPABILITIES[Card.MEDIC]
+    assert can_perform(Card.LORD, "Counter Donations")
+    assert not can_perform(Card.LORD, "Salary")
+    assert not needs_claim("Depose")
+    assert needs_claim("Mug")
+    assert 1 << Card.BANDIT.value | 1 << Card.DIPLOMAT.value == CLAIM_MASKS["Counter Mug"]
+
+def test_actionfactory_pool(action_factory, player, target):
+    mug = action_factory.create("Mug", player)
+    mug.perform(target=target)
+    action_factory.release(mug)
+
+    reused = action_factory.create("Mug", target)
+    assert reused is mug
+    assert target is reused.actor
+    assert target is reused.base_action.base_action.base_action.actor
+    assert reused.base_action.target is None
+    assert len(reused.get_observers()) == 0
+
+    assert reused is not action_factory.create("Mug", target)
+
+def test_counter_actions_pooled(monkeypatch):
+    import random
+    from depose.headless import HeadlessDriver, new_game
+    from depose.model import Decision
+    from depose.policies import create_policy
+
+    built = []
+    build = ActionFactory.build.__func__
+    def counting_build(cls, action, actor):
+        built.append(action.upper())
+        return build(cls, action, actor)
+    monkeypatch.setattr(ActionFactory, "build", classmethod(counting_build))
+
+    countered = 0
+    for seed in range(10):
+        game, ui = new_game(2, rng=random.Random(seed))
+        agents = {p: create_policy(name, random.Random(seed)) for p, name in zip(game.players, ["honest", "aggressive"])}
+        def choose(player, state):
+            nonlocal countered
+            option = agents[player].choose(player, state)
+            countered += state.decision is Decision.COUNTER and option.value
+            return option
+        HeadlessDriver(game, ui, choose, 1000).run()
+
+    # Every counter after the first of its kind in a game reuses a chain
+    counters = [a for a in built if a.startswith("COUNTER ")]
+    assert countered > 30
+    assert len(counters) <= 3 * 10
+
+def test_actionfactory_unknown(action_factory, player):
+    with pytest.raises(ValueError):
+        action_factory.create("Steal", player)
+
 """ Test Base Actions """
 def test_salary(player):
     a = Salary(actor=player)
@@ -82,9 +139,16 @@ def test_tithe(player):
 
 def test_depose(player, target):
     a = Depose(actor=player)
+    obs = MagicMock()
+    a.add_observer(obs)
     target.lose_life = Mock()
     a.perform(target=target)
     target.lose_life.assert_called_once()
+
+    # Success is only reported once the target has revealed a card
+    obs.action_success.assert_not_called()
+    target._lose_life(Card.BANDIT)
+    obs.action_success.assert_called_once_with(a)
     with pytest.raises(ValueError):
         a.perform()
 
@@ -0,0 +1,196 @@
+import json
+import random
+
+import pytest
+
+from depose.archive import (
+    HEADER, MAGIC, VERSION, Archive, ArchiveWriter, BitReader, BitWriter, decode, encode, main,
+)
+from depose.headless import new_game, random_choice
+from depose.replay import record_game
+
+
+def recorded_game(seed, num_players=4, max_decisions=None):
+    game, ui = new_game(num_players, rng=random.Random(seed))
+    recorder = record_game(game, ui, random_choice(random.Random(seed)), seed=seed,
+                           max_decisions=max_decisions)
+    return game, recorder.records
+
+@pytest.fixture
+def games():
+    return [recorded_game(seed, 2 + seed % 5) for seed in range(10)]
+
+@pytest.fixture
+def archive_path(games, tmp_path):
+    path = str(tmp_path / "games.dpa")
+    writer = ArchiveWriter(path)
+    for _, records in games:
+        writer.write(records)
+    writer.close()
+    return path
+
+
+def test_bits():
+    out = BitWriter()
+    fields = [(5, 3), (0, 1), (1, 1), (200, 8), (3, 2)]
+    for value, width in fields:
+        out.write(value, width)
+    data = out.getvalue()
+    assert 2 == len(data)
+
+    bits = BitReader(data)
+    assert [value for value, _ in fields] == [bits.read(width) for _, width in fields]
+    with pytest.raises(ValueError):
+        bits.read(8)
+    with pytest.raises(ValueError):
+        out.write(8, 3)
+
+def test_round_trip(games):
+    for game, records in games:
+        decoded = decode(encode(records))
+        assert records[1:] == decoded[1:]
+
+        header = decoded[0]
+        for key in ("hands", "coins", "order"):
+            assert records[0][key] == header[key]
+        assert sorted(records[0]["deck"]) == header["deck"]
+
+def test_unfinished_game():
+    game, records = recorded_game(0, max_decisions=5)
+    assert game.winner is None
+    assert records[1:] == decode(encode(records))[1:]
+
+def test_archive(games, archive_path):
+    archive = Archive.load(archive_path)
+    assert len(games) == len(archive)
+    assert isinstance(archive[0], memoryview)
+    assert bytes(archive[-1]) == encode(games[-1][1])
+
+    for i, (game, records) in enumerate(games):
+        assert records[1:] == archive.records(i)[1:]
+        replayed = archive.replayer(i).run()
+        assert game.players.index(game.winner) == replayed.players.index(replayed.winner)
+        assert [p.cards for p in game.players] == [p.cards for p in replayed.players]
+
+    events = list(archive.events(2, 4))
+    assert games[2][1][1:] + games[3][1][1:] == [record for _, record in events]
+    assert {2, 3} == {i for i, _ in events}
+    with pytest.raises(IndexError):
+        archive[len(games)]
+
+    del events
+    archive.close()
+
+def test_append(games, archive_path):
+    writer = ArchiveWriter(archive_path, append=True)
+    assert len(games) == len(writer)
+    writer.write(games[0][1])
+    writer.close()
+
+    archive = Archive.load(archive_path)
+    assert len(games) + 1 == len(archive)
+    assert bytes(archive[0]) == bytes(archive[len(games)])
+    archive.close()
+
+def test_failed_append(games, archive_path, tmp_path):
+    with open(archive_path, "rb") as f:
+        before = f.read()
+
+    good, bad = tmp_path / "good.jsonl", tmp_path / "bad.jsonl"
+    good.write_text("".join(json.dumps(r) + "\n" for r in games[0][1]))
+    bad.write_text("not json\n")
+    with pytest.raises(ValueError):
+        main([archive_path, str(good), str(bad)])
+    with open(archive_path, "rb") as f:
+        assert before == f.read()
+
+    # A writer which is never closed leaves the archive as it was
+    writer = ArchiveWriter(archive_path, append=True)
+    writer.write(games[0][1])
+    writer.file.close()
+    archive = Archive.load(archive_path)
+    assert len(games) == len(archive)
+    archive.close()
+
+    with ArchiveWriter(archive_path, append=True) as writer:
+        writer.write(games[1][1])
+    archive = Archive.load(archive_path)
+    assert len(games) + 1 == len(archive)
+    assert archive.records(1) == archive.records(len(games))
+    archive.close()
+
+def test_writer_never_closed(games, tmp_path):
+    path = str(tmp_path / "games.dpa")
+    writer = ArchiveWriter(path)
+    writer.write(games[0][1])
+    writer.file.close()
+
+    archive = Archive.load(path)
+    assert 0 == len(archive)
+    archive.close()
+    with ArchiveWriter(path, append=True) as writer:
+        writer.write(games[1][1])
+    archive = Archive.load(path)
+    assert [games[1][1][1:]] == [archive.records(i)[1:] for i in range(len(archive))]
+    archive.close()
+
+    # Written before empty archives had an index: refused rather than overwritten
+    placeholder = tmp_path / "placeholder.dpa"
+    data = HEADER.pack(MAGIC, VERSION, 0, 0) + encode(games[0][1])
+    placeholder.write_bytes(data)
+    with pytest.raises(ValueError):
+        ArchiveWriter(str(placeholder), append=True)
+    with pytest.raises(ValueError):
+        Archive.load(str(placeholder))
+    assert data == placeholder.read_bytes()
+
+def test_bad_files(archive_path, tmp_path):
+    with open(archive_path, "rb") as f:
+        data = f.read()
+
+    truncated = tmp_path / "truncated.dpa"
+    truncated.write_bytes(data[:-8])
+    with pytest.raises(ValueError):
+        Archive.load(str(truncated))
+
+    other = tmp_path / "other.dpa"
+    other.write_bytes(b"not an archive at all, just some bytes")
+    with pytest.raises(ValueError):
+        Archive.load(str(other))
+
+def test_main(games, tmp_path, capsys):
+    logs = []
+    for i, (_, records) in enumerate(games[:3]):
+        path = tmp_path / "{}.jsonl".format(i)
+        path.write_text("".join(json.dumps(r) + "\n" for r in records))
+        logs.append(str(path))
+
+    main([str(tmp_path / "games.dpa")] + logs)
+    events = sum(len(records) - 1 for _, records in games[:3])
+    assert capsys.readouterr().out.startswith("3 games, {} events".format(events))
+
+def test_close_after_break(archive_path):
+    archive = Archive.load(archive_path)
+    for i, record in archive.events():
+        if record[0] == "c":
+            break
+    archive.close()
+
+    # Iterators kept hold of are ended by close()
+    archive = Archive.load(archive_path)
+    events = archive.events()
+    next(events)
+    records = iter(archive)
+    next(records)
+    archive.close()
+    with pytest.raises(StopIteration):
+        next(events)
+
+def test_close_with_record_held(archive_path):
+    archive = Archive.load(archive_path)
+    record = archive[0]
+    with pytest.raises(ValueError):
+        archive.close()
+
+    del record
+    archive.close()
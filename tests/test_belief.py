@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from depose.belief import BeliefTracker
+from depose.headless import HeadlessDriver, new_game
+from depose.model import Card, Decision
+from depose.policies import create_policy
+from depose.view import OptionListState
+
+
+class Action():
+    def __init__(self, name, actor):
+        self.name = name
+        self.actor = actor
+
+
+@pytest.fixture
+def game():
+    game, ui = new_game(3, rng=random.Random(0))
+    return game
+
+@pytest.fixture
+def tracker(game):
+    return BeliefTracker(game, game.players[0])
+
+
+def decide(player, decision, value, action=None):
+    """ Answer a prompt as Player.handle would, telling the decision observers """
+    prompt = OptionListState(player.ui, "", [], decision, action)
+    player.decision_obs.notify("notify_decision", player, prompt, value)
+
+
+def test_prior(game, tracker):
+    viewer, opponent = game.players[0], game.players[1]
+    pool = tracker.pool()
+    assert sum(pool) == 15 - len(viewer.cards)
+
+    expected = tracker.expected(opponent)
+    for card in Card:
+        assert expected[card.value] == pytest.approx(2 * pool[card.value] / sum(pool))
+
+    with pytest.raises(ValueError):
+        tracker.holding(viewer)
+
+def test_claims(game, tracker):
+    opponent = game.players[1]
+    before = tracker.can_claim(opponent, "Tithe")
+    decide(opponent, Decision.ACTION, "TITHE")
+    assert tracker.can_claim(opponent, "Tithe") > before
+
+    # Not countering a Murder makes holding a Medic less likely
+    before = tracker.holding(opponent)[Card.MEDIC.value]
+    decide(opponent, Decision.COUNTER, False, Action("Murder", game.players[2]))
+    assert tracker.holding(opponent)[Card.MEDIC.value] < before
+
+def test_reveal_and_lose_life(game, tracker):
+    opponent = game.players[1]
+    card = opponent.cards[0]
+
+    decide(opponent, Decision.REVEAL, card, Action("Tithe", opponent))
+    assert tracker.holding(opponent)[card.value] == pytest.approx(1.0)
+
+    pool = tracker.pool()
+    decide(opponent, Decision.LOSE_LIFE, card)
+    opponent.remove_card(card)
+    assert tracker.pool()[card.value] == pool[card.value] - 1
+    assert sum(tracker.expected(opponent)) == pytest.approx(1.0)
+
+def test_private_draws_reset(game, tracker):
+    opponent = game.players[1]
+    decide(opponent, Decision.ACTION, "TITHE")
+    opponent.draw_cards(2)
+    assert tracker.beliefs[1].size == 4
+    assert sum(tracker.expected(opponent)) == pytest.approx(4.0)
+    assert set(tracker.beliefs[1].weights) == {1.0}
+
+def test_whole_games():
+    for seed in range(2):
+        game, ui = new_game(4, rng=random.Random(seed))
+        trackers = [BeliefTracker(game, p) for p in game.players]
+        policies = {p: create_policy("bayes", random.Random(seed)) for p in game.players}
+        driver = HeadlessDriver(game, ui, lambda p, s: policies[p].choose(p, s), max_decisions=500)
+        driver.start()
+        while game.winner is None and ui.prompts and driver.decisions < 500:
+            for tracker in trackers:
+                for p in game.players:
+                    if p is not tracker.viewer:
+                        assert sum(tracker.expected(p)) == pytest.approx(len(p.cards))
+            driver.step()
+
+def test_policy_sees_whole_game():
+    """ A started policy's tracker hears claims made before its first prompt """
+    game, ui = new_game(2, rng=random.Random(0))
+    first, second = game.turn_queue[0], game.turn_queue[1]
+    bayes = create_policy("bayes", random.Random(0))
+    bayes.start(game, second)
+
+    def choose(player, state):
+        if player is first and state.decision is Decision.ACTION:
+            return next(o for o in state.options if o.value == "TITHE")
+        return bayes.choose(player, state) if player is second else state.options[0]
+
+    driver = HeadlessDriver(game, ui, choose)
+    driver.start()
+    driver.step() # first claims Tithe, and second hasn't been asked anything yet
+    assert bayes.tracker.holding(first)[Card.LORD.value] > 0.5
+    assert bayes.beliefs(second) is bayes.tracker
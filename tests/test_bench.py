@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from depose import bench
+
+
+def test_benchmarks_run():
+    results = bench.run(scale=0.001, repeat=1)
+    assert list(bench.BENCHMARKS) == [r["name"] for r in results]
+    for r in results:
+        assert r["ops"] >= 1
+        assert r["seconds"] > 0
+        assert r["ns_per_op"] == pytest.approx(r["seconds"] / r["ops"] * 1e9)
+
+def test_scripted_turns():
+    for scenario in (bench.bench_challenge, bench.bench_counter):
+        assert scenario(1) > 0
+
+def test_unknown_benchmark():
+    with pytest.raises(ValueError):
+        bench.run(["nope"])
+
+def test_compare():
+    baseline = bench.report([
+        {"name": "a", "ns_per_op": 100.0},
+        {"name": "b", "ns_per_op": 100.0},
+    ])
+    results = [
+        {"name": "a", "ns_per_op": 115.0},
+        {"name": "b", "ns_per_op": 150.0},
+        {"name": "c", "ns_per_op": 999.0}, # Not in the baseline
+    ]
+    assert [("b", 100.0, 150.0)] == bench.compare(results, baseline, tolerance=0.2)
+
+def test_main(tmp_path, capsys):
+    output = tmp_path / "bench.json"
+    assert 0 == bench.main(["deck.get_add", "--scale", "0.001", "-r", "1", "--json", "-o", str(output)])
+
+    data = json.loads(capsys.readouterr().out)
+    assert data == json.loads(output.read_text())
+    assert ["deck.get_add"] == [r["name"] for r in data["results"]]
+
+    data["results"][0]["ns_per_op"] = 1e-3 # Impossibly fast baseline
+    output.write_text(json.dumps(data))
+    assert 1 == bench.main(["deck.get_add", "--scale", "0.001", "-r", "1", "--compare", str(output)])
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from depose.endgame import WIN, EndgameTable, entry_score, solve
+from depose.headless import HeadlessDriver, new_game
+from depose.model import Card
+from depose.policies import EndgamePolicy, HonestPolicy
+from depose.state import DEPOSE, MURDER, GameState
+
+CARDS = (Card.MERCENARY.value, Card.MEDIC.value)
+
+
+@pytest.fixture(scope="module")
+def table():
+    return solve(CARDS)
+
+
+def position(coins, hands):
+    state = GameState(2)
+    state.coins[:] = bytes(coins)
+    for seat, hand in enumerate(hands):
+        for card in hand:
+            state.add_card(seat, card.value)
+    return state
+
+
+def test_consistent(table):
+    """ Each entry is what the best move in its position leads to """
+    for i in range(0, len(table), 7):
+        state = table.position(i)
+        assert entry_score(table.data[i]) == max(table.move_scores(state).values())
+
+def test_known_positions(table):
+    # One card left and 7 coins against it: Depose wins at once
+    state = position([7, 0], [(Card.MEDIC,), (Card.MERCENARY,)])
+    assert WIN + 1 == table.entry(state)
+    assert DEPOSE == table.best_move(state)
+
+    # 10 coins forces a Depose
+    state = position([10, 0], [(Card.MEDIC,), (Card.MERCENARY, Card.MEDIC)])
+    assert [DEPOSE] == list(table.move_scores(state))
+
+    # Losing a challenge with the last card loses the game this turn
+    state = position([3, 0], [(Card.MEDIC,), (Card.MEDIC, Card.MEDIC)])
+    assert -999 == table.move_scores(state)[MURDER]
+
+def test_save_and_load(table, tmp_path):
+    path = str(tmp_path / "endgame.tbl")
+    table.save(path)
+    loaded = EndgameTable.load(path)
+    try:
+        assert CARDS == loaded.cards
+        assert bytes(table.data) == bytes(loaded.data)
+    finally:
+        loaded.close()
+
+    with open(path, "r+b") as f:
+        f.truncate(100)
+    with pytest.raises(ValueError):
+        EndgameTable.load(path)
+
+def test_policy(table):
+    game, ui = new_game(2, rng=random.Random(0))
+    hands = [[Card.MERCENARY, Card.MEDIC], [Card.MEDIC, Card.MEDIC]]
+    for p, hand in zip(game.players, hands):
+        p.set_cards(hand)
+
+    endgame = EndgamePolicy(random.Random(0), table)
+    honest = HonestPolicy(random.Random(0))
+    policies = dict(zip(game.players, (endgame, honest)))
+    for p, policy in policies.items():
+        policy.start(game, p)
+    driver = HeadlessDriver(game, ui, lambda p, s: policies[p].choose(p, s), max_decisions=500)
+    driver.run()
+    assert endgame.endgame_decisions > 0
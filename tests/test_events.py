@@ -0,0 +1,75 @@
+import pytest
+from depose.events import Channel
+
+
+class Listener():
+    def __init__(self, log, name, channel=None, action=None):
+        self.log = log
+        self.name = name
+        self.channel = channel
+        self.action = action
+
+    def ping(self, value):
+        self.log.append((self.name, value))
+        if self.action:
+            self.action(self)
+
+
+@pytest.fixture
+def channel():
+    return Channel("ping")
+
+
+def test_ordered_set(channel):
+    log = []
+    a, b, c = (Listener(log, name) for name in "abc")
+    for o in (a, b, c, a):
+        channel.add(o)
+    assert [a, b, c] == list(channel)
+    assert 3 == len(channel)
+
+    assert channel.remove(b)
+    assert not channel.remove(b)
+    assert b not in channel
+
+    channel.notify("ping", 1)
+    assert [("a", 1), ("c", 1)] == log
+
+def test_unknown_event(channel):
+    with pytest.raises(ValueError):
+        channel.notify("pong", 1)
+
+def test_remove_self_during_dispatch(channel):
+    log = []
+    a = Listener(log, "a", action=lambda o: channel.remove(o))
+    b = Listener(log, "b")
+    channel.add(a)
+    channel.add(b)
+
+    channel.notify("ping", 1)
+    assert [("a", 1), ("b", 1)] == log
+    assert [b] == list(channel)
+
+def test_change_others_during_dispatch(channel):
+    log = []
+    c = Listener(log, "c")
+    b = Listener(log, "b")
+    a = Listener(log, "a", action=lambda o: (channel.remove(b), channel.add(c)))
+    channel.add(a)
+    channel.add(b)
+
+    channel.notify("ping", 1)
+    assert [("a", 1)] == log # b was removed before its turn, c added after it started
+
+    channel.notify("ping", 2)
+    assert [("a", 1), ("a", 2), ("c", 2)] == log
+
+def test_iterate_while_changing(channel):
+    log = []
+    listeners = [Listener(log, i) for i in range(4)]
+    for o in listeners:
+        channel.add(o)
+    for o in channel:
+        channel.remove(o)
+        channel.add(Listener(log, "new"))
+    assert 4 == len(channel)
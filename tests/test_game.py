@@ -89,3 +89,15 @@ def test_can_perform(player, game, action_factory):
 
     for card, action in test_cases:
         assert not game.can_perform(card, action), "{} cannot perform {}".format(card, action.name)
+
+def test_cleanup_winner(player, deck, action_factory, ui):
+    player.draw_cards(1)
+    dead_player = Player("Dead Player", deck, action_factory, ui)
+
+    game = Game([player, dead_player], ui)
+    game.play = MagicMock()
+    game.active_player = game.turn_queue.popleft()
+    game.cleanup()
+
+    assert player is game.winner
+    game.play.assert_not_called()
@@ -0,0 +1,67 @@
+import random
+import sys
+
+import pytest
+
+from depose.model import Decision
+from depose.headless import HeadlessUI, HeadlessDriver, new_game, random_choice
+
+
+def test_headless_ui_pairs_prompt_with_player():
+    ui = HeadlessUI()
+    player = object()
+    state = object()
+
+    ui.add_observer(player)
+    ui.set_state(state)
+
+    assert (player, state) == ui.prompts.popleft()
+
+@pytest.mark.parametrize("num_players", [2, 3, 4, 5, 6])
+def test_play_game(num_players):
+    game, ui = new_game(num_players)
+    winner = HeadlessDriver(game, ui, random_choice(random.Random(num_players))).run()
+
+    assert winner is not None
+    assert [winner] == list(game.turn_queue)
+    assert 0 == len(ui.prompts)
+
+def test_constant_stack_depth():
+    """ Each turn starts from the driver loop rather than from inside the
+        last one, so the engine is never deeper than a single turn """
+    depths = []
+
+    class DepthUI(HeadlessUI):
+        def set_state(self, state):
+            if state.decision is Decision.ACTION:
+                frame, depth = sys._getframe(), 0
+                while frame is not None:
+                    frame, depth = frame.f_back, depth + 1
+                depths.append(depth)
+            super().set_state(state)
+
+    later = []
+    for seed in range(20):
+        ui = DepthUI()
+        game, _ = new_game(4, ui=ui, rng=random.Random(seed))
+        HeadlessDriver(game, ui, random_choice(random.Random(seed))).run()
+        later += depths[1:] # The first turn is started by the driver itself
+        depths.clear()
+
+    # How deep depends on how the last turn ended, but not on how many came before
+    assert len(later) > 200
+    assert max(later) - min(later) < 10
+
+def test_max_decisions():
+    game, ui = new_game(4)
+    driver = HeadlessDriver(game, ui, max_decisions=3)
+    driver.run()
+
+    assert 3 == driver.decisions
+
+def test_new_game_names():
+    game, _ = new_game(3, names=["a", "b", "c"])
+    assert ["a", "b", "c"] == [p.name for p in game.players]
+
+    with pytest.raises(ValueError):
+        new_game(3, names=["a", "b"])
@@ -0,0 +1,83 @@
+import random
+from collections import Counter
+
+import pytest
+
+from depose.headless import HeadlessDriver, new_game
+from depose.ismcts import determinize, search, unseen_cards
+from depose.model import Card
+from depose.policies import POLICIES, IsmctsPolicy, Policy
+from depose.sim import play_one
+from depose.state import GameState, MURDER
+
+
+@pytest.fixture
+def state():
+    game, ui = new_game(3, rng=random.Random(0))
+    return GameState.from_game(game)
+
+
+def test_determinize(state):
+    rng = random.Random(0)
+    pool = Counter(unseen_cards(state, 0))
+
+    for _ in range(20):
+        d = determinize(state, 0, rng)
+        assert state.cards(0) == d.cards(0)
+        assert [state.num_cards(s) for s in range(3)] == [d.num_cards(s) for s in range(3)]
+        assert sum(state.deck) == sum(d.deck)
+        assert pool == Counter(unseen_cards(d, 0))
+
+def test_search(state):
+    visits = search(state, 0, iterations=50, seed=0)
+
+    assert set(visits) <= set(state.moves())
+    assert 50 == sum(visits.values())
+    assert visits == search(state, 0, iterations=50, seed=0)
+
+def test_search_time_limit(state):
+    visits = search(state, 0, iterations=10 ** 9, time_limit=0.05, seed=0)
+    assert 0 < sum(visits.values()) < 10 ** 9
+
+def test_finds_winning_murder():
+    s = GameState(2)
+    s.add_card(0, Card.MERCENARY.value)
+    s.add_card(1, Card.LORD.value)
+    s.coins[0] = 3
+    s.coins[1] = 9
+
+    visits = search(s, 0, iterations=300, seed=1)
+    assert MURDER == max(visits, key=visits.get)
+
+def test_policy_plays_game():
+    game, ui = new_game(3, rng=random.Random(2))
+    policies = {p: IsmctsPolicy(random.Random(i), iterations=20) for i, p in enumerate(game.players)}
+
+    winner = HeadlessDriver(game, ui, lambda p, s: policies[p].choose(p, s)).run()
+    assert winner is not None
+
+def test_policy_workers():
+    game, ui = new_game(3, rng=random.Random(3))
+    policy = IsmctsPolicy(random.Random(0), iterations=20, workers=2)
+    game.play()
+    player, prompt = ui.prompts.popleft()
+
+    try:
+        assert policy.choose(player, prompt) in prompt.options
+    finally:
+        policy.close()
+
+def test_policy_closed_after_game(monkeypatch):
+    closed = []
+    class Closing(IsmctsPolicy):
+        def __init__(self, rng=None):
+            super().__init__(rng, iterations=5)
+
+        def close(self):
+            closed.append(self)
+            super().close()
+    monkeypatch.setitem(POLICIES, "ismcts", Closing)
+
+    assert isinstance(Closing(), Policy)
+    play_one(0, ["ismcts", "random"])
+    assert 1 == len(closed)
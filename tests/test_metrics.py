@@ -0,0 +1,84 @@
+import json
+import random
+
+import pytest
+
+from depose import metrics
+from depose.headless import HeadlessDriver, new_game, random_choice
+from depose.metrics import Metrics
+
+
+@pytest.fixture
+def registry():
+    m = metrics.enable(Metrics())
+    yield m
+    metrics.disable()
+
+
+def test_timer():
+    m = Metrics()
+    m.observe("phase", 2.0)
+    m.observe("phase", 1.0)
+    assert {"count": 2, "total": 3.0, "mean": 1.5, "min": 1.0, "max": 2.0} == m.snapshot()["phases"]["phase"]
+
+def test_spans():
+    m = Metrics()
+    owner_a, owner_b = object(), object()
+    m.start("query", owner_a)
+    m.start("query", owner_b)
+    m.stop("query", owner_a)
+    m.stop("query", owner_a) # Already stopped
+    m.stop("other", owner_a) # Never started
+    assert 1 == m.timers["query"].count
+    assert "other" not in m.timers
+
+def test_counters():
+    m = Metrics()
+    m.incr("lives_lost")
+    m.incr("declines", "challenge", 2)
+    m.incr("declines", "counter")
+    assert {"declines": {"challenge": 2, "counter": 1}, "lives_lost": 1} == m.snapshot()["counters"]
+
+def test_prometheus():
+    m = Metrics()
+    m.incr("lives_lost")
+    m.incr("declines", "counter")
+    m.observe("life_loss", 0.5)
+    text = m.to_prometheus()
+
+    assert "# TYPE depose_lives_lost_total counter\ndepose_lives_lost_total 1\n" in text
+    assert 'depose_declines_total{kind="counter"} 1' in text
+    assert 'depose_phase_seconds_count{phase="life_loss"} 1' in text
+    assert 'depose_phase_seconds_sum{phase="life_loss"} 0.5' in text
+
+def test_write(tmp_path):
+    m = Metrics()
+    m.incr("lives_lost")
+    m.write(str(tmp_path / "m.json"))
+    m.write(str(tmp_path / "m.prom"))
+
+    assert m.snapshot() == json.loads((tmp_path / "m.json").read_text())
+    assert (tmp_path / "m.prom").read_text() == m.to_prometheus()
+
+def test_disabled():
+    m = metrics.enable(Metrics())
+    metrics.disable()
+    game, ui = new_game(2, rng=random.Random(0))
+    HeadlessDriver(game, ui, random_choice(random.Random(0))).run()
+    assert {"counters": {}, "phases": {}} == m.snapshot()
+
+def test_game(registry):
+    game, ui = new_game(4, rng=random.Random(0))
+    driver = HeadlessDriver(game, ui, random_choice(random.Random(0)))
+    driver.run()
+
+    snapshot = registry.snapshot()
+    phases, counters = snapshot["phases"], snapshot["counters"]
+    turns = sum(counters["actions_chosen"].values())
+    assert turns == phases["action_selection"]["count"] == phases["turn"]["count"]
+    assert counters["lives_lost"] == phases["life_loss"]["count"]
+    assert sum(counters["challenges"].values()) == phases["challenge_resolution"]["count"]
+    assert counters["questions_asked"]["challenge"] == (
+        counters["declines"]["challenge"] + counters["accepts"]["challenge"]
+    )
+    assert not registry._open # Every phase which started has finished
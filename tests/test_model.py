@@ -19,3 +19,36 @@ def test_deck():
     assert 2 in s
     assert 3 in s
     assert 4 in s
+
+def test_deck_draw():
+    deck = Deck()
+    for i in range(10):
+        deck.add(i)
+
+    drawn = deck.draw(4)
+    assert 4 == len(drawn)
+    assert 6 == len(deck)
+    assert set(range(10)) == set(drawn) | set(deck.cards)
+
+    with pytest.raises(ValueError):
+        deck.draw(7)
+
+def test_deck_seeded():
+    import random
+
+    def drawn(seed):
+        deck = Deck(random.Random(seed))
+        for i in range(10):
+            deck.add(i)
+        return deck.draw(10)
+
+    assert drawn(1) == drawn(1)
+    assert sorted(drawn(2)) == list(range(10))
+
+def test_deck_numpy_generator():
+    np = pytest.importorskip("numpy")
+    deck = Deck(np.random.default_rng(0))
+    deck.add(1)
+    deck.add(2)
+
+    assert {1, 2} == set(deck.draw(2))
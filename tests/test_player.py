@@ -76,6 +76,23 @@ def test_observers(player, state_obs):
     player.remove_state_observer(state_obs)
     assert state_obs not in player.state_obs
 
+def test_change_observers(player):
+    obs = MagicMock()
+    player.add_change_observer(obs)
+
+    player.coins = 2 # Unchanged
+    player.coins -= 5 # Clamped to 0
+    player.coins -= 1
+    obs.notify_coins.assert_called_once_with(player)
+
+    player.add_card(Card.MEDIC)
+    player.lose_life(Card.MEDIC)
+    assert 2 == obs.notify_cards.call_count
+
+    player.remove_change_observer(obs)
+    player.coins = 5
+    obs.notify_coins.assert_called_once_with(player)
+
 def test_wait_for_input(player, ui):
     ui.set_state = MagicMock()
     fake_callback = MagicMock()
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from depose.model import Card, Decision
+from depose.policies import HonestPolicy, AggressivePolicy, create_policy, can_claim
+from depose.view import Option
+
+
+class State():
+    def __init__(self, decision, options, action=None):
+        self.decision = decision
+        self.options = options
+        self.action = action
+
+class Action():
+    def __init__(self, name):
+        self.name = name
+
+class Player():
+    def __init__(self, cards, coins=0):
+        self.cards = cards
+        self.coins = coins
+
+
+def test_can_claim():
+    assert can_claim([Card.LORD], "Tithe")
+    assert can_claim([Card.DIPLOMAT], "Counter Mug")
+    assert not can_claim([Card.MEDIC], "Mug")
+    assert can_claim([], "Salary")
+
+def test_honest_action():
+    policy = HonestPolicy(random.Random(0))
+    options = [Option("Salary", "SALARY"), Option("Tithe", "TITHE"), Option("Mug", "MUG")]
+
+    state = State(Decision.ACTION, options)
+    assert "MUG" == policy.choose(Player([Card.BANDIT]), state).value
+    assert "SALARY" == policy.choose(Player([Card.MEDIC]), state).value
+
+def test_honest_counter():
+    policy = HonestPolicy(random.Random(0))
+    options = [Option("Yes", True), Option("No", False)]
+
+    state = State(Decision.COUNTER, options, Action("Murder"))
+    assert policy.choose(Player([Card.MEDIC]), state).value
+    assert not policy.choose(Player([Card.LORD]), state).value
+
+def test_reveal():
+    policy = AggressivePolicy(random.Random(0))
+    options = [Option("LORD", Card.LORD), Option("BANDIT", Card.BANDIT)]
+
+    state = State(Decision.REVEAL, options, Action("Mug"))
+    assert Card.BANDIT == policy.choose(Player([Card.LORD, Card.BANDIT]), state).value
+
+def test_create_policy():
+    assert isinstance(create_policy("honest"), HonestPolicy)
+    with pytest.raises(ValueError):
+        create_policy("unknown")
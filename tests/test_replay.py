@@ -0,0 +1,72 @@
+import io
+import json
+import random
+
+import pytest
+
+from depose.headless import new_game, random_choice
+from depose.model import Decision
+from depose.replay import Replayer, ReplayError, record_game, main
+
+
+@pytest.fixture
+def recorded():
+    game, ui = new_game(4, rng=random.Random(1))
+    f = io.StringIO()
+    recorder = record_game(game, ui, random_choice(random.Random(1)), seed=1, file=f)
+    return game, recorder, f.getvalue()
+
+
+def test_log_format(recorded):
+    game, recorder, text = recorded
+    lines = [json.loads(line) for line in text.splitlines()]
+
+    assert lines == recorder.records
+    assert 1 == lines[0]["seed"]
+    assert [p.name for p in game.players] == lines[0]["players"]
+    assert ["w", game.players.index(game.winner)] == lines[-1]
+    assert recorder.turns == sum(1 for r in lines[1:] if r[0] == "d" and r[2] == Decision.ACTION.value)
+
+def test_replay(recorded):
+    game, recorder, text = recorded
+    replayed = Replayer(json.loads(line) for line in text.splitlines()).run()
+
+    assert game.winner.name == replayed.winner.name
+    for original, copy in zip(game.players, replayed.players):
+        assert original.coins == copy.coins
+        assert original.cards == copy.cards
+
+def test_fast_forward(recorded):
+    game, recorder, text = recorded
+    replayer = Replayer(recorder.records)
+    replayer.run(until_turn=4)
+
+    player, prompt = replayer.pending
+    assert 3 == replayer.turn
+    assert Decision.ACTION is prompt.decision
+    assert replayer.game.winner is None
+    assert replayer.state().phase == Decision.ACTION.value
+
+    # Carrying on from there finishes the same game
+    assert game.winner.name == replayer.run().winner.name
+
+def test_divergence(recorded):
+    game, recorder, text = recorded
+    records = list(recorder.records)
+    seat, decision, move = records[1][1:]
+    records[1] = ["d", (seat + 1) % 4, decision, move]
+
+    with pytest.raises(ReplayError):
+        Replayer(records).run()
+
+def test_missing_header():
+    with pytest.raises(ReplayError):
+        Replayer([["d", 0, 1, 1]])
+
+def test_cli(recorded, tmp_path, capsys):
+    game, recorder, text = recorded
+    path = tmp_path / "game.jsonl"
+    path.write_text(text)
+
+    main([str(path)])
+    assert "{} won".format(game.winner.name) in capsys.readouterr().out
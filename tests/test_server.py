@@ -0,0 +1,114 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from depose.server import GameServer, play_client
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 30))
+
+async def serve(**kwargs):
+    server = GameServer(port=0, rng=random.Random(0), **kwargs)
+    await server.start()
+    return server
+
+async def silent_client(port, name, disconnect=False):
+    """ Joins, then never answers """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(json.dumps({"type": "join", "name": name}).encode() + b"\n")
+    await writer.drain()
+    if disconnect:
+        await reader.readline() # Seated
+        writer.close()
+        return None
+    while True:
+        line = await reader.readline()
+        if not line or json.loads(line)["type"] == "over":
+            writer.close()
+            return json.loads(line)["winner"] if line else None
+
+
+def test_many_tables():
+    async def main():
+        server = await serve(players_per_table=2)
+        names = ["P{}".format(i) for i in range(6)]
+        winners = await asyncio.gather(*(play_client("127.0.0.1", server.port, n) for n in names))
+        await server.close()
+        return server, winners
+
+    server, winners = run(main())
+    assert 3 == len(server.results)
+    assert sorted(w for _, w in server.results) == sorted(set(winners))
+    assert all(w in ("P{}".format(i) for i in range(6)) for w in winners)
+
+def test_timeout():
+    async def main():
+        server = await serve(players_per_table=2, decision_timeout=0.01)
+        winners = await asyncio.gather(
+            play_client("127.0.0.1", server.port, "Alice"),
+            silent_client(server.port, "Bob"),
+        )
+        await server.close()
+        return server, winners
+
+    server, winners = run(main())
+    assert 1 == len(server.results)
+    assert winners[0] == winners[1] == server.results[0][1]
+
+def test_disconnect():
+    async def main():
+        server = await serve(players_per_table=2)
+        winners = await asyncio.gather(
+            play_client("127.0.0.1", server.port, "Alice"),
+            silent_client(server.port, "Bob", disconnect=True),
+        )
+        await server.close()
+        return server, winners
+
+    server, winners = run(main())
+    assert winners[0] in ("Alice", "Bob")
+    assert 1 == len(server.results)
+
+def test_disconnect_in_lobby():
+    async def wait_for(test):
+        for _ in range(100):
+            if test():
+                return
+            await asyncio.sleep(0.01)
+
+    async def main():
+        server = await serve(players_per_table=2)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(json.dumps({"type": "join", "name": "Carol"}).encode() + b"\n")
+        await wait_for(lambda: server.lobby)
+        writer.close()
+        await wait_for(lambda: not server.lobby)
+        assert not server.lobby
+
+        winners = await asyncio.gather(
+            play_client("127.0.0.1", server.port, "Alice"),
+            play_client("127.0.0.1", server.port, "Bob"),
+        )
+        await server.close()
+        return server, winners
+
+    server, winners = run(main())
+    assert 1 == len(server.results)
+    assert winners[0] == winners[1] == server.results[0][1]
+    assert winners[0] in ("Alice", "Bob")
+
+def test_max_tables():
+    async def main():
+        server = await serve(players_per_table=2, max_tables=1)
+        await asyncio.gather(*(play_client("127.0.0.1", server.port, str(i)) for i in range(4)))
+        await server.close()
+        return server
+
+    assert 2 == len(run(main()).results)
+
+def test_table_size():
+    with pytest.raises(ValueError):
+        GameServer(players_per_table=1)
@@ -0,0 +1,70 @@
+import pytest
+
+from depose import sim
+from depose.model import Decision
+from depose.sim import Summary, play_one, run, seating, simulate
+
+
+def test_seating():
+    policies = ["a", "b", "c"]
+    assert ["a", "b", "c"] == seating(policies, 0)
+    assert ["b", "c", "a"] == seating(policies, 1)
+    assert ["a", "b", "c"] == seating(policies, 3)
+
+def test_summary_merge():
+    a = Summary()
+    a.record(["honest", "random"], 0, 10, {"SALARY": 6, "TITHE": 4})
+    b = Summary()
+    b.record(["random", "honest"], 1, 20, {"SALARY": 20})
+    b.record(["random", "honest"], None, 30, {})
+
+    total = a.merge(b)
+    assert 3 == total.games
+    assert 1 == total.draws
+    assert 20 == total.mean_turns
+    assert {"honest": 2 / 3, "random": 0.0} == total.policy_win_rates()
+    assert {0: 1 / 3, 1: 1 / 3} == total.seat_win_rates()
+    assert 26 == total.actions["SALARY"]
+
+def test_run():
+    summary = run(20, ["honest", "aggressive", "random"], workers=1, batch_size=8)
+
+    assert 20 == summary.games
+    assert 20 == sum(summary.lengths.values())
+    assert 20 == sum(summary.seat_wins.values()) + summary.draws
+    assert 60 == sum(summary.policy_games.values())
+
+def test_deterministic():
+    a = run(10, ["random", "random"], workers=1, seed=3)
+    b = run(10, ["random", "random"], workers=1, seed=3)
+    assert a.to_dict() == b.to_dict()
+
+def test_process_pool():
+    summaries = list(simulate(10, ["random", "honest"], workers=2, batch_size=5))
+    assert [5, 5] == [s.games for s in summaries]
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        list(simulate(1, ["random", "nonsense"]))
+
+def test_counters_counted():
+    summary = run(20, ["honest", "aggressive"], workers=1)
+    assert any(name.startswith("COUNTER ") for name in summary.actions)
+
+def test_no_actions():
+    summary = Summary()
+    summary.record(["random", "random"], None, 0, {})
+    assert {} == summary.action_frequencies()
+
+def test_turns_are_action_prompts(monkeypatch):
+    prompts = []
+    class CountingDriver(sim.HeadlessDriver):
+        def step(self):
+            prompts.append(self.ui.prompts[0][1].decision)
+            super().step()
+    monkeypatch.setattr(sim, "HeadlessDriver", CountingDriver)
+
+    # Counters are played in this game, and aren't turns of their own
+    _, turns, actions = play_one(3, ["aggressive", "aggressive", "honest", "honest"])
+    assert prompts.count(Decision.ACTION) == turns
+    assert sum(actions.values()) > turns
@@ -0,0 +1,87 @@
+from collections import deque
+
+import pytest
+
+from depose.spectate import GameThread, Snapshot, Spectator, drain
+
+
+@pytest.fixture
+def thread():
+    return GameThread(["random", "random"], seed=0)
+
+@pytest.fixture
+def gui():
+    class GUI():
+        def __init__(self):
+            self.lines = []
+            self.prompts = []
+            self.active = None
+            self.scheduled = []
+            self.master = self
+
+        def after(self, delay, callback):
+            self.scheduled.append(callback)
+
+        def attach_player_panel(self, players):
+            self.players = players
+
+        def message(self, text):
+            self.lines.append(text)
+
+        def update_active_player(self, player):
+            self.active = player
+
+        def show_prompt(self, prompt, options=()):
+            self.prompts.append(prompt)
+
+    return GUI()
+
+
+def test_game_thread(thread):
+    thread.run()
+
+    frames = list(thread.frames)
+    assert thread.driver.decisions + 1 == len(frames)
+    assert frames[-1].winner is not None
+    assert frames[-1].winner == thread.game.winner.name
+    assert "{} wins!".format(frames[-1].winner) in thread.messages[-1]
+
+def test_frames_dropped():
+    thread = GameThread(["random", "random"], seed=0, frames=deque(maxlen=3))
+    thread.run()
+    assert 3 == len(thread.frames)
+    assert thread.frames[-1].winner is not None
+
+    # Only the frames go, never their messages
+    assert thread.turn == sum("'s TURN" in text for text in thread.messages)
+    assert thread.messages[-1].endswith("wins!")
+
+def test_drain():
+    frames = deque([
+        Snapshot(1, [], None, None, None),
+        Snapshot(2, [], None, None, None),
+    ])
+    messages = deque(["a", "b", "c"])
+    latest, lines = drain(frames, messages)
+
+    assert 2 == latest.turn
+    assert ["a", "b", "c"] == lines
+    assert not frames and not messages
+    assert (None, []) == drain(frames, messages)
+
+def test_spectator(thread, gui):
+    spectator = Spectator(gui, thread, fps=50)
+    assert 20 == spectator.interval
+
+    spectator.start()
+    thread.join(10)
+    assert not thread.is_alive()
+    while gui.scheduled:
+        gui.scheduled.pop()()
+
+    winner = thread.game.winner
+    assert gui.prompts[-1].startswith("{} wins".format(winner.name))
+    for view, player in zip(gui.players, thread.game.players):
+        assert (view.coins, view.cards) == (player.coins, tuple(player.cards))
+    assert gui.lines[-1].endswith("wins!")
+    assert 1 == spectator.frames_rendered # Every frame but the newest was skipped
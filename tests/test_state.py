@@ -0,0 +1,162 @@
+import random
+
+import pytest
+
+from depose.headless import HeadlessDriver, HeadlessUI, new_game
+from depose.model import Card, Decision
+from depose.state import (
+    GameState, legal_moves, move_key, to_move, to_value,
+    ACTION, CHALLENGE, COUNTER, REVEAL, LOSE_LIFE, RETURN, OVER,
+    SALARY, DONATIONS, TITHE, MUG, MURDER, DEPOSE, DIPLOMACY,
+)
+
+
+@pytest.fixture
+def state():
+    s = GameState(3)
+    for seat, cards in enumerate([(Card.LORD, Card.BANDIT), (Card.MEDIC, Card.MEDIC), (Card.MERCENARY, Card.DIPLOMAT)]):
+        for card in cards:
+            s.add_card(seat, card.value)
+        s.coins[seat] = 2
+    s.deck[Card.DIPLOMAT.value] = 3
+    return s
+
+
+def test_hands(state):
+    assert [Card.LORD.value, Card.BANDIT.value] == state.cards(0)
+    state.remove_card(0, Card.LORD.value)
+    assert [Card.BANDIT.value] == state.cards(0)
+    assert 1 == state.num_cards(0)
+
+    with pytest.raises(ValueError):
+        state.remove_card(0, Card.LORD.value)
+
+def test_copy(state):
+    clone = state.copy()
+    clone.step(SALARY)
+
+    assert 3 == clone.coins[0]
+    assert 2 == state.coins[0]
+    assert ACTION == state.phase
+    assert 1 == clone.player
+
+def test_moves(state):
+    assert (SALARY, DONATIONS, TITHE, MUG, DIPLOMACY) == state.moves()
+    state.coins[0] = 7
+    assert (MURDER, DEPOSE) == state.moves()[-2:]
+    state.coins[0] = 10
+    assert (DEPOSE,) == state.moves()
+
+def test_legal_moves(state):
+    assert state.moves() == legal_moves(state)
+    assert legal_moves(state) is legal_moves(state.copy())
+
+    state.step(MUG)
+    assert (1, 2) == legal_moves(state)
+    state.hands[4:8] = bytes(4) # Seat 1 is out
+    assert (2,) == legal_moves(state)
+    assert move_key(state) != move_key(GameState(3))
+
+def test_legal_moves_random():
+    rng = random.Random(0)
+    for _ in range(20):
+        game, ui = new_game(4, rng=random.Random(rng.getrandbits(64)))
+        game.play()
+        s = GameState.from_game(game, ui.prompts[0][1], ui.prompts[0][0])
+        while s.phase != OVER:
+            moves = legal_moves(s)
+            assert s.moves() == moves
+            s.step(rng.choice(moves), rng)
+
+def test_challenge(state):
+    state.step(TITHE)
+    assert (CHALLENGE, 1) == (state.phase, state.player)
+
+    state.step(0) # Seat 1 declines
+    state.step(1) # Seat 2 challenges
+    assert (REVEAL, 0) == (state.phase, state.player)
+
+    state.step(Card.LORD.value)
+    assert (LOSE_LIFE, 2) == (state.phase, state.player)
+
+    state.step(Card.DIPLOMAT.value)
+    assert 5 == state.coins[0]
+    assert (ACTION, 1) == (state.phase, state.player)
+
+def test_counter(state):
+    state.coins[0] = 3
+    state.step(MURDER)
+    state.step(1) # Target seat 1
+    state.step(0) # No challenges
+    state.step(0)
+    assert (COUNTER, 1) == (state.phase, state.player)
+
+    state.step(1) # Counter murder, and nobody challenges it
+    state.step(0)
+    state.step(0)
+    assert 2 == state.num_cards(1)
+    assert (ACTION, 1) == (state.phase, state.player)
+
+def test_game_over():
+    s = GameState(2)
+    s.add_card(0, Card.LORD.value)
+    s.add_card(1, Card.LORD.value)
+    s.coins[0] = 7
+    s.step(DEPOSE)
+    s.step(1)
+    s.step(Card.LORD.value)
+
+    assert OVER == s.phase
+    assert 0 == s.winner
+    assert () == s.moves()
+
+def test_matches_game():
+    """ Step a GameState alongside a real Game, comparing at every prompt """
+    for seed in range(30):
+        rng = random.Random(seed)
+        game, ui = new_game(2 + seed % 5)
+        expected = [GameState.from_game(game)]
+
+        def choose(player, prompt):
+            snap = GameState.from_game(game, prompt, player)
+            if snap.phase == RETURN and expected[0].returns == 2:
+                # Cards drawn during Diplomacy are random
+                expected[0].hands[:] = snap.hands
+                expected[0].deck[:] = snap.deck
+            assert snap == expected[0]
+
+            option = rng.choice(prompt.options)
+            assert to_move(game, prompt.decision, option.value) in snap.moves()
+            expected[0] = snap.copy()
+            expected[0].step(to_move(game, prompt.decision, option.value), rng)
+            return option
+
+        HeadlessDriver(game, ui, choose).run()
+        assert game.players.index(game.winner) == expected[0].winner
+
+def test_to_game(state):
+    ui = HeadlessUI()
+    game = state.to_game(ui)
+
+    assert [Card.LORD, Card.BANDIT] == game.players[0].cards
+    assert 2 == game.players[1].coins
+    assert 3 == len(game.players[0].deck.cards)
+    assert state == GameState.from_game(game)
+
+    game.play()
+    player, prompt = ui.prompts.popleft()
+    assert game.players[0] is player
+    assert Decision.ACTION is prompt.decision
+
+def test_apply_mid_turn(state):
+    state.step(TITHE)
+    with pytest.raises(ValueError):
+        state.to_game(HeadlessUI())
+
+def test_move_conversion():
+    game, ui = new_game(3)
+    assert MUG == to_move(game, Decision.ACTION, "MUG")
+    assert "MUG" == to_value(game, Decision.ACTION, MUG)
+    assert game.players[2] is to_value(game, Decision.TARGET, 2)
+    assert Card.MEDIC is to_value(game, Decision.RETURN, Card.MEDIC.value)
+    assert to_value(game, Decision.COUNTER, to_move(game, Decision.COUNTER, True))
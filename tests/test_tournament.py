@@ -0,0 +1,155 @@
+import json
+from collections import Counter
+from itertools import permutations
+
+import pytest
+
+from depose.tournament import (
+    Checkpoint, Result, TrueSkill, Tournament, elo_ratings, game_scores, seatings,
+)
+
+
+@pytest.fixture
+def entrants():
+    return ["honest", "aggressive", "random"]
+
+
+def test_seatings():
+    table = ("a", "b", "c")
+    assert [("a", "b", "c"), ("b", "c", "a"), ("c", "a", "b")] == seatings(table, 3)
+
+    every = seatings(table, 6)
+    assert sorted(permutations(table)) == sorted(every)
+    assert every == seatings(table, 8)[:6]
+
+def test_game_scores():
+    assert [1.0, 0.0] == game_scores((0, 1))
+    assert [0.5, 1.0, 0.0] == game_scores((1, 0, 2))
+    assert [0.75, 0.75, 0.0] == game_scores((0, 0, 2))
+
+def test_round_robin_schedule(entrants):
+    t = Tournament(entrants, rounds=2)
+
+    fixtures = [f for stage in t.stages() for f in stage]
+    assert 12 == t.num_games == len(fixtures)
+    assert list(range(12)) == [f.index for f in fixtures]
+    seats = Counter((name, seat) for f in fixtures for seat, name in enumerate(f.seats))
+    assert {4} == set(seats.values())
+
+def test_invalid(entrants):
+    with pytest.raises(ValueError):
+        Tournament(entrants + ["nonsense"])
+    with pytest.raises(ValueError):
+        Tournament(["random", "random"])
+    with pytest.raises(ValueError):
+        Tournament(entrants, table_size=4)
+    with pytest.raises(ValueError):
+        Tournament(entrants, format="knockout")
+
+def test_swiss_avoids_rematches():
+    t = Tournament(["honest", "aggressive", "bayes", "random"], format="swiss", rounds=3, games_per_match=1)
+    meetings = Counter()
+    for r in range(3):
+        for i, table in enumerate(t.tables(r)):
+            meetings[frozenset(table)] += 1
+            # Whoever is seated first wins
+            t.record(Result(r * 2 + i, table, (0, 1), 10))
+    assert {1} == set(meetings.values())
+
+    with pytest.raises(ValueError):
+        Tournament(["honest", "aggressive", "bayes", "random"], format="swiss").tables(1)
+
+def test_swiss_byes(entrants):
+    t = Tournament(entrants, format="swiss", rounds=3, games_per_match=1)
+    sat_out = []
+    for r in range(3):
+        table, = t.tables(r)
+        sat_out += [e for e in entrants if e not in table]
+        t.record(Result(r, table, (0, 1), 10))
+    assert sorted(entrants) == sorted(sat_out)
+
+def test_ratings():
+    # a always beats b, who always beats c
+    results = [Result(i, ("a", "b", "c"), (0, 1, 2), 10) for i in range(50)]
+
+    elo = elo_ratings(["a", "b", "c"], results)
+    assert elo["a"][0] > elo["b"][0] > elo["c"][0]
+    assert abs(sum(r for r, _ in elo.values())) < 1e-6
+    assert all(0 < interval < 400 for _, interval in elo.values())
+
+    trueskill = TrueSkill(["a", "b", "c"])
+    for r in results:
+        trueskill.rate(r.seats, r.ranks)
+    (mu_a, sigma_a), (mu_b, _), (mu_c, _) = (trueskill.ratings[e] for e in "abc")
+    assert mu_a > mu_b > mu_c
+    assert sigma_a < TrueSkill.SIGMA
+
+def test_play(entrants):
+    a = Tournament(entrants, rounds=2).play(workers=1, batch_size=5)
+    b = Tournament(entrants, rounds=2).play(workers=1, batch_size=4)
+
+    assert a.finished
+    assert a.played() == b.played()
+    standings = a.standings()
+    assert sorted(entrants) == sorted(name for name, _ in standings)
+    assert all(12 * 2 // 3 == stats["games"] for _, stats in standings)
+
+def test_process_pool(entrants):
+    t = Tournament(entrants, format="swiss", rounds=2, games_per_match=3)
+    assert t.play(workers=2, batch_size=2).finished
+    assert t.played() == Tournament(entrants, format="swiss", rounds=2, games_per_match=3).play(workers=1).played()
+
+def test_checkpoint(entrants, tmp_path):
+    path = str(tmp_path / "tournament.jsonl")
+    full = Tournament(entrants, rounds=2)
+    checkpoint = Checkpoint(path, full)
+    full.play(workers=1, checkpoint=checkpoint)
+    checkpoint.close()
+
+    # Lose the last few games, cutting the last line short
+    with open(path) as f:
+        lines = f.read().splitlines(True)
+    with open(path, "w") as f:
+        f.writelines(lines[:-3])
+        f.write(lines[-3][:5])
+
+    resumed = Tournament(entrants, rounds=2)
+    checkpoint = Checkpoint(path, resumed)
+    assert 12 - 3 == len(resumed.results)
+    played = []
+    resumed.play(workers=1, checkpoint=checkpoint, progress=lambda t: played.append(len(t.results)))
+    checkpoint.close()
+
+    assert [12] == played
+    assert full.played() == resumed.played()
+    with open(path) as f:
+        assert 1 + 12 == len([json.loads(line) for line in f])
+
+    with pytest.raises(ValueError):
+        Checkpoint(path, Tournament(entrants, rounds=3))
+
+def test_checkpoint_without_last_newline(entrants, tmp_path):
+    """ A complete line whose newline didn't make it is played again """
+    path = str(tmp_path / "tournament.jsonl")
+    full = Tournament(entrants, rounds=2)
+    checkpoint = Checkpoint(path, full)
+    full.play(workers=1, checkpoint=checkpoint)
+    checkpoint.close()
+
+    with open(path) as f:
+        text = f.read()
+    with open(path, "w") as f:
+        f.write(text[:-1])
+
+    resumed = Tournament(entrants, rounds=2)
+    checkpoint = Checkpoint(path, resumed)
+    assert 11 == len(resumed.results)
+    resumed.play(workers=1, checkpoint=checkpoint)
+    checkpoint.close()
+
+    with open(path, "rb") as f:
+        data = f.read()
+    assert b"\0" not in data
+    reloaded = Tournament(entrants, rounds=2)
+    Checkpoint(path, reloaded).close()
+    assert full.played() == reloaded.played()
@@ -0,0 +1,60 @@
+import io
+import json
+import random
+
+import pytest
+
+from depose import trace
+from depose.headless import HeadlessDriver, new_game, random_choice
+
+
+@pytest.fixture
+def ring():
+    sink = trace.RingBufferSink(capacity=5)
+    previous = trace.set_sink(sink)
+    yield sink
+    trace.set_sink(previous)
+
+
+def test_disabled_by_default():
+    assert not trace.enabled
+    assert isinstance(trace.get_sink(), trace.NullSink)
+
+def test_set_sink(ring):
+    assert trace.enabled
+    trace.set_sink(None)
+    assert not trace.enabled
+
+def test_ring_buffer(ring):
+    for i in range(8):
+        trace.emit("test", action="Salary", index=i)
+
+    assert 5 == len(ring.events)
+    assert 7 == ring.events[-1].detail["index"]
+    assert "Salary" == ring.events[-1].action
+
+def test_json_lines():
+    f = io.StringIO()
+    sink = trace.JsonLinesSink(f)
+    sink.emit(trace.TraceEvent("accept", "Mug", "Rei", "challenge", None, {"challenger": "Asuka"}))
+
+    record = json.loads(f.getvalue())
+    assert {"event": "accept", "action": "Mug", "actor": "Rei", "phase": "challenge", "challenger": "Asuka"} == record
+
+def test_game_events(ring):
+    sink = trace.RingBufferSink(capacity=None)
+    trace.set_sink(sink)
+    game, ui = new_game(2, rng=random.Random(0))
+    HeadlessDriver(game, ui, random_choice(random.Random(0))).run()
+
+    events = {e.event for e in sink.events}
+    assert "perform" in events
+    assert "add_observer" in events
+
+def test_sink_from_env(tmp_path):
+    assert trace.sink_from_env({}) is None
+    assert isinstance(trace.sink_from_env({"DEPOSE_TRACE": "stdout"}), trace.PrintSink)
+
+    sink = trace.sink_from_env({"DEPOSE_TRACE": str(tmp_path / "trace.jsonl")})
+    assert isinstance(sink, trace.JsonLinesSink)
+    sink.close()
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from depose.headless import HeadlessDriver, new_game, random_choice
+from depose.model import Decision
+from depose.state import GameState
+from depose.undo import UndoLog
+
+
+def position(game):
+    s = GameState.from_game(game)
+    hands = [tuple(p.cards) for p in game.players]
+    return bytes(s.coins), hands, bytes(s.deck), s.order, s.winner
+
+
+@pytest.fixture
+def driver():
+    game, ui = new_game(4, rng=random.Random(3))
+    driver = HeadlessDriver(game, ui, random_choice(random.Random(3)))
+    return driver
+
+
+def test_restore(driver):
+    game, ui = driver.game, driver.ui
+    log = UndoLog(game)
+    driver.start()
+    rng = random.Random(0)
+
+    restores = 0
+    while game.winner is None:
+        player, state = ui.prompts[0]
+        if state.decision is Decision.ACTION and rng.random() < 0.5:
+            before = position(game)
+            mark = log.mark()
+            for _ in range(rng.randint(1, 20)):
+                if game.winner is not None:
+                    break
+                driver.step()
+            log.restore(mark)
+            restores += 1
+
+            assert position(game) == before
+            assert len(log) == mark.size
+            assert [(p, s.decision) for p, s in ui.prompts] == [(player, Decision.ACTION)]
+        driver.step()
+
+    assert restores > 0
+    log.close()
+
+def test_mark_mid_turn(driver):
+    log = UndoLog(driver.game)
+    driver.start()
+    log.mark()
+    while driver.game.current_action is None:
+        driver.step()
+    with pytest.raises(ValueError):
+        log.mark()
+
+def test_journal_size(driver):
+    game = driver.game
+    log = UndoLog(game)
+    player = game.players[0]
+    before = position(game)
+    mark = log.mark()
+
+    player.coins += 2
+    card = player.deck.get()
+    player.add_card(card)
+    assert len(log) == 3 # Coins, draw, hand
+
+    log.restore(mark)
+    assert len(log) == 0
+    assert position(game) == before
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from depose.model import Card
+from depose.state import ACTION, CHALLENGE, REVEAL, LOSE_LIFE, RETURN, OVER, MUG, TITHE, DIPLOMACY
+from depose.vec import VecEnv
+
+
+def cards(state, seat):
+    return sorted(state.cards(seat))
+
+@pytest.fixture
+def env():
+    env = VecEnv(2, 3, seed=0)
+    env.hands[:] = 0
+    env.hands[:, 0, [Card.LORD.value, Card.BANDIT.value]] = 1
+    env.hands[:, 1, Card.MEDIC.value] = 2
+    env.hands[:, 2, [Card.MERCENARY.value, Card.DIPLOMAT.value]] = 1
+    env.coins[:] = 2
+    return env
+
+
+def test_reset():
+    env = VecEnv(8, 4, num_sets=3, seed=0)
+    assert (2 == env.hands.sum(2)).all()
+    assert (15 - 8 == env.deck.sum(1)).all()
+    assert (ACTION == env.phase).all()
+    assert (0 == env.player).all()
+
+def test_legal_mask(env):
+    mask = env.legal_mask()
+    assert [0, 1, 2, 4, 6] == list(np.flatnonzero(mask[0]))
+
+    env.coins[1, 0] = 10
+    mask = env.legal_mask()
+    assert [3] == list(np.flatnonzero(mask[1])) # Depose is forced
+
+def test_challenge(env):
+    env.step([TITHE - 1, TITHE - 1])
+    assert (CHALLENGE == env.phase).all()
+    assert (1 == env.player).all()
+
+    decline, accept = env.response_base, env.response_base + 1
+    env.step([decline, accept])
+    env.step([accept, env.card_base + Card.LORD.value - 1]) # Lord holds up
+    assert [REVEAL, LOSE_LIFE] == list(env.phase)
+    assert [0, 1] == list(env.player)
+
+def test_mug(env):
+    env.step([MUG - 1, MUG - 1])
+    env.step([env.target_base + 1, env.target_base + 2])
+    decline = env.response_base
+    for _ in range(3):
+        env.step([decline, decline]) # Nobody challenges or counters
+
+    assert (ACTION == env.phase).all()
+    assert (1 == env.active).all()
+    assert [[4, 0, 2], [4, 2, 0]] == env.coins.tolist()
+
+def test_game_over():
+    env = VecEnv(2, 2, seed=0)
+    env.hands[0, 1] = 0
+    done = env.step(env.random_moves())
+    assert OVER == env.phase[0]
+    assert 0 == env.winner[0]
+    assert done[0] and not done[1]
+
+    env.reset(done)
+    assert ACTION == env.phase[0]
+
+def test_matches_game_state():
+    """ Every game steps through the same states as a GameState given the same moves """
+    rng = random.Random(0)
+    env = VecEnv(32, 4, seed=0)
+    states = [env.state(i) for i in range(env.num_envs)]
+
+    while (env.phase != OVER).any():
+        mask = env.legal_mask()
+        moves = env.random_moves(mask)
+        for i, s in enumerate(states):
+            assert sorted(env.from_state_move(i, m) for m in s.moves()) == list(np.flatnonzero(mask[i]))
+            if s.phase != OVER:
+                s.step(env.to_state_move(i, moves[i]), rng)
+
+        env.step(moves)
+        for i, s in enumerate(states):
+            v = env.state(i)
+            if s.action == DIPLOMACY and s.phase == RETURN:
+                # Diplomacy draws come from a different generator
+                s.hands[:], s.deck[:] = v.hands, v.deck
+            assert [cards(s, seat) for seat in range(4)] == [cards(v, seat) for seat in range(4)]
+            for name in ["coins", "deck", "order", "queue", "phase", "player", "target", "winner"]:
+                assert getattr(s, name) == getattr(v, name)
@@ -0,0 +1,174 @@
+import pytest
+
+from depose import view
+from depose.model import Card
+from depose.view import GUI
+
+
+class Widget():
+    """ Stands in for a Tk widget, remembering its options and calls """
+    created = []
+
+    def __init__(self, master=None, **options):
+        self.master = master
+        self.options = dict(options)
+        self.configured = [] # Options passed to each config() call
+        self.gridded = False
+        Widget.created.append(self)
+
+    def config(self, **options):
+        self.options.update(options)
+        self.configured.append(options)
+
+    configure = config
+
+    def grid(self, **options):
+        self.gridded = True
+
+    def grid_remove(self):
+        self.gridded = False
+
+    def __getattr__(self, name):
+        # Layout calls (grid_rowconfigure etc.) don't matter here
+        return lambda *args, **kwargs: None
+
+class Tk(Widget):
+    def __init__(self):
+        super().__init__()
+        self.idle = []
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+    def run_idle(self):
+        while self.idle:
+            self.idle.pop(0)()
+
+class Text(Widget):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.content = ""
+
+    def insert(self, index, text):
+        assert view.END == index
+        self.content += text
+
+    def delete(self, start, stop):
+        """ Delete whole lines, from line.0 to line.0 """
+        first, last = int(start.split(".")[0]), int(stop.split(".")[0])
+        lines = self.content.split("\n")
+        self.content = "\n".join(lines[:first - 1] + lines[last - 1:])
+
+    def lines(self):
+        """ Complete lines in the widget """
+        return self.content.count("\n")
+
+class Button(Widget):
+    pass
+
+
+@pytest.fixture
+def tk(monkeypatch):
+    Widget.created = []
+    for name in ("Frame", "Label", "Scrollbar"):
+        monkeypatch.setattr(view, name, Widget)
+    monkeypatch.setattr(view, "Tk", Tk)
+    monkeypatch.setattr(view, "Text", Text)
+    monkeypatch.setattr(view, "Button", Button)
+
+
+def test_scrollback(tk):
+    gui = GUI(scrollback=100)
+    for batch in range(20):
+        for i in range(50):
+            # Game messages often end with newlines of their own
+            gui.message("GAME: message {} of batch {}\n".format(i, batch))
+        gui.master.run_idle()
+        assert gui.text.lines() <= 100
+
+    assert 100 == gui.text.lines()
+    assert gui.text.content.endswith("message 49 of batch 19\n\n")
+
+
+class FakePlayer():
+    def __init__(self, name):
+        self.name = name
+        self.cards = [Card.LORD, Card.MEDIC]
+        self.coins = 2
+
+    def add_change_observer(self, obs):
+        pass
+
+def configured(box):
+    return [options for widget in box.labels + [box.box] for options in widget.configured]
+
+def clear(boxes):
+    for box in boxes:
+        for widget in box.labels + [box.box]:
+            widget.configured.clear()
+
+def test_player_panel_redraws_changed_boxes(tk):
+    players = [FakePlayer("a"), FakePlayer("b"), FakePlayer("c")]
+    panel = view.PlayerPanel(None, players)
+    boxes = panel.player_boxes
+    panel.set_active(players[0])
+    clear(boxes)
+
+    # Nothing changed, so nothing is touched
+    panel.update()
+    assert [] == [configured(box) for box in boxes if configured(box)]
+
+    players[1].coins = 5
+    panel.notify_coins(players[1])
+    panel.update()
+    assert [] == configured(boxes[0]) == configured(boxes[2])
+    assert [{"text": "Coins: 5"}] == configured(boxes[1])
+
+    # A box which is redrawn without changing only configures what differs
+    clear(boxes)
+    panel.notify_cards(players[2])
+    players[2].cards.pop()
+    panel.update()
+    assert [{"text": ""}] == configured(boxes[2])
+
+    clear(boxes)
+    panel.set_active(players[1])
+    assert [] == configured(boxes[2])
+    assert configured(boxes[0]) and configured(boxes[1])
+
+def options(*labels):
+    return [view.Option(label, label.upper()) for label in labels]
+
+def test_option_buttons_reused(tk):
+    gui = GUI()
+    gui.show_prompt("Choose", options("Salary", "Tithe", "Mug"))
+    buttons = list(gui.buttons)
+    assert 3 == len(buttons)
+    assert ["Salary", "Tithe", "Mug"] == [b.options["text"] for b in buttons]
+    assert all(b.gridded for b in buttons)
+
+    # Fewer options: no new buttons, and the spare one is hidden
+    gui.show_prompt("Challenge?", options("Yes", "No"))
+    assert buttons == gui.buttons
+    assert [True, True, False] == [b.gridded for b in buttons]
+    assert ["YES", "NO"] == gui.option_values
+
+    # More again: the hidden button comes back, and unchanged labels aren't touched
+    for b in buttons:
+        b.configured.clear()
+    gui.show_prompt("Choose", options("Yes", "No", "Murder", "Depose"))
+    assert buttons == gui.buttons[:3]
+    assert 4 == len(gui.buttons) == sum(isinstance(w, Button) for w in Widget.created)
+    assert all(b.gridded for b in gui.buttons)
+    assert [[], [], [{"text": "Murder"}]] == [b.configured for b in buttons]
+
+    # A press answers with the current prompt's option
+    answers = []
+    class Listener():
+        def handle(self, value):
+            answers.append(value)
+    gui.add_observer(Listener())
+    gui._press(2)
+    gui._press(3)
+    gui._press(5) # Hidden
+    assert ["MURDER", "DEPOSE"] == answers
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from depose.headless import HeadlessDriver, new_game, random_choice
+from depose.state import GameState
+from depose.zobrist import GameHasher, TranspositionTable, state_hash
+
+
+@pytest.fixture
+def game():
+    game, ui = new_game(3, rng=random.Random(0))
+    return game
+
+
+def test_hand_order(game):
+    s = GameState.from_game(game)
+    swapped = s.copy()
+    cards = s.cards(0)
+    swapped.hands[0:2] = bytes(reversed(cards))
+    assert state_hash(s) == state_hash(swapped)
+
+def test_incremental(game):
+    hasher = GameHasher(game)
+    start = hasher.hash()
+    player = game.players[0]
+
+    player.coins += 3
+    assert start != hasher.hash()
+    assert state_hash(GameState.from_game(game)) == hasher.hash()
+    player.coins -= 3
+    assert start == hasher.hash()
+
+    card = player.deck.get()
+    player.add_card(card)
+    assert state_hash(GameState.from_game(game)) == hasher.hash()
+    player.return_card(card)
+    assert start == hasher.hash()
+
+    hasher.close()
+    player.coins += 1
+    assert start == hasher.hash() # Stale until rehashed
+    hasher.rehash()
+    assert state_hash(GameState.from_game(game)) == hasher.hash()
+
+def test_matches_state_hash():
+    rng = random.Random(1)
+    for _ in range(10):
+        game, ui = new_game(4, rng=random.Random(rng.getrandbits(64)))
+        hasher = GameHasher(game)
+        driver = HeadlessDriver(game, ui, random_choice(rng))
+        driver.start()
+        while game.winner is None:
+            player, prompt = ui.prompts[0]
+            assert state_hash(GameState.from_game(game, prompt, player)) == hasher.hash(prompt, player)
+            driver.step()
+        assert state_hash(GameState.from_game(game)) == hasher.hash()
+
+def test_lru():
+    table = TranspositionTable(2, "lru")
+    table.put(1, "a")
+    table.put(2, "b")
+    assert "a" == table.get(1) # 2 is now the least recently used
+    table.put(3, "c")
+
+    assert 2 == len(table)
+    assert 2 not in table
+    assert table.get(2) is None
+    assert (1, 1) == (table.hits, table.misses)
+
+def test_depth_preferred():
+    table = TranspositionTable(4, "depth")
+    assert table.put(1, "shallow", depth=1)
+    assert not table.put(5, "shallower", depth=0) # Same slot, searched less deeply
+    assert "shallow" == table.get(1)
+    assert table.get(5) is None
+
+    assert table.put(5, "deeper", depth=3)
+    assert 1 not in table
+    assert "deeper" == table.get(5)
+    assert table.put(5, "update", depth=0) # Same position always replaces
+    assert 1 == len(table)
+
+def test_bad_policy():
+    with pytest.raises(ValueError):
+        TranspositionTable(policy="fifo")